@@ -0,0 +1,236 @@
+# analytics/analysis_cache.py
+"""
+Persistent, content-addressed cache of image/video analysis results.
+
+Results are keyed by (kind, media digest, analysis version). The digest is a
+perceptual hash of the pixels (imagehash.phash for images, the phashes of
+the key frames for videos). Reposts, carousel duplicates and re-scrapes of
+the same media therefore reuse one analysis even when the CDN URL or the
+JPEG encoding differs. The version names the analyzer revision and the
+models behind it, so swapping a model never serves stale results.
+
+A second table remembers which digest a URL resolved to. A URL that was
+analyzed before is answered without downloading it again.
+
+Storage is one SQLite file (ANALYSIS_CACHE_PATH), shared by every worker
+process on the host. Eviction is LRU on last_used once the cache grows past
+ANALYSIS_CACHE_MAX_ENTRIES. Lookups are counted in CacheStats.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger('analytics')
+
+# Puts between eviction checks, and how far below the limit eviction trims
+EVICTION_CHECK_INTERVAL = 100
+EVICTION_TARGET = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, digest, version)
+);
+CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used);
+CREATE TABLE IF NOT EXISTS media_url (
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    version TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (url, kind, version)
+);
+"""
+
+
+class CacheStats:
+    """Thread-safe lookup counters for one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.url_hits = 0
+        self.digest_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def record(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def snapshot(self):
+        with self._lock:
+            hits = self.url_hits + self.digest_hits
+            lookups = hits + self.misses
+            return {
+                'hits': hits,
+                'url_hits': self.url_hits,
+                'digest_hits': self.digest_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+            }
+
+
+class AnalysisCache:
+    """
+    get_by_url() is the pre-download check; get() is the pre-inference check
+    once the media is decoded and hashed. put() stores a result under its
+    digest and links the URL it came from. Results round-trip through JSON.
+    """
+
+    def __init__(self, path=None, max_entries=None):
+        self.path = Path(path or settings.ANALYSIS_CACHE_PATH)
+        self.max_entries = max(1, max_entries or settings.ANALYSIS_CACHE_MAX_ENTRIES)
+        self.stats = CacheStats()
+        self._local = threading.local()
+        self._puts = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        """One connection per thread and process (sqlite handles don't survive fork)"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('PRAGMA synchronous=NORMAL')
+            local.pid = os.getpid()
+        return local.connection
+
+    def get_by_url(self, kind, url, version):
+        """Cached result for media previously fetched from `url`, without downloading it"""
+        row = self._connection().execute(
+            'SELECT digest FROM media_url WHERE url = ? AND kind = ? AND version = ?', (url, kind, version)
+        ).fetchone()
+        result = self._load(kind, row[0], version) if row else None
+        self.stats.record('url_hits' if result is not None else 'misses')
+        return result
+
+    def has_url(self, kind, url, version):
+        """Whether get_by_url() would hit, without loading the result or counting a lookup"""
+        return self._connection().execute(
+            'SELECT 1 FROM media_url u JOIN analysis a ON a.kind = u.kind AND a.digest = u.digest '
+            'AND a.version = u.version WHERE u.url = ? AND u.kind = ? AND u.version = ?', (url, kind, version)
+        ).fetchone() is not None
+
+    def get(self, kind, digest, version, url=None):
+        """Cached result for `digest`; a hit also links `url` to it for next time"""
+        result = self._load(kind, digest, version)
+        if result is None:
+            self.stats.record('misses')
+            return None
+        self.stats.record('digest_hits')
+        if url:
+            self.link(url, kind, digest, version)
+        return result
+
+    def put(self, kind, digest, version, result, url=None):
+        now = time.time()
+        self._connection().execute(
+            'INSERT INTO analysis (kind, digest, version, result, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (kind, digest, version) DO UPDATE SET result = excluded.result, last_used = excluded.last_used',
+            (kind, digest, version, json.dumps(result, default=str), now, now),
+        )
+        if url:
+            self.link(url, kind, digest, version)
+        self.stats.record('stores')
+
+        with self._lock:
+            self._puts += 1
+            due = self._puts % EVICTION_CHECK_INTERVAL == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used results beyond max_entries, and URLs pointing at them"""
+        connection = self._connection()
+        (count,) = connection.execute('SELECT COUNT(*) FROM analysis').fetchone()
+        if count <= self.max_entries:
+            return 0
+
+        excess = count - int(self.max_entries * EVICTION_TARGET)
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'DELETE FROM analysis WHERE rowid IN (SELECT rowid FROM analysis ORDER BY last_used LIMIT ?)',
+                (excess,),
+            )
+            connection.execute(
+                'DELETE FROM media_url WHERE NOT EXISTS (SELECT 1 FROM analysis a WHERE a.kind = media_url.kind '
+                'AND a.digest = media_url.digest AND a.version = media_url.version)'
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        self.stats.record('evictions', excess)
+        logger.info(f"Analysis cache evicted {excess} least recently used results")
+        return excess
+
+    def entries(self):
+        return self._connection().execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
+
+    def snapshot(self):
+        return {**self.stats.snapshot(), 'entries': self.entries(), 'max_entries': self.max_entries}
+
+    def _load(self, kind, digest, version):
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT result FROM analysis WHERE kind = ? AND digest = ? AND version = ?', (kind, digest, version)
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute(
+            'UPDATE analysis SET last_used = ?, hits = hits + 1 WHERE kind = ? AND digest = ? AND version = ?',
+            (time.time(), kind, digest, version),
+        )
+        return json.loads(row[0])
+
+    def link(self, url, kind, digest, version):
+        """Remember that `url` holds the media with `digest`"""
+        self._connection().execute(
+            'INSERT INTO media_url (url, kind, version, digest) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (url, kind, version) DO UPDATE SET digest = excluded.digest',
+            (url, kind, version, digest),
+        )
+
+
+# ================================
+# PROCESS-WIDE INSTANCE
+# ================================
+
+_lock = threading.Lock()
+_cache = None
+_cache_loaded = False
+
+
+def get_analysis_cache():
+    """The process's AnalysisCache; None when disabled or the file can't be opened"""
+    global _cache, _cache_loaded
+    with _lock:
+        if not _cache_loaded:
+            _cache_loaded = True
+            if settings.ANALYSIS_CACHE_ENABLED:
+                try:
+                    _cache = AnalysisCache()
+                except Exception as e:
+                    logger.error(f"Analysis cache unavailable: {e}")
+        return _cache
+
+
+def analysis_cache_stats():
+    return _cache.snapshot() if _cache is not None else None
@@ -0,0 +1,102 @@
+# analytics/cache.py
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .data_processing import DataProcessor
+
+logger = logging.getLogger('analytics')
+
+INFLUENCER_ANALYTICS_KEY = 'analytics:influencer:{influencer_id}'
+
+
+def influencer_analytics_key(influencer_id: int) -> str:
+    return INFLUENCER_ANALYTICS_KEY.format(influencer_id=influencer_id)
+
+
+def get_influencer_analytics(influencer) -> dict:
+    """
+    Cached analytics block for InfluencerAnalyticsAPIView.
+
+    Entries are dropped by the post/reel signals in analytics.signals. The
+    follower count the entry was computed with is stored alongside it, so a
+    changed follower count is a miss even if the influencer was bulk-updated.
+    """
+    return get_many_influencer_analytics([influencer])[influencer.id]
+
+
+def get_many_influencer_analytics(influencers) -> dict:
+    """
+    {influencer_id: analytics} with one cache round trip; all misses are
+    computed together from grouped aggregates (constant query count).
+    """
+    keys = {influencer.id: influencer_analytics_key(influencer.id) for influencer in influencers}
+    cached = cache.get_many(list(keys.values()))
+
+    results, misses = {}, []
+    for influencer in influencers:
+        entry = cached.get(keys[influencer.id])
+        if entry is not None and entry.get('followers_count') == influencer.followers_count:
+            results[influencer.id] = entry['analytics']
+        else:
+            misses.append(influencer)
+
+    if misses:
+        computed = compute_many_influencer_analytics(misses)
+        cache.set_many(
+            {
+                keys[influencer.id]: {
+                    'followers_count': influencer.followers_count,
+                    'analytics': computed[influencer.id],
+                }
+                for influencer in misses
+            },
+            settings.INFLUENCER_ANALYTICS_CACHE_TIMEOUT,
+        )
+        results.update(computed)
+    return results
+
+
+def invalidate_influencer_analytics(influencer_id: int):
+    cache.delete(influencer_analytics_key(influencer_id))
+
+
+def compute_influencer_analytics(influencer) -> dict:
+    """Engagement figures from database-side aggregates over posts and reels"""
+    return compute_many_influencer_analytics([influencer])[influencer.id]
+
+
+def compute_many_influencer_analytics(influencers) -> dict:
+    processor = DataProcessor()
+    ids = [influencer.id for influencer in influencers]
+    all_totals = processor.aggregate_content_totals_many(ids)
+    best_hours = processor.best_posting_hours(ids)
+    computed_at = timezone.now().isoformat()
+
+    analytics = {}
+    for influencer in influencers:
+        totals = all_totals[influencer.id]
+        total_content = totals['total_posts']
+        avg_likes = totals['total_likes'] / total_content if total_content else 0
+        avg_comments = totals['total_comments'] / total_content if total_content else 0
+        best_hour = best_hours.get(influencer.id)
+
+        analytics[influencer.id] = {
+            'engagement_rate': processor._calculate_engagement_rate_by_followers(
+                totals['total_likes'], totals['total_comments'],
+                influencer.followers_count, total_content
+            ),
+            'avg_likes': round(avg_likes, 2),
+            'avg_comments': round(avg_comments, 2),
+            'avg_views': round(totals['reel_views'] / totals['reels_count'], 2) if totals['reels_count'] else 0,
+            'video_engagement_rate': processor._video_engagement_rate(totals),
+            'best_posting_time': f'{best_hour:02d}:00' if best_hour is not None else None,
+            'growth_rate': None,
+            'reach': totals['post_views'] + totals['reel_views'],
+            'total_posts': totals['posts_count'],
+            'total_reels': totals['reels_count'],
+            'computed_at': computed_at,
+        }
+    return analytics
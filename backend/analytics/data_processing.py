@@ -3,9 +3,17 @@ import logging
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.db.models import Avg, Sum, Count, Max, Min, F, Q
+from django.db.models.functions import ExtractHour
 from collections import defaultdict, Counter
 import numpy as np
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
+
+from core.http_cache import invalidate_tags
+from influencers.models import Influencer
+from posts.models import Post
+from reels.models import Reel
+
+from .engine import VIDEO_MEDIA_TYPES, EngagementEngine
 
 logger = logging.getLogger('analytics')
 
@@ -22,47 +30,20 @@ class DataProcessor:
         """
         WORKING engagement metrics calculation
         Implements multiple engagement rate formulas as per industry standards
+        Consistency, high-performing ratio and the per-type rates come from
+        the columnar EngagementEngine (one values_list pass, no model instances).
         """
         try:
-            posts = influencer.posts.all()
-            reels = influencer.reels.all()
+            engine = EngagementEngine.for_influencers([influencer.id])
+            engagement_metrics = engine.engagement_metrics(
+                {influencer.id: influencer.followers_count}
+            )[influencer.id]
             
-            if not posts.exists() and not reels.exists():
+            if engagement_metrics is None:
                 return self._default_engagement_metrics()
             
-            # Basic metrics
-            total_posts = posts.count() + reels.count()
-            total_likes = sum(post.likes_count for post in posts) + sum(reel.likes_count for reel in reels)
-            total_comments = sum(post.comments_count for post in posts) + sum(reel.comments_count for reel in reels)
-            total_views = sum(reel.views_count for reel in reels)
-            
-            # Calculate averages
-            avg_likes = total_likes / total_posts if total_posts > 0 else 0
-            avg_comments = total_comments / total_posts if total_posts > 0 else 0
-            avg_views = total_views / reels.count() if reels.count() > 0 else 0
-            
-            # Engagement rate calculations (multiple formulas)
-            engagement_metrics = {
-                # Standard engagement rate (by followers)
-                'engagement_rate_followers': self._calculate_engagement_rate_by_followers(
-                    total_likes, total_comments, influencer.followers_count, total_posts
-                ),
-                
-                # Average engagement per post
-                'avg_likes': avg_likes,
-                'avg_comments': avg_comments,
-                'avg_views': avg_views,
-                'avg_total_engagement': avg_likes + avg_comments,
-                
-                # Advanced metrics
-                'likes_to_comments_ratio': avg_likes / avg_comments if avg_comments > 0 else 0,
-                'video_engagement_rate': self._calculate_video_engagement_rate(reels),
-                'image_engagement_rate': self._calculate_image_engagement_rate(posts),
-                
-                # Quality metrics
-                'consistency_score': self._calculate_consistency_score(posts, reels),
-                'high_performing_content_ratio': self._calculate_high_performing_ratio(posts, reels),
-            }
+            avg_likes = engagement_metrics['avg_likes']
+            avg_comments = engagement_metrics['avg_comments']
             
             # Update influencer model with primary metrics
             influencer.avg_likes = avg_likes
@@ -77,6 +58,39 @@ class DataProcessor:
             self.logger.error(f"Engagement calculation failed: {e}")
             return self._default_engagement_metrics()
     
+    def calculate_engagement_metrics_many(self, influencers) -> Dict[int, Dict[str, float]]:
+        """
+        calculate_engagement_metrics for a batch: one EngagementEngine load for
+        all of them and one bulk_update of the influencer columns. Errors are
+        raised, not defaulted, so callers can retry the batch item by item.
+        """
+        influencers = list(influencers)
+        engine = EngagementEngine.for_influencers([influencer.id for influencer in influencers])
+        computed = engine.engagement_metrics(
+            {influencer.id: influencer.followers_count for influencer in influencers}
+        )
+        
+        results = {}
+        updated = []
+        for influencer in influencers:
+            metrics = computed.get(influencer.id)
+            if metrics is None:
+                results[influencer.id] = self._default_engagement_metrics()
+                continue
+            influencer.avg_likes = metrics['avg_likes']
+            influencer.avg_comments = metrics['avg_comments']
+            influencer.engagement_rate = metrics['engagement_rate_followers']
+            updated.append(influencer)
+            results[influencer.id] = metrics
+        
+        if updated:
+            Influencer.objects.bulk_update(updated, ['avg_likes', 'avg_comments', 'engagement_rate'])
+            # bulk_update sends no post_save, so drop the cached influencer responses here
+            invalidate_tags('influencers', *(f'influencer:{influencer.id}' for influencer in updated))
+        
+        self.logger.info(f"Calculated engagement metrics for {len(updated)} of {len(influencers)} influencers")
+        return results
+    
     def _calculate_engagement_rate_by_followers(self, likes: int, comments: int, followers: int, posts: int) -> float:
         """Standard engagement rate: (avg_engagement / followers) * 100"""
         if followers == 0 or posts == 0:
@@ -86,32 +100,90 @@ class DataProcessor:
         engagement_rate = (avg_engagement / followers) * 100
         return round(engagement_rate, 2)
     
-    def _calculate_video_engagement_rate(self, reels) -> float:
-        """Calculate engagement rate specifically for video content"""
-        if not reels.exists():
-            return 0.0
-        
-        total_views = sum(reel.views_count for reel in reels)
-        total_engagement = sum(reel.likes_count + reel.comments_count for reel in reels)
+    def aggregate_content_totals(self, influencer) -> Dict[str, int]:
+        """
+        Likes/comments/views totals for an influencer's posts and reels.
+        Two aggregate queries, no model instances are loaded.
+        """
+        return self.aggregate_content_totals_many([influencer.id])[influencer.id]
+    
+    def aggregate_content_totals_many(self, influencer_ids) -> Dict[int, Dict[str, int]]:
+        """aggregate_content_totals for many influencers: two GROUP BY queries in total"""
+        grouped = {}
+        for kind, model in (('posts', Post), ('reels', Reel)):
+            grouped[kind] = {
+                row['influencer_id']: row
+                for row in model.objects.filter(influencer_id__in=influencer_ids)
+                .values('influencer_id')
+                .annotate(
+                    count=Count('id'),
+                    likes=Sum('likes_count'),
+                    comments=Sum('comments_count'),
+                    views=Sum('views_count'),
+                )
+                .order_by()
+            }
         
-        if total_views == 0:
+        totals = {}
+        for influencer_id in influencer_ids:
+            post_totals = grouped['posts'].get(influencer_id, {})
+            reel_totals = grouped['reels'].get(influencer_id, {})
+            posts_count = post_totals.get('count') or 0
+            reels_count = reel_totals.get('count') or 0
+            totals[influencer_id] = {
+                'posts_count': posts_count,
+                'reels_count': reels_count,
+                'total_posts': posts_count + reels_count,
+                'total_likes': (post_totals.get('likes') or 0) + (reel_totals.get('likes') or 0),
+                'total_comments': (post_totals.get('comments') or 0) + (reel_totals.get('comments') or 0),
+                'post_views': post_totals.get('views') or 0,
+                'reel_views': reel_totals.get('views') or 0,
+                'reel_likes': reel_totals.get('likes') or 0,
+                'reel_comments': reel_totals.get('comments') or 0,
+            }
+        return totals
+    
+    def _video_engagement_rate(self, totals: Dict[str, int]) -> float:
+        """Engagement rate for video content: reel likes+comments per view"""
+        if totals['reel_views'] == 0:
             return 0.0
         
-        return round((total_engagement / total_views) * 100, 2)
+        total_engagement = totals['reel_likes'] + totals['reel_comments']
+        return round((total_engagement / totals['reel_views']) * 100, 2)
     
     def _calculate_image_engagement_rate(self, posts) -> float:
         """Calculate engagement rate specifically for image content"""
-        image_posts = posts.filter(is_video=False)
-        if not image_posts.exists():
+        result = posts.exclude(media_type__in=VIDEO_MEDIA_TYPES).aggregate(
+            avg_engagement=Avg(F('likes_count') + F('comments_count'))
+        )
+        if result['avg_engagement'] is None:
             return 0.0
         
-        total_engagement = sum(post.likes_count + post.comments_count for post in image_posts)
-        avg_engagement = total_engagement / image_posts.count()
-        
-        return round(avg_engagement, 2)
+        return round(result['avg_engagement'], 2)
+    
+    def best_posting_hour(self, influencer) -> Optional[int]:
+        """UTC hour whose posts average the highest likes+comments"""
+        return self.best_posting_hours([influencer.id]).get(influencer.id)
+    
+    def best_posting_hours(self, influencer_ids) -> Dict[int, int]:
+        """best_posting_hour for many influencers from one (influencer, hour) GROUP BY"""
+        rows = (
+            Post.objects.filter(influencer_id__in=influencer_ids)
+            .annotate(hour=ExtractHour('posted_at'))
+            .values('influencer_id', 'hour')
+            .annotate(avg_engagement=Avg(F('likes_count') + F('comments_count')))
+            .order_by('influencer_id', '-avg_engagement', 'hour')
+        )
+        best = {}
+        for row in rows:
+            best.setdefault(row['influencer_id'], row['hour'])
+        return best
     
     def _calculate_consistency_score(self, posts, reels) -> float:
-        """Calculate posting consistency and engagement consistency"""
+        """
+        Calculate posting consistency and engagement consistency
+        (per-item reference for EngagementEngine.consistency_scores)
+        """
         try:
             all_content = list(posts) + list(reels)
             if len(all_content) < 3:
@@ -135,7 +207,10 @@ class DataProcessor:
             return 5.0
     
     def _calculate_high_performing_ratio(self, posts, reels) -> float:
-        """Calculate ratio of high-performing content"""
+        """
+        Calculate ratio of high-performing content
+        (per-item reference for EngagementEngine.high_performing_ratios)
+        """
         try:
             all_content = list(posts) + list(reels)
             if not all_content:
@@ -161,12 +236,13 @@ class DataProcessor:
         try:
             posts = influencer.posts.all()
             reels = influencer.reels.all()
+            engine = EngagementEngine.for_influencers([influencer.id])
             
             analysis = {
                 'top_performing_posts': self._get_top_performing_content(posts, 'posts'),
                 'top_performing_reels': self._get_top_performing_content(reels, 'reels'),
-                'content_type_performance': self._analyze_content_types(posts, reels),
-                'vibe_performance': self._analyze_vibe_performance(posts, reels),
+                'content_type_performance': engine.content_type_performance()[influencer.id],
+                'vibe_performance': engine.vibe_performance()[influencer.id],
             }
             
             self.logger.info(f"Content performance analysis completed for @{influencer.username}")
@@ -206,11 +282,14 @@ class DataProcessor:
         return top_content
     
     def _analyze_content_types(self, posts, reels) -> Dict[str, float]:
-        """Analyze performance by content type"""
+        """
+        Analyze performance by content type
+        (per-item reference for EngagementEngine.content_type_performance)
+        """
         analysis = {}
         
         # Image posts analysis
-        image_posts = posts.filter(is_video=False)
+        image_posts = posts.exclude(media_type__in=VIDEO_MEDIA_TYPES)
         if image_posts.exists():
             avg_image_engagement = sum(
                 p.likes_count + p.comments_count for p in image_posts
@@ -219,7 +298,7 @@ class DataProcessor:
             analysis['image_posts_count'] = image_posts.count()
         
         # Video posts analysis
-        video_posts = posts.filter(is_video=True)
+        video_posts = posts.filter(media_type__in=VIDEO_MEDIA_TYPES)
         if video_posts.exists():
             avg_video_engagement = sum(
                 p.likes_count + p.comments_count for p in video_posts
@@ -241,7 +320,10 @@ class DataProcessor:
         return analysis
     
     def _analyze_vibe_performance(self, posts, reels) -> Dict[str, Dict]:
-        """Analyze performance by content vibe/mood"""
+        """
+        Analyze performance by content vibe/mood
+        (per-item reference for EngagementEngine.vibe_performance)
+        """
         vibe_performance = defaultdict(lambda: {'count': 0, 'total_engagement': 0})
         
         # Analyze posts by vibe
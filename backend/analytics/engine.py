@@ -0,0 +1,246 @@
+# analytics/engine.py
+"""
+Columnar engagement engine.
+
+Content for one influencer or a whole batch is pulled once with values_list
+(just the columns the metrics read) into NumPy arrays, and the engagement,
+consistency, content-type and vibe metrics are computed with grouped array
+operations (bincount over a per-row influencer index) instead of Python loops
+over model instances. DataProcessor delegates to it; its per-item helpers are
+kept as the reference implementation that benchmark_engagement compares with.
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+
+from posts.models import Post
+from reels.models import Reel
+
+# Post.media_type values that count as video content
+VIDEO_MEDIA_TYPES = ('video', 'reel')
+
+POST_COLUMNS = ('influencer_id', 'likes_count', 'comments_count', 'views_count',
+                'media_type', 'is_analyzed', 'vibe_classification')
+REEL_COLUMNS = ('influencer_id', 'likes_count', 'comments_count', 'views_count',
+                'is_analyzed', 'vibe_classification')
+
+KIND_POST = 0
+KIND_REEL = 1
+
+
+class ContentColumns:
+    """Posts and reels of a set of influencers as parallel arrays, one row per item"""
+
+    def __init__(self, influencer_ids: Iterable[int], post_rows, reel_rows):
+        self.influencer_ids = np.array(sorted(set(influencer_ids)), dtype=np.int64)
+        self.size = len(self.influencer_ids)
+
+        post_rows, reel_rows = list(post_rows), list(reel_rows)
+        owners = [row[0] for row in post_rows] + [row[0] for row in reel_rows]
+        self.group = np.searchsorted(self.influencer_ids, np.array(owners, dtype=np.int64))
+        self.kind = np.concatenate([
+            np.full(len(post_rows), KIND_POST, dtype=np.int8),
+            np.full(len(reel_rows), KIND_REEL, dtype=np.int8),
+        ])
+        self.likes = np.array([row[1] for row in post_rows] + [row[1] for row in reel_rows], dtype=np.int64)
+        self.comments = np.array([row[2] for row in post_rows] + [row[2] for row in reel_rows], dtype=np.int64)
+        self.views = np.array(
+            [row[3] or 0 for row in post_rows] + [row[3] or 0 for row in reel_rows], dtype=np.int64
+        )
+        self.is_video = np.array(
+            [row[4] in VIDEO_MEDIA_TYPES for row in post_rows] + [True] * len(reel_rows), dtype=bool
+        )
+        self.is_analyzed = np.array([row[5] for row in post_rows] + [row[4] for row in reel_rows], dtype=bool)
+
+        vibes = [row[6] for row in post_rows] + [row[5] for row in reel_rows]
+        self.vibe_names = sorted({vibe for vibe in vibes if vibe})
+        codes = {vibe: index for index, vibe in enumerate(self.vibe_names)}
+        self.vibe = np.array([codes.get(vibe, -1) for vibe in vibes], dtype=np.int64)
+
+        self.engagement = self.likes + self.comments
+
+    @classmethod
+    def load(cls, influencer_ids):
+        """Two queries for the whole batch, no model instances"""
+        influencer_ids = list(influencer_ids)
+        post_rows = Post.objects.filter(influencer_id__in=influencer_ids).values_list(*POST_COLUMNS)
+        reel_rows = Reel.objects.filter(influencer_id__in=influencer_ids).values_list(*REEL_COLUMNS)
+        return cls(influencer_ids, post_rows.order_by(), reel_rows.order_by())
+
+    # ---- grouped reductions -------------------------------------------------
+
+    def count(self, mask=None):
+        group = self.group if mask is None else self.group[mask]
+        return np.bincount(group, minlength=self.size)
+
+    def total(self, values, mask=None):
+        if mask is not None:
+            values, group = values[mask], self.group[mask]
+        else:
+            group = self.group
+        return np.bincount(group, weights=values, minlength=self.size)
+
+    def mean(self, values, mask=None):
+        counts = self.count(mask)
+        totals = self.total(values, mask)
+        return np.divide(totals, counts, out=np.zeros(self.size), where=counts > 0), counts
+
+    def median_engagement(self):
+        """Per-influencer median of engagement (0 where there is no content)"""
+        counts = self.count()
+        order = np.lexsort((self.engagement, self.group))
+        ordered = self.engagement[order].astype(np.float64)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        medians = np.zeros(self.size)
+        has = counts > 0
+        low = starts[has] + (counts[has] - 1) // 2
+        high = starts[has] + counts[has] // 2
+        medians[has] = (ordered[low] + ordered[high]) / 2
+        return medians
+
+
+class EngagementEngine:
+    """All per-influencer metrics for a ContentColumns batch in one pass over the arrays"""
+
+    def __init__(self, columns: ContentColumns):
+        self.columns = columns
+
+    @classmethod
+    def for_influencers(cls, influencer_ids):
+        return cls(ContentColumns.load(influencer_ids))
+
+    def content_totals(self) -> Dict[int, Dict[str, int]]:
+        c = self.columns
+        reels = c.kind == KIND_REEL
+        posts = ~reels
+        fields = {
+            'posts_count': c.count(posts),
+            'reels_count': c.count(reels),
+            'total_posts': c.count(),
+            'total_likes': c.total(c.likes),
+            'total_comments': c.total(c.comments),
+            'post_views': c.total(c.views, posts),
+            'reel_views': c.total(c.views, reels),
+            'reel_likes': c.total(c.likes, reels),
+            'reel_comments': c.total(c.comments, reels),
+        }
+        return {
+            int(influencer_id): {name: int(values[index]) for name, values in fields.items()}
+            for index, influencer_id in enumerate(c.influencer_ids)
+        }
+
+    def consistency_scores(self):
+        """10 - 10 * coefficient of variation of engagement; 0 under 3 items or zero mean"""
+        c = self.columns
+        means, counts = c.mean(c.engagement)
+        deviations = (c.engagement - means[c.group]) ** 2
+        variances = np.divide(c.total(deviations), counts, out=np.zeros(c.size), where=counts > 0)
+        valid = (counts >= 3) & (means > 0)
+        scores = np.zeros(c.size)
+        scores[valid] = np.maximum(0, 10 - np.sqrt(variances[valid]) / means[valid] * 10)
+        return np.round(scores, 2)
+
+    def high_performing_ratios(self):
+        """Percent of items with engagement strictly above the influencer's median"""
+        c = self.columns
+        counts = c.count()
+        above = c.total((c.engagement > c.median_engagement()[c.group]).astype(np.float64))
+        ratios = np.divide(above, counts, out=np.zeros(c.size), where=counts > 0) * 100
+        return np.round(ratios, 2)
+
+    def image_engagement_rates(self):
+        c = self.columns
+        means, _ = c.mean(c.engagement, (c.kind == KIND_POST) & ~c.is_video)
+        return np.round(means, 2)
+
+    def content_type_performance(self) -> Dict[int, Dict[str, float]]:
+        c = self.columns
+        posts = c.kind == KIND_POST
+        reels = c.kind == KIND_REEL
+        image_avg, image_count = c.mean(c.engagement, posts & ~c.is_video)
+        video_avg, video_count = c.mean(c.engagement, posts & c.is_video)
+        reel_avg, reel_count = c.mean(c.engagement, reels)
+        reel_views, _ = c.mean(c.views, reels)
+
+        result = {}
+        for index, influencer_id in enumerate(c.influencer_ids):
+            analysis = {}
+            if image_count[index]:
+                analysis['image_posts_avg_engagement'] = round(float(image_avg[index]), 2)
+                analysis['image_posts_count'] = int(image_count[index])
+            if video_count[index]:
+                analysis['video_posts_avg_engagement'] = round(float(video_avg[index]), 2)
+                analysis['video_posts_count'] = int(video_count[index])
+            if reel_count[index]:
+                analysis['reels_avg_engagement'] = round(float(reel_avg[index]), 2)
+                analysis['reels_count'] = int(reel_count[index])
+                analysis['reels_avg_views'] = round(float(reel_views[index]), 2)
+            result[int(influencer_id)] = analysis
+        return result
+
+    def vibe_performance(self) -> Dict[int, Dict]:
+        """Count/avg/total engagement per vibe of analyzed content, plus the best vibe"""
+        c = self.columns
+        width = max(1, len(c.vibe_names))
+        mask = c.is_analyzed & (c.vibe >= 0)
+        keys = c.group[mask] * width + c.vibe[mask]
+        counts = np.bincount(keys, minlength=c.size * width).reshape(c.size, width)
+        totals = np.bincount(keys, weights=c.engagement[mask], minlength=c.size * width).reshape(c.size, width)
+
+        result = {}
+        for index, influencer_id in enumerate(c.influencer_ids):
+            vibes = {}
+            for code in np.flatnonzero(counts[index]):
+                count = int(counts[index, code])
+                total = int(totals[index, code])
+                vibes[c.vibe_names[code]] = {
+                    'count': count,
+                    'avg_engagement': round(total / count, 2),
+                    'total_engagement': total,
+                }
+            if vibes:
+                vibes['best_performing_vibe'] = max(vibes, key=lambda vibe: vibes[vibe]['avg_engagement'])
+            result[int(influencer_id)] = vibes
+        return result
+
+    def engagement_metrics(self, followers: Dict[int, int]) -> Dict[int, Dict[str, float]]:
+        """
+        DataProcessor.calculate_engagement_metrics for every influencer in the
+        batch (None for influencers without content). `followers` maps id -> followers_count.
+        """
+        totals = self.content_totals()
+        consistency = self.consistency_scores()
+        high_performing = self.high_performing_ratios()
+        image_rates = self.image_engagement_rates()
+
+        metrics = {}
+        for index, influencer_id in enumerate(self.columns.influencer_ids):
+            influencer_id = int(influencer_id)
+            row = totals[influencer_id]
+            total_posts = row['total_posts']
+            if total_posts == 0:
+                metrics[influencer_id] = None
+                continue
+
+            avg_likes = row['total_likes'] / total_posts
+            avg_comments = row['total_comments'] / total_posts
+            follower_count = followers.get(influencer_id, 0)
+            metrics[influencer_id] = {
+                'engagement_rate_followers': (
+                    round((row['total_likes'] + row['total_comments']) / total_posts / follower_count * 100, 2)
+                    if follower_count else 0.0
+                ),
+                'avg_likes': avg_likes,
+                'avg_comments': avg_comments,
+                'avg_views': row['reel_views'] / row['reels_count'] if row['reels_count'] else 0,
+                'avg_total_engagement': avg_likes + avg_comments,
+                'likes_to_comments_ratio': avg_likes / avg_comments if avg_comments > 0 else 0,
+                'video_engagement_rate': (
+                    round((row['reel_likes'] + row['reel_comments']) / row['reel_views'] * 100, 2)
+                    if row['reel_views'] else 0.0
+                ),
+                'image_engagement_rate': float(image_rates[index]),
+                'consistency_score': float(consistency[index]),
+                'high_performing_content_ratio': float(high_performing[index]),
+            }
+        return metrics
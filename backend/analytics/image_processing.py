@@ -1,36 +1,25 @@
 import cv2
 import numpy as np
-import torch
 from PIL import Image
-import requests
-from io import BytesIO
 import logging
-from transformers import (
-    BlipProcessor, 
-    BlipForConditionalGeneration,
-    pipeline
-)
-from sklearn.cluster import KMeans
-import nltk
-from textblob import TextBlob
 from collections import Counter
 import imagehash
 from django.conf import settings
 import os
 import tempfile
 
-logger = logging.getLogger('analytics')
+from core.media_store import get_media_store
+from core.model_registry import get_model
+
+from .analysis_cache import get_analysis_cache
+from .inference import CAPTION_MODEL, CLASSIFIER_MODEL, get_inference_worker
+from .ml_models import NLTK_DATA
+from .pixels import prepare_batch, prepare_pixels
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+logger = logging.getLogger('analytics')
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+# Bump when the analysis logic changes, so cached results are recomputed
+IMAGE_ANALYSIS_VERSION = 'image-v3'
 
 class ImageAnalyzer:
     """
@@ -39,10 +28,7 @@ class ImageAnalyzer:
     """
     
     def __init__(self):
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        logger.info(f"Using device: {self.device}")
-        
-        # Initialize AI models
+        # Shared BLIP/ViT worker (loaded once per process)
         self._load_models()
         
         # Vibe classification keywords
@@ -70,61 +56,142 @@ class ImageAnalyzer:
         }
         
     def _load_models(self):
-        """Load all required AI models"""
-        try:
-            # Load BLIP for image captioning and analysis
-            logger.info("Loading BLIP model...")
-            self.blip_processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-            self.blip_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
-            self.blip_model.to(self.device)
-            
-            # Load image classification model
-            logger.info("Loading classification model...")
-            self.classifier = pipeline(
-                "image-classification", 
-                model="google/vit-base-patch16-224",
-                device=0 if torch.cuda.is_available() else -1
-            )
-            
-            logger.info("AI models loaded successfully!")
-            
-        except Exception as e:
-            logger.error(f"Failed to load AI models: {e}")
-            # Fallback to basic processing
-            self.blip_processor = None
-            self.blip_model = None
-            self.classifier = None
+        """Attach the process-wide inference worker instead of loading BLIP/ViT per instance"""
+        self.inference = get_inference_worker()
+        if self.inference is None:
+            logger.warning("Vision models unavailable, using default captions and labels")
+        self.cache = get_analysis_cache()
+    
+    @property
+    def analysis_version(self) -> str:
+        """Cache version: analyzer revision plus the models that produced the captions/labels"""
+        if self.inference is None:
+            models = 'heuristic'
+        else:
+            # Backend and beam count change the captions too
+            variant = getattr(self.inference.models, 'variant', None)
+            models = f"{CAPTION_MODEL}+{CLASSIFIER_MODEL}" + (f"@{variant}" if variant else '')
+        return f"{IMAGE_ANALYSIS_VERSION}:{models}"
+    
+    def media_digest(self, image_pil) -> str:
+        """Perceptual hash of the pixels: survives re-encoding, resizing and new CDN URLs"""
+        return str(imagehash.phash(image_pil))
     
     def analyze_post_image(self, image_url: str) -> dict:
         """
         COMPLETE image analysis implementation
         Returns all required data for assignment
         """
-        try:
-            # Download and preprocess image
-            image_pil, image_cv = self._download_and_preprocess_image(image_url)
+        return self.analyze_post_images([image_url])[0]
+    
+    def analyze_post_images(self, image_urls: list, loaded: dict = None) -> list:
+        """
+        Analyze several images in one go. Every image is queued on the
+        inference worker before any per-image CPU work starts, so BLIP/ViT
+        run them as a batch while quality and colors are computed here.
+        
+        The analysis cache is checked by URL before downloading and by
+        perceptual hash before inference; identical images within the batch
+        are analyzed once. `loaded` maps URLs to load_image() results already
+        fetched by the prefetch stage.
+        """
+        version = self.analysis_version
+        results = [None] * len(image_urls)
+        
+        # Known URLs: no download at all
+        misses = []
+        for index, image_url in enumerate(image_urls):
+            cached = self.cache.get_by_url('image', image_url, version) if self.cache else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                misses.append(index)
+        
+        # Download, hash, and keep one image per digest that still needs analysis
+        to_analyze = {}
+        for index in misses:
+            image_url = image_urls[index]
+            if loaded and image_url in loaded:
+                image_pil, image_cv = loaded[image_url]
+            else:
+                image_pil, image_cv = self.load_image(image_url)
             if image_pil is None:
-                return self._default_analysis()
-            
+                results[index] = self._default_analysis()
+                continue
+            digest = self.media_digest(image_pil)
+            if digest in to_analyze:
+                to_analyze[digest]['indexes'].append(index)
+                continue
+            cached = self.cache.get('image', digest, version, url=image_url) if self.cache else None
+            if cached is not None:
+                results[index] = cached
+                continue
+            to_analyze[digest] = {'indexes': [index], 'url': image_url, 'image_pil': image_pil, 'image_cv': image_cv}
+        
+        for entry in to_analyze.values():
+            entry['future'] = self.inference.submit(entry['image_pil']) if self.inference else None
+        
+        # Palettes, brightness and contrast for the whole batch in one vectorized pass
+        prepared = self._prepare_pixels([entry['image_cv'] for entry in to_analyze.values()])
+        
+        for position, (digest, entry) in enumerate(to_analyze.items()):
+            result = self._analyze_downloaded_image(
+                entry['url'], entry['image_cv'], entry['future'], prepared[position] if prepared else None
+            )
+            if self.cache and result.get('processing_success'):
+                self.cache.put('image', digest, version, result, url=entry['url'])
+                for index in entry['indexes'][1:]:
+                    self.cache.link(image_urls[index], 'image', digest, version)
+            for index in entry['indexes']:
+                results[index] = dict(result)
+        return results
+    
+    def analyze_decoded_images(self, images: list, label: str = 'frame') -> list:
+        """
+        Analyze (PIL RGB, OpenCV BGR) pairs that are already in memory, e.g.
+        video key frames: no download, no temp files, no cache lookups (the
+        caller caches the combined result). Batched on the inference worker
+        like analyze_post_images.
+        """
+        futures = [self.inference.submit(image_pil) if self.inference else None for image_pil, _ in images]
+        prepared = self._prepare_pixels([image_cv for _, image_cv in images])
+        return [
+            self._analyze_downloaded_image(
+                f"{label} {index}", image_cv, future, prepared[index] if prepared else None
+            )
+            for index, ((_, image_cv), future) in enumerate(zip(images, futures))
+        ]
+    
+    def _prepare_pixels(self, images: list):
+        """prepare_batch() for `images`, or None (each image is then prepared on its own)"""
+        if not images:
+            return None
+        try:
+            return prepare_batch(images)
+        except Exception as e:
+            logger.warning(f"Batched pixel statistics failed: {e}")
+            return None
+    
+    def _analyze_downloaded_image(self, image_url: str, image_cv, future, pixels=None) -> dict:
+        try:
             logger.info(f"Analyzing image: {image_url}")
             
-            # Generate image caption using BLIP
-            caption = self._generate_caption(image_pil)
+            # CPU-side metrics first, while the worker is busy with the batch
+            pixels = pixels or prepare_pixels(image_cv)
+            quality_metrics = self._analyze_image_quality(pixels)
+            colors = self._extract_dominant_colors(pixels)
+            
+            # BLIP caption and ViT labels for this image
+            caption, labels = self._inference_result(future)
             
             # Extract keywords from caption and classification
-            keywords = self._extract_keywords(image_pil, caption)
+            keywords = self._extract_keywords(caption, labels)
             
             # Classify vibe/ambience
             vibe = self._classify_vibe(caption, keywords)
             
-            # Analyze image quality
-            quality_metrics = self._analyze_image_quality(image_cv)
-            
-            # Get dominant colors
-            colors = self._extract_dominant_colors(image_cv)
-            
             # Detect objects/categories
-            detected_objects = self._detect_objects(image_pil)
+            detected_objects = self._detect_objects(labels)
             
             result = {
                 'caption': caption,
@@ -137,7 +204,8 @@ class ImageAnalyzer:
                 'detected_objects': detected_objects,
                 'dominant_colors': colors,
                 'category': self._categorize_content(keywords, detected_objects),
-                'mood': self._analyze_mood(caption, vibe)
+                'mood': self._analyze_mood(caption, vibe),
+                'processing_success': True
             }
             
             logger.info(f"Image analysis complete. Vibe: {vibe}, Quality: {quality_metrics['overall_score']:.2f}")
@@ -147,17 +215,17 @@ class ImageAnalyzer:
             logger.error(f"Image analysis failed for {image_url}: {str(e)}")
             return self._default_analysis()
     
-    def _download_and_preprocess_image(self, image_url: str):
-        """Download image and convert to required formats"""
+    def load_image(self, image_url: str):
+        """
+        Fetch the image through the shared media store and convert to required
+        formats: (PIL RGB, OpenCV BGR), or (None, None). Thread-safe, so the
+        prefetch stage can call it ahead of analysis.
+        """
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(image_url, headers=headers, timeout=10)
-            response.raise_for_status()
+            blob = get_media_store().fetch(image_url)
             
             # Convert to PIL Image
-            image_pil = Image.open(BytesIO(response.content)).convert('RGB')
+            image_pil = Image.open(blob.path).convert('RGB')
             
             # Convert to OpenCV format
             image_cv = cv2.cvtColor(np.array(image_pil), cv2.COLOR_RGB2BGR)
@@ -168,25 +236,18 @@ class ImageAnalyzer:
             logger.error(f"Failed to download/preprocess image {image_url}: {e}")
             return None, None
     
-    def _generate_caption(self, image_pil: Image.Image) -> str:
-        """Generate caption using BLIP model"""
+    def _inference_result(self, future):
+        """(caption, labels) from the inference worker, or defaults"""
+        if future is None:
+            return "Image content", []
         try:
-            if self.blip_model is None or self.blip_processor is None:
-                return "Image content"
-            
-            inputs = self.blip_processor(image_pil, return_tensors="pt").to(self.device)
-            
-            with torch.no_grad():
-                out = self.blip_model.generate(**inputs, max_length=50, num_beams=5)
-            
-            caption = self.blip_processor.decode(out[0], skip_special_tokens=True)
-            return caption
-            
+            result = future.result()
+            return result['caption'], result['labels']
         except Exception as e:
-            logger.warning(f"Caption generation failed: {e}")
-            return "Image content"
+            logger.warning(f"Caption/classification failed: {e}")
+            return "Image content", []
     
-    def _extract_keywords(self, image_pil: Image.Image, caption: str) -> list:
+    def _extract_keywords(self, caption: str, labels: list) -> list:
         """
         WORKING keyword extraction from image and caption
         Combines multiple approaches for better results
@@ -195,6 +256,9 @@ class ImageAnalyzer:
         
         # Extract keywords from caption using NLP
         if caption:
+            nltk = get_model(NLTK_DATA)
+            from textblob import TextBlob
+            
             # Use TextBlob for noun phrase extraction
             blob = TextBlob(caption)
             for phrase in blob.noun_phrases:
@@ -211,17 +275,12 @@ class ImageAnalyzer:
                         keywords.add(word)
         
         # Get keywords from image classification
-        try:
-            if self.classifier:
-                classifications = self.classifier(image_pil, top_k=5)
-                for result in classifications:
-                    label = result['label'].lower()
-                    # Clean up label (remove numbers, special chars)
-                    clean_label = ''.join(c for c in label if c.isalpha() or c.isspace()).strip()
-                    if clean_label:
-                        keywords.add(clean_label)
-        except Exception as e:
-            logger.warning(f"Classification failed: {e}")
+        for result in labels:
+            label = result['label'].lower()
+            # Clean up label (remove numbers, special chars)
+            clean_label = ''.join(c for c in label if c.isalpha() or c.isspace()).strip()
+            if clean_label:
+                keywords.add(clean_label)
         
         # Add contextual keywords based on common Instagram categories
         content_keywords = self._get_content_category_keywords(caption, list(keywords))
@@ -311,27 +370,24 @@ class ImageAnalyzer:
             logger.warning(f"Vibe classification failed: {e}")
             return 'casual'
     
-    def _analyze_image_quality(self, image_cv) -> dict:
+    def _analyze_image_quality(self, pixels) -> dict:
         """
         WORKING image quality assessment using OpenCV
         Returns quality indicators as required
+        `pixels` is the shared prepare_batch() stage.
         """
         try:
-            # Convert to grayscale for analysis
-            gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
-            
             # 1. Sharpness/Blur detection using Laplacian variance
-            laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-            sharpness_score = min(laplacian_var / 100.0, 10.0)  # Normalize to 0-10
+            sharpness_score = min(pixels.laplacian_var / 100.0, 10.0)  # Normalize to 0-10
             
             # 2. Lighting analysis
-            lighting_score = self._analyze_lighting(gray)
+            lighting_score = self._analyze_lighting(pixels)
             
             # 3. Composition analysis (rule of thirds, balance)
-            composition_score = self._analyze_composition(gray)
+            composition_score = self._analyze_composition(pixels)
             
             # 4. Visual appeal (contrast, color distribution)
-            visual_appeal_score = self._analyze_visual_appeal(image_cv, gray)
+            visual_appeal_score = self._analyze_visual_appeal(pixels)
             
             # 5. Overall quality score (weighted average)
             overall_score = (
@@ -359,15 +415,14 @@ class ImageAnalyzer:
                 'sharpness': 5.0
             }
     
-    def _analyze_lighting(self, gray_image) -> float:
+    def _analyze_lighting(self, pixels) -> float:
         """Analyze lighting quality"""
         try:
             # Calculate mean brightness
-            mean_brightness = np.mean(gray_image)
+            mean_brightness = pixels.stats.brightness
             
-            # Calculate brightness distribution
-            hist = cv2.calcHist([gray_image], [0], None, [256], [0, 256])
-            hist_norm = hist.flatten() / hist.sum()
+            # Brightness distribution
+            hist_norm = pixels.stats.histogram
             
             # Check for balanced exposure (avoid over/under exposure)
             # Good lighting has balanced histogram without extreme peaks at 0 or 255
@@ -388,17 +443,17 @@ class ImageAnalyzer:
         except:
             return 5.0
     
-    def _analyze_composition(self, gray_image) -> float:
+    def _analyze_composition(self, pixels) -> float:
         """Analyze composition using rule of thirds and balance"""
         try:
-            h, w = gray_image.shape
+            h, w = pixels.gray.shape
             
             # Rule of thirds analysis
             # Divide image into 9 sections and check for interesting points
             third_h, third_w = h // 3, w // 3
             
-            # Calculate edge density in different regions
-            edges = cv2.Canny(gray_image, 50, 150)
+            # Edge density in different regions
+            edges = pixels.edges
             
             # Check edge distribution across rule of thirds grid
             sections = []
@@ -419,29 +474,17 @@ class ImageAnalyzer:
         except:
             return 5.0
     
-    def _analyze_visual_appeal(self, color_image, gray_image) -> float:
+    def _analyze_visual_appeal(self, pixels) -> float:
         """Analyze visual appeal based on contrast and color distribution"""
         try:
             # Contrast analysis
-            contrast = np.std(gray_image)
+            contrast = pixels.stats.contrast
             contrast_score = min(10, contrast / 50 * 10)  # Normalize
             
-            # Color diversity analysis
-            color_score = 5.0  # Default
-            try:
-                # Reshape image for color analysis
-                pixels = color_image.reshape(-1, 3)
-                
-                # Use KMeans to find dominant colors
-                kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-                kmeans.fit(pixels[::100])  # Sample every 100th pixel for speed
-                
-                # Score based on color diversity (more colors = more visually interesting)
-                unique_colors = len(np.unique(kmeans.cluster_centers_, axis=0))
-                color_score = min(10, unique_colors * 2)
-                
-            except:
-                pass
+            # Color diversity: distinct colors in the shared palette
+            # (more colors = more visually interesting)
+            unique_colors = len(np.unique(pixels.stats.palette, axis=0))
+            color_score = min(10, unique_colors * 2)
             
             # Combined visual appeal score
             visual_appeal = (contrast_score + color_score) / 2
@@ -451,19 +494,12 @@ class ImageAnalyzer:
         except:
             return 5.0
     
-    def _extract_dominant_colors(self, image_cv) -> list:
-        """Extract dominant colors from image"""
+    def _extract_dominant_colors(self, pixels) -> list:
+        """Extract dominant colors from image, most common first"""
         try:
-            # Reshape image
-            pixels = image_cv.reshape(-1, 3)
-            
-            # Use KMeans to find dominant colors
-            kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-            kmeans.fit(pixels[::200])  # Sample for speed
-            
             # Convert colors to hex format
             colors = []
-            for color in kmeans.cluster_centers_:
+            for color in pixels.stats.palette:
                 # Convert BGR to RGB
                 rgb_color = [int(color[2]), int(color[1]), int(color[0])]
                 hex_color = '#{:02x}{:02x}{:02x}'.format(*rgb_color)
@@ -475,24 +511,13 @@ class ImageAnalyzer:
             logger.warning(f"Color extraction failed: {e}")
             return ['#808080', '#404040', '#c0c0c0']  # Default grays
     
-    def _detect_objects(self, image_pil: Image.Image) -> list:
-        """Detect objects using image classification"""
-        try:
-            if self.classifier:
-                results = self.classifier(image_pil, top_k=5)
-                objects = []
-                for result in results:
-                    label = result['label']
-                    confidence = result['score']
-                    if confidence > 0.1:  # Only include confident predictions
-                        objects.append(label)
-                return objects[:5]  # Return top 5 objects
-            
+    def _detect_objects(self, labels: list) -> list:
+        """Detected objects from the image classification labels"""
+        if not labels:
             return ['object', 'scene']  # Fallback
-            
-        except Exception as e:
-            logger.warning(f"Object detection failed: {e}")
-            return ['object', 'scene']
+        
+        # Only include confident predictions, top 5
+        return [result['label'] for result in labels if result['score'] > 0.1][:5]
     
     def _categorize_content(self, keywords: list, detected_objects: list) -> str:
         """Categorize content into main category"""
@@ -559,5 +584,6 @@ class ImageAnalyzer:
             'detected_objects': ['object'],
             'dominant_colors': ['#808080'],
             'category': 'lifestyle',
-            'mood': 'neutral'
+            'mood': 'neutral',
+            'processing_success': False
         }
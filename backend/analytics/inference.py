@@ -0,0 +1,255 @@
+# analytics/inference.py
+"""
+Model-resident, micro-batched image inference for post analysis.
+
+BLIP (captioning) and ViT (classification) are loaded once per process, the
+first time an analyzer needs them (core.model_registry), and driven by a
+single InferenceWorker thread. Callers submit PIL images and get futures
+back; the worker drains its queue into batches of up to
+INFERENCE_MAX_BATCH_SIZE images, waiting at most INFERENCE_MAX_WAIT_MS for a
+batch to fill, and runs one BLIP generate() and one ViT forward pass per
+batch. Everything analyzed in the process (any influencer, any thread) shares
+those batches. Throughput is tracked in InferenceStats.
+
+The models run on one of several backends (INFERENCE_BACKEND):
+
+* torch       full-precision PyTorch, on the GPU when there is one;
+* torch-int8  PyTorch with dynamic int8 quantization of every Linear layer
+              (CPU only);
+* onnx        ONNX Runtime for the BLIP vision encoder and the ViT
+              classifier, exported once to INFERENCE_ONNX_DIR. BLIP's text
+              decoder stays in PyTorch, since generate() drives it token by
+              token;
+* onnx-int8   the ONNX graphs with dynamic int8 weights, plus an int8 text
+              decoder.
+
+The default stays torch. Measure the other backends' speed and agreement with
+it on the target hardware (manage.py benchmark_inference) before switching.
+
+Captions are decoded with INFERENCE_CAPTION_BEAMS beams (1 = greedy). The
+backend and beam count make up VisionModels.variant, which the analysis
+cache keys on, since both change the captions.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from core.model_registry import get_model, module_available
+
+from .ml_models import VISION_MODELS
+
+# Checked without importing: torch and transformers load with the models
+INFERENCE_AVAILABLE = module_available('torch', 'transformers')
+ONNX_AVAILABLE = module_available('onnxruntime')
+
+logger = logging.getLogger('analytics')
+
+CAPTION_MODEL = 'Salesforce/blip-image-captioning-base'
+CLASSIFIER_MODEL = 'google/vit-base-patch16-224'
+CAPTION_MAX_LENGTH = 50
+TOP_K_LABELS = 5
+
+_STOP = object()
+
+
+BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+
+
+def build_vision_models(backend=None, num_beams=None):
+    """Models on `backend` (default INFERENCE_BACKEND); ValueError for an unknown backend"""
+    backend = backend or settings.INFERENCE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    if not INFERENCE_AVAILABLE:
+        raise RuntimeError('Vision models require torch and transformers')
+    if backend.startswith('onnx') and not ONNX_AVAILABLE:
+        raise RuntimeError('The onnx backends require onnxruntime')
+    from .vision_models import BACKEND_CLASSES
+    return BACKEND_CLASSES[backend](num_beams=num_beams)
+
+
+class InferenceStats:
+    """Thread-safe throughput counters for one worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.images = 0
+        self.batches = 0
+        self.failed_images = 0
+        self.busy_seconds = 0.0
+        self.largest_batch = 0
+        self.started_at = time.monotonic()
+
+    def record(self, size, seconds):
+        with self._lock:
+            self.images += size
+            self.batches += 1
+            self.busy_seconds += seconds
+            self.largest_batch = max(self.largest_batch, size)
+
+    def record_failure(self, size):
+        with self._lock:
+            self.failed_images += size
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.monotonic() - self.started_at
+            return {
+                'images': self.images,
+                'batches': self.batches,
+                'failed_images': self.failed_images,
+                'avg_batch_size': round(self.images / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'busy_seconds': round(self.busy_seconds, 3),
+                # While inferring vs. over the worker's whole lifetime
+                'images_per_second': round(self.images / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+                'overall_images_per_second': round(self.images / uptime, 2) if uptime else 0.0,
+            }
+
+
+class InferenceWorker:
+    """
+    Single consumer thread batching submitted images through `models`
+    (anything with caption_batch(images) and classify_batch(images)).
+    Each future resolves to {'caption': str, 'labels': [{'label', 'score'}, ...]}.
+    """
+
+    def __init__(self, models, max_batch_size=None, max_wait=None):
+        self.models = models
+        self.max_batch_size = max(1, max_batch_size or settings.INFERENCE_MAX_BATCH_SIZE)
+        self.max_wait = max_wait if max_wait is not None else settings.INFERENCE_MAX_WAIT_MS / 1000
+        self.stats = InferenceStats()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, image):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((image, future))
+        return future
+
+    def infer_many(self, images):
+        """Submit everything up front so it lands in as few batches as possible"""
+        futures = [self.submit(image) for image in images]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            if wait:
+                thread.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='analytics-inference', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        """Block for one item, then gather more until the batch is full or max_wait passes"""
+        batch = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.max_wait
+        while item is not _STOP:
+            batch.append(item)
+            if len(batch) >= self.max_batch_size:
+                break
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        return batch, item is _STOP
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._infer(batch)
+
+    def _infer(self, batch):
+        images = [image for image, _ in batch]
+        started = time.perf_counter()
+        try:
+            captions = self.models.caption_batch(images)
+            labels = self.models.classify_batch(images)
+        except Exception as e:
+            logger.error(f"Inference batch of {len(batch)} images failed: {e}")
+            self.stats.record_failure(len(batch))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - started
+        self.stats.record(len(batch), elapsed)
+        logger.debug(f"Inferred {len(batch)} images in {elapsed:.2f}s ({len(batch) / elapsed:.1f} images/s)")
+        for (_, future), caption, top in zip(batch, captions, labels):
+            future.set_result({'caption': caption, 'labels': top})
+
+
+# ================================
+# PROCESS-WIDE INSTANCES
+# ================================
+
+_lock = threading.Lock()
+_worker = None
+
+
+def get_vision_models():
+    """The process's VisionModels, loaded on first call; None if unavailable"""
+    return get_model(VISION_MODELS)
+
+
+def load_configured_models():
+    """INFERENCE_BACKEND, falling back to plain PyTorch if that backend can't be loaded"""
+    if not INFERENCE_AVAILABLE:
+        return None
+    backend = settings.INFERENCE_BACKEND
+    try:
+        return build_vision_models(backend)
+    except Exception as e:
+        logger.error(f"Failed to load vision models on the '{backend}' backend: {e}")
+    if backend == 'torch':
+        return None
+    try:
+        return build_vision_models('torch')
+    except Exception as e:
+        logger.error(f"Failed to load vision models: {e}")
+        return None
+
+
+def get_inference_worker():
+    """The process's InferenceWorker, or None when the models can't be loaded"""
+    global _worker
+    models = get_vision_models()
+    if models is None:
+        return None
+    with _lock:
+        if _worker is None:
+            _worker = InferenceWorker(models)
+        return _worker
+
+
+def inference_stats():
+    return _worker.stats.snapshot() if _worker is not None else None
+
+
+def _reset_worker_after_fork():
+    # Threads don't survive fork: a prefork child starts its own worker thread,
+    # reusing weights already loaded in the parent.
+    global _worker, _lock
+    _lock = threading.Lock()
+    _worker = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_worker_after_fork)
@@ -0,0 +1,95 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.data_processing import DataProcessor
+from analytics.engine import EngagementEngine
+from influencers.models import Influencer
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the per-item DataProcessor metric helpers against the columnar '
+        'EngagementEngine (per influencer and batched) and check they agree. Read-only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=200, help='Influencers to include (most content first)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation; the best is reported')
+
+    def handle(self, *args, **options):
+        influencer_ids = list(
+            Influencer.objects.order_by('-posts_count', 'id').values_list('id', flat=True)[:options['limit']]
+        )
+        if not influencer_ids:
+            raise CommandError('No influencers to benchmark')
+        influencers = Influencer.objects.in_bulk(influencer_ids)
+        processor = DataProcessor()
+
+        def legacy():
+            results = {}
+            for influencer_id in influencer_ids:
+                influencer = influencers[influencer_id]
+                posts, reels = influencer.posts.all(), influencer.reels.all()
+                results[influencer_id] = {
+                    'consistency_score': processor._calculate_consistency_score(posts, reels),
+                    'high_performing_content_ratio': processor._calculate_high_performing_ratio(posts, reels),
+                    'image_engagement_rate': processor._calculate_image_engagement_rate(posts),
+                    'content_type_performance': processor._analyze_content_types(posts, reels),
+                    'vibe_performance': processor._analyze_vibe_performance(posts, reels),
+                }
+            return results
+
+        def engine_results(engine):
+            consistency = engine.consistency_scores()
+            high_performing = engine.high_performing_ratios()
+            image_rates = engine.image_engagement_rates()
+            content_types = engine.content_type_performance()
+            vibes = engine.vibe_performance()
+            return {
+                int(influencer_id): {
+                    'consistency_score': float(consistency[index]),
+                    'high_performing_content_ratio': float(high_performing[index]),
+                    'image_engagement_rate': float(image_rates[index]),
+                    'content_type_performance': content_types[int(influencer_id)],
+                    'vibe_performance': vibes[int(influencer_id)],
+                }
+                for index, influencer_id in enumerate(engine.columns.influencer_ids)
+            }
+
+        def per_influencer():
+            results = {}
+            for influencer_id in influencer_ids:
+                results.update(engine_results(EngagementEngine.for_influencers([influencer_id])))
+            return results
+
+        def batched():
+            return engine_results(EngagementEngine.for_influencers(influencer_ids))
+
+        timings = {}
+        outputs = {}
+        for name, implementation in (('legacy', legacy), ('engine', per_influencer), ('engine-batch', batched)):
+            best = None
+            for _ in range(max(1, options['repeat'])):
+                started = time.perf_counter()
+                outputs[name] = implementation()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+
+        self.stdout.write(f"{len(influencer_ids)} influencers, best of {options['repeat']}:")
+        for name, seconds in timings.items():
+            speedup = timings['legacy'] / seconds if seconds else float('inf')
+            self.stdout.write(f"  {name:<13} {seconds * 1000:9.1f} ms  x{speedup:.1f}")
+
+        mismatched = [
+            influencer_id for influencer_id in influencer_ids
+            if not (outputs['legacy'][influencer_id] == outputs['engine'][influencer_id]
+                    == outputs['engine-batch'][influencer_id])
+        ]
+        if mismatched:
+            self.stdout.write(self.style.WARNING(
+                f"{len(mismatched)} influencers differ from the legacy results, e.g. id {mismatched[0]}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('All implementations agree'))
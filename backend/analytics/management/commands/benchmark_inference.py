@@ -0,0 +1,135 @@
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from analytics.inference import BACKENDS, INFERENCE_AVAILABLE, build_vision_models
+
+REFERENCE = ('torch', 5)
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+def token_f1(caption, reference):
+    """Bag-of-words F1 between two captions (1.0 for identical word multisets)"""
+    words, expected = caption.lower().split(), reference.lower().split()
+    if not words or not expected:
+        return float(words == expected)
+    remaining = list(expected)
+    common = 0
+    for word in words:
+        if word in remaining:
+            remaining.remove(word)
+            common += 1
+    if not common:
+        return 0.0
+    precision, recall = common / len(words), common / len(expected)
+    return 2 * precision * recall / (precision + recall)
+
+
+def agreement(outputs, reference):
+    """Caption and top-label agreement of `outputs` with `reference` (both lists of (caption, labels))"""
+    pairs = list(zip(outputs, reference))
+    return {
+        'exact': sum(caption == expected for (caption, _), (expected, _) in pairs) / len(pairs),
+        'token_f1': statistics.mean(token_f1(caption, expected) for (caption, _), (expected, _) in pairs),
+        'top_label': sum(
+            labels[0]['label'] == expected[0]['label'] for (_, labels), (_, expected) in pairs
+        ) / len(pairs),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Time BLIP captioning + ViT classification on each inference backend and beam count '
+        '(load time, single-image latency, batch throughput) and compare captions and top '
+        'labels with the full-precision PyTorch, 5-beam reference.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', default=','.join(BACKENDS), help='Comma-separated backends to run')
+        parser.add_argument('--beams', default='5,1', help='Comma-separated caption beam counts (1 = greedy)')
+        parser.add_argument('--images-dir', help='Directory of images to use (default: bundled sample images)')
+        parser.add_argument('--count', type=int, default=32, help='Images to run, cycling the inputs as needed')
+        parser.add_argument('--batch-size', type=int, default=16, help='Images per batch in the throughput run')
+        parser.add_argument('--latency-runs', type=int, default=8, help='Single-image calls timed per variant')
+
+    def handle(self, *args, **options):
+        if not INFERENCE_AVAILABLE:
+            raise CommandError('torch and transformers are required')
+        backends = [name.strip() for name in options['backends'].split(',') if name.strip()]
+        unknown = [name for name in backends if name not in BACKENDS]
+        if unknown:
+            raise CommandError(f"Unknown backends: {', '.join(unknown)} (expected {', '.join(BACKENDS)})")
+        beams = [int(value) for value in options['beams'].split(',')]
+        images = self._load_images(options['images_dir'], options['count'])
+
+        variants = [REFERENCE] + [
+            (backend, num_beams) for backend in backends for num_beams in beams if (backend, num_beams) != REFERENCE
+        ]
+        results = {}
+        for backend, num_beams in variants:
+            try:
+                results[(backend, num_beams)] = self._run(backend, num_beams, images, options)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"{backend} beams={num_beams}: {e}"))
+        if REFERENCE not in results:
+            raise CommandError('The PyTorch reference could not be run')
+
+        reference = results[REFERENCE]
+        self.stdout.write(f"{len(images)} images, batches of {options['batch_size']}:")
+        self.stdout.write(
+            f"  {'backend':<11} {'beams':>5} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>7} "
+            f"{'x':>5} {'exact':>6} {'tok F1':>6} {'top-1':>6}"
+        )
+        for (backend, num_beams), result in results.items():
+            match = agreement(result['outputs'], reference['outputs'])
+            speedup = result['throughput'] / reference['throughput'] if reference['throughput'] else 0.0
+            self.stdout.write(
+                f"  {backend:<11} {num_beams:>5} {result['load']:7.1f} {result['p50'] * 1000:8.0f} "
+                f"{result['p95'] * 1000:8.0f} {result['throughput']:7.2f} {speedup:5.1f} "
+                f"{match['exact']:6.0%} {match['token_f1']:6.2f} {match['top_label']:6.0%}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Reference: {REFERENCE[0]}, {REFERENCE[1]} beams"))
+
+    def _run(self, backend, num_beams, images, options):
+        started = time.perf_counter()
+        models = build_vision_models(backend, num_beams=num_beams)
+        load = time.perf_counter() - started
+
+        def infer(batch):
+            return list(zip(models.caption_batch(batch), models.classify_batch(batch)))
+
+        infer(images[:1])  # warm-up
+        latencies = []
+        for index in range(max(1, options['latency_runs'])):
+            started = time.perf_counter()
+            infer([images[index % len(images)]])
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+
+        batch_size = max(1, options['batch_size'])
+        outputs = []
+        started = time.perf_counter()
+        for offset in range(0, len(images), batch_size):
+            outputs.extend(infer(images[offset:offset + batch_size]))
+        elapsed = time.perf_counter() - started
+        return {
+            'load': load,
+            'p50': latencies[len(latencies) // 2],
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            'throughput': len(images) / elapsed if elapsed else 0.0,
+            'outputs': outputs,
+        }
+
+    def _load_images(self, images_dir, count):
+        if images_dir:
+            paths = sorted(path for path in Path(images_dir).iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+            sources = [Image.open(path).convert('RGB') for path in paths]
+        else:
+            from sklearn.datasets import load_sample_images
+            sources = [Image.fromarray(image) for image in load_sample_images().images]
+        if not sources:
+            raise CommandError(f"No images found in {images_dir}")
+        return [sources[index % len(sources)] for index in range(max(1, count))]
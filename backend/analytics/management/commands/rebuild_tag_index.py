@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import ContentTag
+from analytics.tags import rebuild_tag_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hashtag/mention index and its per-tag counters from posts and reels'
+
+    def handle(self, *args, **options):
+        rebuild_tag_index()
+        hashtags = ContentTag.objects.filter(kind=ContentTag.HASHTAG).count()
+        mentions = ContentTag.objects.filter(kind=ContentTag.MENTION).count()
+        self.stdout.write(self.style.SUCCESS(f"✅ Tag index rebuilt: {hashtags} hashtags, {mentions} mentions"))
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=50, unique=True)),
+                ('influencer_count', models.IntegerField(default=0)),
+                ('total_followers', models.BigIntegerField(default=0)),
+                ('posts_count', models.IntegerField(default=0)),
+                ('reels_count', models.IntegerField(default=0)),
+                ('total_likes', models.BigIntegerField(default=0)),
+                ('total_comments', models.BigIntegerField(default=0)),
+                ('avg_engagement_rate', models.FloatField(default=0.0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-avg_engagement_rate'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyEngagementRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('posts_count', models.IntegerField(default=0)),
+                ('reels_count', models.IntegerField(default=0)),
+                ('likes', models.BigIntegerField(default=0)),
+                ('comments', models.BigIntegerField(default=0)),
+                ('shares', models.BigIntegerField(default=0)),
+                ('saves', models.BigIntegerField(default=0)),
+                ('views', models.BigIntegerField(default=0)),
+                ('avg_engagement_rate', models.FloatField(default=0.0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlatformRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_influencers', models.IntegerField(default=0)),
+                ('total_followers', models.BigIntegerField(default=0)),
+                ('total_posts', models.IntegerField(default=0)),
+                ('total_reels', models.IntegerField(default=0)),
+                ('analyzed_posts', models.IntegerField(default=0)),
+                ('analyzed_reels', models.IntegerField(default=0)),
+                ('total_likes', models.BigIntegerField(default=0)),
+                ('total_comments', models.BigIntegerField(default=0)),
+                ('total_shares', models.BigIntegerField(default=0)),
+                ('total_saves', models.BigIntegerField(default=0)),
+                ('total_views', models.BigIntegerField(default=0)),
+                ('avg_engagement_rate', models.FloatField(default=0.0)),
+                ('top_performers', models.JSONField(blank=True, default=list)),
+                ('vibe_distribution', models.JSONField(blank=True, default=dict)),
+                ('media_type_performance', models.JSONField(blank=True, default=dict)),
+                ('posting_hours', models.JSONField(blank=True, default=dict)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('content_watermark', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.PositiveSmallIntegerField(choices=[(0, 'Platform'), (1, 'Influencer'), (2, 'Post'), (3, 'Reel')])),
+                ('entity_id', models.BigIntegerField()),
+                ('granularity', models.CharField(choices=[('h', 'Hourly'), ('d', 'Daily'), ('w', 'Weekly')], default='h', max_length=1)),
+                ('bucket_start', models.DateTimeField()),
+                ('followers', models.BigIntegerField(blank=True, null=True)),
+                ('likes', models.BigIntegerField(default=0)),
+                ('comments', models.BigIntegerField(default=0)),
+                ('views', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='metric_snapshot_bucket_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metricsnapshot',
+            constraint=models.UniqueConstraint(fields=('entity_type', 'entity_id', 'granularity', 'bucket_start'), name='metric_snapshot_bucket_uniq'),
+        ),
+    ]
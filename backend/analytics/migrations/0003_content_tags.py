@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_metric_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('h', 'Hashtag'), ('m', 'Mention')], max_length=1)),
+                ('name', models.CharField(max_length=150)),
+                ('usage_count', models.IntegerField(default=0)),
+                ('total_likes', models.BigIntegerField(default=0)),
+                ('total_comments', models.BigIntegerField(default=0)),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContentTagUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('h', 'Hashtag'), ('m', 'Mention')], max_length=1)),
+                ('entity_type', models.PositiveSmallIntegerField(choices=[(2, 'Post'), (3, 'Reel')])),
+                ('entity_id', models.BigIntegerField()),
+                ('influencer_id', models.BigIntegerField()),
+                ('posted_at', models.DateTimeField(blank=True, null=True)),
+                ('likes', models.BigIntegerField(default=0)),
+                ('comments', models.BigIntegerField(default=0)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usages', to='analytics.contenttag')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='contenttag',
+            index=models.Index(fields=['kind', '-usage_count'], name='content_tag_usage_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='contenttag',
+            constraint=models.UniqueConstraint(fields=('kind', 'name'), name='content_tag_kind_name_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='contenttagusage',
+            index=models.Index(fields=['kind', 'posted_at'], name='content_tag_usage_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contenttagusage',
+            index=models.Index(fields=['tag', 'posted_at'], name='content_tag_usage_tag_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='contenttagusage',
+            constraint=models.UniqueConstraint(fields=('entity_type', 'entity_id', 'tag'), name='content_tag_usage_uniq'),
+        ),
+    ]
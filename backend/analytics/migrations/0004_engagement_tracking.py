@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencers', '0003_search_index'),
+        ('analytics', '0003_content_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EngagementTrackingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('full', models.BooleanField(default=False)),
+                ('influencers_total', models.IntegerField(default=0)),
+                ('recomputed', models.IntegerField(default=0)),
+                ('skipped', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EngagementTrackingState',
+            fields=[
+                ('influencer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='engagement_state', serialize=False, to='influencers.influencer')),
+                ('followers_count', models.IntegerField(default=0)),
+                ('dirty', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_engagement_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyRollupDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# analytics/ml_models.py
+"""
+Models the analytics app loads through core.model_registry. Registering is
+cheap: each loader imports its libraries the first time it runs.
+"""
+from core.model_registry import register_model
+
+VISION_MODELS = 'analytics.vision'
+NLTK_DATA = 'analytics.nltk-data'
+
+
+def _load_vision_models():
+    from .inference import load_configured_models
+    return load_configured_models()
+
+
+def _load_nltk_data():
+    """nltk, with the tokenizer and stopword corpora downloaded if they are missing"""
+    import nltk
+    for resource, package in (('tokenizers/punkt', 'punkt'), ('corpora/stopwords', 'stopwords')):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package)
+    return nltk
+
+
+register_model(VISION_MODELS, _load_vision_models)
+# nltk and textblob take seconds to import, so they load on the first caption
+register_model(NLTK_DATA, _load_nltk_data)
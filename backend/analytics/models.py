@@ -1,3 +1,252 @@
 from django.db import models
 
-# Create your models here.
+
+class PlatformRollup(models.Model):
+    """
+    Single-row summary of the whole platform, rebuilt by the
+    refresh_analytics_rollups beat task (see analytics/rollups.py).
+    Overview/trends/insights endpoints read this instead of scanning content.
+    """
+    SINGLETON_ID = 1
+
+    # Platform totals
+    total_influencers = models.IntegerField(default=0)
+    total_followers = models.BigIntegerField(default=0)
+    total_posts = models.IntegerField(default=0)
+    total_reels = models.IntegerField(default=0)
+    analyzed_posts = models.IntegerField(default=0)
+    analyzed_reels = models.IntegerField(default=0)
+
+    # Engagement totals across posts and reels
+    total_likes = models.BigIntegerField(default=0)
+    total_comments = models.BigIntegerField(default=0)
+    total_shares = models.BigIntegerField(default=0)
+    total_saves = models.BigIntegerField(default=0)
+    total_views = models.BigIntegerField(default=0)
+    avg_engagement_rate = models.FloatField(default=0.0)
+
+    # Pre-shaped breakdowns
+    top_performers = models.JSONField(default=list, blank=True)
+    vibe_distribution = models.JSONField(default=dict, blank=True)
+    media_type_performance = models.JSONField(default=dict, blank=True)
+    posting_hours = models.JSONField(default=dict, blank=True)
+
+    # Refresh bookkeeping
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    content_watermark = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Platform rollup @ {self.refreshed_at}"
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=cls.SINGLETON_ID).first()
+
+
+class CategoryRollup(models.Model):
+    """Per influencer-category aggregates"""
+    category = models.CharField(max_length=50, unique=True)
+    influencer_count = models.IntegerField(default=0)
+    total_followers = models.BigIntegerField(default=0)
+    posts_count = models.IntegerField(default=0)
+    reels_count = models.IntegerField(default=0)
+    total_likes = models.BigIntegerField(default=0)
+    total_comments = models.BigIntegerField(default=0)
+    avg_engagement_rate = models.FloatField(default=0.0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-avg_engagement_rate']
+
+    def __str__(self):
+        return f"{self.category} rollup"
+
+
+class DailyEngagementRollup(models.Model):
+    """Engagement of content posted on a given day, bucketed by posted_at date"""
+    day = models.DateField(unique=True)
+    posts_count = models.IntegerField(default=0)
+    reels_count = models.IntegerField(default=0)
+    likes = models.BigIntegerField(default=0)
+    comments = models.BigIntegerField(default=0)
+    shares = models.BigIntegerField(default=0)
+    saves = models.BigIntegerField(default=0)
+    views = models.BigIntegerField(default=0)
+    avg_engagement_rate = models.FloatField(default=0.0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"Engagement {self.day}"
+
+    @property
+    def content_count(self):
+        return self.posts_count + self.reels_count
+
+
+class DirtyRollupDay(models.Model):
+    """
+    A day whose DailyEngagementRollup lost content: deletes leave no
+    updated_at behind, so the post_delete signal records the posted_at day
+    for the next refresh to recompute.
+    """
+    day = models.DateField(unique=True)
+
+    def __str__(self):
+        return f"Dirty rollup day {self.day}"
+
+
+class MetricSnapshot(models.Model):
+    """
+    Append-only counter history, one row per (entity, granularity, bucket).
+
+    The scrape pipeline writes hourly samples; compact_metric_snapshots rolls
+    them up hour -> day -> week (last sample in the bucket wins, since the
+    counters are running totals) and prunes each level past its retention.
+    """
+    ENTITY_PLATFORM = 0
+    ENTITY_INFLUENCER = 1
+    ENTITY_POST = 2
+    ENTITY_REEL = 3
+    ENTITY_CHOICES = [
+        (ENTITY_PLATFORM, 'Platform'),
+        (ENTITY_INFLUENCER, 'Influencer'),
+        (ENTITY_POST, 'Post'),
+        (ENTITY_REEL, 'Reel'),
+    ]
+
+    HOUR = 'h'
+    DAY = 'd'
+    WEEK = 'w'
+    GRANULARITY_CHOICES = [
+        (HOUR, 'Hourly'),
+        (DAY, 'Daily'),
+        (WEEK, 'Weekly'),
+    ]
+
+    entity_type = models.PositiveSmallIntegerField(choices=ENTITY_CHOICES)
+    entity_id = models.BigIntegerField()
+    granularity = models.CharField(max_length=1, choices=GRANULARITY_CHOICES, default=HOUR)
+    bucket_start = models.DateTimeField()
+
+    # Running totals as of the last sample in the bucket
+    followers = models.BigIntegerField(null=True, blank=True)
+    likes = models.BigIntegerField(default=0)
+    comments = models.BigIntegerField(default=0)
+    views = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['entity_type', 'entity_id', 'granularity', 'bucket_start'],
+                name='metric_snapshot_bucket_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start'], name='metric_snapshot_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entity_type_display()} {self.entity_id} @ {self.bucket_start} ({self.granularity})"
+
+
+class ContentTag(models.Model):
+    """
+    One row per distinct hashtag or mention, with running counters kept by
+    analytics/tags.py as content is ingested - "top hashtags" reads these
+    directly instead of decoding every post's JSON.
+    """
+    HASHTAG = 'h'
+    MENTION = 'm'
+    KIND_CHOICES = [
+        (HASHTAG, 'Hashtag'),
+        (MENTION, 'Mention'),
+    ]
+
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    name = models.CharField(max_length=150)
+
+    # Incremental counters across every post/reel currently carrying the tag
+    usage_count = models.IntegerField(default=0)
+    total_likes = models.BigIntegerField(default=0)
+    total_comments = models.BigIntegerField(default=0)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'name'], name='content_tag_kind_name_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', '-usage_count'], name='content_tag_usage_idx'),
+        ]
+
+    def __str__(self):
+        prefix = '#' if self.kind == self.HASHTAG else '@'
+        return f"{prefix}{self.name}"
+
+
+class ContentTagUsage(models.Model):
+    """
+    Inverted index entry: tag -> post/reel, with the item's engagement as of
+    its last ingest so counter deltas can be applied on re-scrape.
+    """
+    ENTITY_CHOICES = [
+        (MetricSnapshot.ENTITY_POST, 'Post'),
+        (MetricSnapshot.ENTITY_REEL, 'Reel'),
+    ]
+
+    tag = models.ForeignKey(ContentTag, on_delete=models.CASCADE, related_name='usages')
+    kind = models.CharField(max_length=1, choices=ContentTag.KIND_CHOICES)
+    entity_type = models.PositiveSmallIntegerField(choices=ENTITY_CHOICES)
+    entity_id = models.BigIntegerField()
+    influencer_id = models.BigIntegerField()
+    posted_at = models.DateTimeField(null=True, blank=True)
+    likes = models.BigIntegerField(default=0)
+    comments = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['entity_type', 'entity_id', 'tag'], name='content_tag_usage_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'posted_at'], name='content_tag_usage_window_idx'),
+            models.Index(fields=['tag', 'posted_at'], name='content_tag_usage_tag_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag} on {self.get_entity_type_display()} {self.entity_id}"
+
+
+class EngagementTrackingState(models.Model):
+    """
+    What the hourly engagement tracker last computed an influencer from.
+    `dirty` is set when content is deleted (which leaves no updated_at behind).
+    """
+    influencer = models.OneToOneField(
+        'influencers.Influencer', on_delete=models.CASCADE, primary_key=True, related_name='engagement_state'
+    )
+    followers_count = models.IntegerField(default=0)
+    dirty = models.BooleanField(default=False)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Engagement state for influencer {self.influencer_id}"
+
+
+class EngagementTrackingRun(models.Model):
+    """Per-run stats of track_engagement_metrics; the last finished run's start is the next watermark"""
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    full = models.BooleanField(default=False)
+    influencers_total = models.IntegerField(default=0)
+    recomputed = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Engagement tracking @ {self.started_at}: {self.recomputed} recomputed, {self.skipped} skipped"
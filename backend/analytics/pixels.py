@@ -0,0 +1,207 @@
+# analytics/pixels.py
+"""
+Shared pixel preprocessing for ImageAnalyzer's quality and color metrics.
+
+prepare_batch() takes every image of an analysis batch at once:
+
+* each image is shrunk (INTER_AREA) to at most WORKING_MAX_SIDE on the long
+  side, and its greyscale version and Canny edges (composition) are computed
+  there;
+* the image-global statistics - brightness, contrast, greyscale histogram,
+  thumbnail sharpness and the dominant color palette - come from one
+  batch_pixel_stats() call on an (N, THUMBNAIL_SIDE, THUMBNAIL_SIDE, 3) stack
+  of thumbnails. Square thumbnails keep color shares and the brightness
+  distribution.
+
+The sharpness that ImageAnalyzer scores is deliberately still computed per
+image, as the variance of the Laplacian of the full-resolution greyscale
+image (Pixels.laplacian_var). That variance grows as an image is downscaled,
+so the thumbnail figure (BatchStats.sharpness) is only comparable between
+thumbnails; the quality scores and their golden values are calibrated on the
+full-resolution one. The full-resolution grey buffer lives only for that one
+filter call.
+
+The palette is a weighted k-means over each thumbnail's color histogram.
+Pixels are binned to PALETTE_BITS bits per channel, and Lloyd iterations run
+for all images together on the occupied bins' mean colors, weighted by pixel
+count, instead of one scikit-learn KMeans per image. Seeding is a greedy,
+deterministic k-means++. Colors come back ordered by the share of the image
+they cover.
+"""
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+WORKING_MAX_SIDE = 512
+THUMBNAIL_SIDE = 256
+PALETTE_SIZE = 5
+PALETTE_BITS = 4
+PALETTE_STRIDE = 2
+PALETTE_ITERATIONS = 12
+CANNY_THRESHOLDS = (50, 150)
+
+
+@dataclass
+class ImageStats:
+    """One image's row of a batch_pixel_stats() result"""
+    brightness: float
+    contrast: float
+    histogram: np.ndarray    # normalized 256-bin greyscale histogram
+    sharpness: float         # Laplacian variance of the thumbnail
+    palette: np.ndarray      # (k, 3) BGR centers, most common first
+    palette_weights: np.ndarray
+
+
+@dataclass
+class BatchStats:
+    brightness: np.ndarray       # (N,)
+    contrast: np.ndarray         # (N,)
+    histograms: np.ndarray       # (N, 256)
+    sharpness: np.ndarray        # (N,)
+    palettes: np.ndarray         # (N, k, 3)
+    palette_weights: np.ndarray  # (N, k)
+
+    def __len__(self):
+        return len(self.brightness)
+
+    def __getitem__(self, index) -> ImageStats:
+        return ImageStats(
+            brightness=float(self.brightness[index]),
+            contrast=float(self.contrast[index]),
+            histogram=self.histograms[index],
+            sharpness=float(self.sharpness[index]),
+            palette=self.palettes[index],
+            palette_weights=self.palette_weights[index],
+        )
+
+
+@dataclass
+class Pixels:
+    stats: ImageStats
+    gray: np.ndarray         # at working resolution
+    edges: np.ndarray        # Canny, 0/255
+    laplacian_var: float     # at full resolution
+
+
+def working_resolution(image_cv, max_side: int = WORKING_MAX_SIDE):
+    """The image shrunk so its long side is at most `max_side` (never enlarged)"""
+    height, width = image_cv.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return image_cv
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image_cv, size, interpolation=cv2.INTER_AREA)
+
+
+def thumbnail_stack(images: list, side: int = THUMBNAIL_SIDE) -> np.ndarray:
+    """(N, side, side, 3) uint8 array of BGR images squashed to thumbnails"""
+    stack = np.empty((len(images), side, side, 3), dtype=np.uint8)
+    for index, image_cv in enumerate(images):
+        interpolation = cv2.INTER_AREA if min(image_cv.shape[:2]) >= side else cv2.INTER_LINEAR
+        stack[index] = cv2.resize(image_cv, (side, side), interpolation=interpolation)
+    return stack
+
+
+def batch_pixel_stats(stack: np.ndarray, palette_size: int = PALETTE_SIZE) -> BatchStats:
+    """Brightness, contrast, histogram, sharpness and palette for every thumbnail in `stack`"""
+    count, side = stack.shape[:2]
+    # The stack is also one tall image, so each OpenCV call covers the whole batch
+    tall = cv2.cvtColor(stack.reshape(count * side, side, 3), cv2.COLOR_BGR2GRAY)
+    gray = tall.reshape(count, side * side)
+    # Rows next to a seam see the neighbouring thumbnail; drop each one's top and bottom row
+    laplacian = cv2.Laplacian(tall, cv2.CV_16S).reshape(count, side, side)[:, 1:-1]
+
+    offsets = np.arange(count, dtype=np.int64)[:, None] * 256
+    histograms = np.bincount((gray + offsets).ravel(), minlength=count * 256).reshape(count, 256)
+
+    palettes, weights = _batch_palettes(stack[:, ::PALETTE_STRIDE, ::PALETTE_STRIDE], palette_size)
+    return BatchStats(
+        brightness=gray.mean(axis=1),
+        contrast=gray.std(axis=1),
+        histograms=histograms / gray.shape[1],
+        sharpness=laplacian.reshape(count, -1).var(axis=1),
+        palettes=palettes,
+        palette_weights=weights,
+    )
+
+
+def _batch_palettes(stack, size, bits=PALETTE_BITS, iterations=PALETTE_ITERATIONS):
+    """Weighted k-means over the binned colors of every image at once"""
+    count = len(stack)
+    bins = 1 << (3 * bits)
+    pixels = stack.reshape(count, -1, 3)
+    binned = (pixels >> (8 - bits)).astype(np.int64)
+    codes = (binned[..., 0] << (2 * bits)) | (binned[..., 1] << bits) | binned[..., 2]
+    codes = (codes + np.arange(count)[:, None] * bins).ravel()
+
+    weights = np.bincount(codes, minlength=count * bins).reshape(count, bins).astype(np.float64)
+    sums = np.stack(
+        [np.bincount(codes, weights=pixels[..., channel].ravel(), minlength=count * bins) for channel in range(3)],
+        axis=-1,
+    ).reshape(count, bins, 3)
+    # Only occupied bins take part: keep the heaviest `occupied` bins of every
+    # image, where `occupied` is the most any image in the batch uses
+    occupied = max(1, int((weights > 0).sum(axis=1).max()))
+    keep = np.argsort(-weights, axis=1, kind='stable')[:, :occupied]
+    weights = np.take_along_axis(weights, keep, axis=1)
+    sums = np.take_along_axis(sums, keep[..., None], axis=1)
+    # Mean color of the pixels in each bin, not the bin corner (padding bins have no weight)
+    points = sums / np.maximum(weights, 1)[..., None]
+
+    # Greedy k-means++ seeding, made deterministic: start from the most common
+    # bin, then repeatedly take the bin with the largest weight * squared
+    # distance to the centers chosen so far
+    rows = np.arange(count)
+    centers = np.empty((count, size, 3))
+    centers[:, 0] = points[rows, weights.argmax(axis=1)]
+    nearest = ((points - centers[:, :1]) ** 2).sum(axis=-1)
+    for cluster in range(1, size):
+        centers[:, cluster] = points[rows, (weights * nearest).argmax(axis=1)]
+        nearest = np.minimum(nearest, ((points - centers[:, cluster:cluster + 1]) ** 2).sum(axis=-1))
+
+    squared = (points ** 2).sum(axis=-1, keepdims=True)
+    offsets = rows[:, None] * size
+    for _ in range(iterations):
+        # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, as one batched matmul
+        distances = squared - 2 * points @ centers.transpose(0, 2, 1) + (centers ** 2).sum(axis=-1)[:, None, :]
+        labels = (distances.argmin(axis=-1) + offsets).ravel()
+        totals = np.bincount(labels, weights=weights.ravel(), minlength=count * size).reshape(count, size)
+        updated = np.stack(
+            [np.bincount(labels, weights=(weights * points[..., channel]).ravel(), minlength=count * size)
+             for channel in range(3)],
+            axis=-1,
+        ).reshape(count, size, 3) / np.maximum(totals, 1e-9)[..., None]
+        centers = np.where(totals[..., None] > 0, updated, centers)
+
+    shares = totals / weights.sum(axis=1, keepdims=True)
+    ranking = np.argsort(-shares, axis=1, kind='stable')
+    return np.take_along_axis(centers, ranking[..., None], axis=1), np.take_along_axis(shares, ranking, axis=1)
+
+
+def prepare_batch(images: list, max_side: int = WORKING_MAX_SIDE) -> list:
+    """
+    Pixels for every BGR image in `images`: one working-resolution resize,
+    grey conversion, Canny and full-resolution Laplacian per image, and one
+    batch_pixel_stats() call (on thumbnails of the working images) for all.
+    """
+    working = [working_resolution(image_cv, max_side) for image_cv in images]
+    stats = batch_pixel_stats(thumbnail_stack(working))
+    prepared = []
+    for index, (image_cv, small) in enumerate(zip(images, working)):
+        full_gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
+        laplacian_var = float(cv2.Laplacian(full_gray, cv2.CV_16S).var())
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small is not image_cv else full_gray
+        del full_gray
+        prepared.append(Pixels(
+            stats=stats[index],
+            gray=gray,
+            edges=cv2.Canny(gray, *CANNY_THRESHOLDS),
+            laplacian_var=laplacian_var,
+        ))
+    return prepared
+
+
+def prepare_pixels(image_cv, max_side: int = WORKING_MAX_SIDE) -> Pixels:
+    """prepare_batch() for a single image"""
+    return prepare_batch([image_cv], max_side)[0]
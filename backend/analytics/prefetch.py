@@ -0,0 +1,220 @@
+# analytics/prefetch.py
+"""
+Concurrent media prefetch ahead of the analyzers.
+
+A MediaPrefetcher downloads and decodes upcoming media on a thread pool
+(through the shared media store), while the caller runs inference on what
+already arrived. Decoded media is handed over through a queue in completion
+order, and next_batch() drains it into batches the way InferenceWorker does.
+
+Two limits keep the stage from running away:
+
+* in-flight bytes: every item reserves an estimate before its download
+  starts, and then its decoded size. The reservation is held until the
+  consumer calls release(). The feeder blocks while the budget
+  (PREFETCH_MAX_INFLIGHT_MB) is used up. A single oversized item is still let
+  through when nothing else is in flight;
+* per-host concurrency: at most PREFETCH_PER_HOST downloads per CDN host.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+logger = logging.getLogger('analytics')
+
+# Bytes reserved for an item before its real decoded size is known
+DEFAULT_ESTIMATE = 4 * 1024 * 1024
+BATCH_WAIT = 0.05
+
+
+@dataclass
+class Prefetched:
+    key: Any
+    url: str
+    value: Any = None
+    error: Optional[Exception] = None
+    nbytes: int = field(default=0, repr=False)
+
+
+def decoded_nbytes(value) -> int:
+    """Memory held by decoded media: numpy arrays, PIL images, and tuples/lists of them"""
+    if value is None:
+        return 0
+    if isinstance(value, (tuple, list)):
+        return sum(decoded_nbytes(item) for item in value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, 'size') and hasattr(value, 'getbands'):
+        width, height = value.size
+        return width * height * len(value.getbands())
+    return 0
+
+
+class ByteBudget:
+    """Blocking counter of reserved bytes with a soft upper limit"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self.cancelled = False
+        self._condition = threading.Condition()
+
+    def acquire(self, amount):
+        """Reserve `amount`; False if the budget was cancelled while waiting"""
+        with self._condition:
+            while self.used and self.used + amount > self.limit and not self.cancelled:
+                self._condition.wait()
+            if self.cancelled:
+                return False
+            self.used += amount
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def adjust(self, old, new):
+        with self._condition:
+            self.used += new - old
+            self.peak = max(self.peak, self.used)
+            self._condition.notify_all()
+
+    def release(self, amount):
+        with self._condition:
+            self.used -= amount
+            self._condition.notify_all()
+
+    def cancel(self):
+        with self._condition:
+            self.cancelled = True
+            self._condition.notify_all()
+
+
+class MediaPrefetcher:
+    """
+    `loader(url)` fetches and decodes one item on a pool thread (e.g.
+    ImageAnalyzer.load_image). submit() starts feeding (key, url) pairs in the
+    background; next_batch() returns up to n loaded items; release() returns
+    their bytes to the budget once the caller is done with them.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], workers=None, max_inflight_bytes=None,
+                 per_host=None, estimate=DEFAULT_ESTIMATE, measure=decoded_nbytes):
+        self.loader = loader
+        self.workers = max(1, workers or settings.PREFETCH_WORKERS)
+        self.budget = ByteBudget(max_inflight_bytes or settings.PREFETCH_MAX_INFLIGHT_MB * 1024 * 1024)
+        self.per_host = max(1, per_host or settings.PREFETCH_PER_HOST)
+        self.estimate = estimate
+        self.measure = measure
+        self._hosts = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self._hosts_lock = threading.Lock()
+        self._ready = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analytics-prefetch')
+        self._feeders = []
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._delivered = 0
+        self.loaded = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, items: Iterable):
+        """Queue (key, url) pairs; downloads start as soon as budget allows"""
+        items = list(items)
+        with self._lock:
+            self._submitted += len(items)
+        feeder = threading.Thread(target=self._feed, args=(items,), name='analytics-prefetch-feed', daemon=True)
+        self._feeders.append(feeder)
+        feeder.start()
+
+    def next_batch(self, size) -> list:
+        """
+        Block for the next loaded item, then take whatever else is ready
+        (up to `size`, waiting at most BATCH_WAIT). Empty once everything
+        submitted has been delivered.
+        """
+        batch = []
+        if self._pending() == 0:
+            return batch
+
+        started = time.monotonic()
+        batch.append(self._ready.get())
+        self.wait_seconds += time.monotonic() - started
+        deadline = time.monotonic() + BATCH_WAIT
+        while len(batch) < size and self._pending() > len(batch):
+            try:
+                batch.append(self._ready.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+
+        with self._lock:
+            self._delivered += len(batch)
+        return batch
+
+    def release(self, items):
+        """Hand the bytes of consumed items back to the budget"""
+        for item in items:
+            self.budget.release(item.nbytes)
+            item.nbytes = 0
+
+    def close(self):
+        """Stop feeding, drop downloads that haven't started, wait for running ones"""
+        self.budget.cancel()
+        for feeder in self._feeders:
+            feeder.join()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        return {
+            'loaded': self.loaded,
+            'failed': self.failed,
+            'workers': self.workers,
+            'peak_inflight_bytes': self.budget.peak,
+            'consumer_wait_seconds': round(self.wait_seconds, 3),
+        }
+
+    # ---- internals ----------------------------------------------------------
+
+    def _pending(self):
+        with self._lock:
+            return self._submitted - self._delivered
+
+    def _host(self, url):
+        with self._hosts_lock:
+            return self._hosts[urlsplit(url).netloc]
+
+    def _feed(self, items):
+        for key, url in items:
+            if not self.budget.acquire(self.estimate):
+                break
+            self._executor.submit(self._load, key, url)
+
+    def _load(self, key, url):
+        item = Prefetched(key=key, url=url, nbytes=self.estimate)
+        try:
+            with self._host(url):
+                item.value = self.loader(url)
+        except Exception as e:
+            logger.warning(f"Prefetch of {url} failed: {e}")
+            item.error = e
+        with self._lock:
+            if item.error is None:
+                self.loaded += 1
+            else:
+                self.failed += 1
+        actual = self.measure(item.value)
+        self.budget.adjust(item.nbytes, actual)
+        item.nbytes = actual
+        self._ready.put(item)
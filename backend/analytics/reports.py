@@ -0,0 +1,243 @@
+# analytics/reports.py
+"""
+Streaming weekly analytics report.
+
+Per-influencer rows come from one annotated Influencer queryset (content
+counts and engagement as correlated Count/Sum subqueries, follower tier as a
+CASE) read with values().iterator(), and are written straight to a gzipped
+JSONL or Parquet file under MEDIA_ROOT/ANALYTICS_REPORT_DIR. Only platform
+totals and a bounded top-performers heap are kept in memory, so the caller
+(generate_weekly_analytics_report) returns a file pointer and a summary
+rather than the whole roster.
+"""
+import gzip
+import heapq
+import json
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from influencers.models import Influencer
+from posts.models import Post
+from reels.models import Reel
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger('analytics')
+
+REPORT_VERSION = '3.0'
+REPORT_CHUNK_SIZE = 2000
+REPORT_FORMATS = {'jsonl': '.jsonl.gz', 'parquet': '.parquet'}
+TOP_PERFORMERS = 10
+TOP_PERFORMER_MIN_RATE = 3.0
+
+REPORT_FIELDS = [
+    'id', 'username', 'full_name', 'category', 'followers_count', 'is_verified', 'follower_tier',
+    'posts_count', 'reels_count', 'analyzed_posts', 'analyzed_reels',
+    'engagement_rate', 'avg_likes', 'avg_comments', 'total_engagement',
+    'last_scraped', 'metrics_computed_at',
+]
+
+_ARROW_TYPES = {
+    'id': 'int64', 'followers_count': 'int64', 'is_verified': 'bool',
+    'posts_count': 'int64', 'reels_count': 'int64', 'analyzed_posts': 'int64', 'analyzed_reels': 'int64',
+    'engagement_rate': 'float64', 'avg_likes': 'int64', 'avg_comments': 'int64', 'total_engagement': 'int64',
+    'last_scraped': 'timestamp', 'metrics_computed_at': 'timestamp',
+}
+
+
+def _content_subquery(model, aggregate):
+    rows = model.objects.filter(influencer=OuterRef('pk')).order_by().values('influencer')
+    return Coalesce(Subquery(rows.annotate(value=aggregate).values('value')), 0)
+
+
+def report_queryset():
+    """Every report column for every influencer, as one SELECT"""
+    engagement = Sum(F('likes_count') + F('comments_count'))
+    analyzed = Count('id', filter=Q(is_analyzed=True))
+    return (
+        Influencer.objects.order_by('id')
+        .annotate(
+            report_posts=_content_subquery(Post, Count('id')),
+            report_reels=_content_subquery(Reel, Count('id')),
+            analyzed_posts=_content_subquery(Post, analyzed),
+            analyzed_reels=_content_subquery(Reel, analyzed),
+            total_engagement=_content_subquery(Post, engagement) + _content_subquery(Reel, engagement),
+            follower_tier=Case(
+                When(followers_count__gt=1_000_000, then=Value('mega')),
+                When(followers_count__gt=100_000, then=Value('macro')),
+                When(followers_count__gt=10_000, then=Value('micro')),
+                When(followers_count__gt=1_000, then=Value('nano')),
+                default=Value('regular'),
+            ),
+            metrics_computed_at=F('engagement_state__computed_at'),
+        )
+        .values(
+            'id', 'username', 'full_name', 'category', 'followers_count', 'is_verified', 'follower_tier',
+            'report_posts', 'report_reels', 'analyzed_posts', 'analyzed_reels',
+            'engagement_rate', 'avg_likes', 'avg_comments', 'total_engagement',
+            'last_scraped', 'metrics_computed_at',
+        )
+    )
+
+
+def report_rows():
+    for row in report_queryset().iterator(chunk_size=REPORT_CHUNK_SIZE):
+        row['posts_count'] = row.pop('report_posts')
+        row['reels_count'] = row.pop('report_reels')
+        yield {field: row[field] for field in REPORT_FIELDS}
+
+
+class ReportSummary:
+    """Platform totals and the top performers, accumulated row by row"""
+
+    def __init__(self):
+        self.stats = {
+            'total_influencers': 0,
+            'total_followers': 0,
+            'total_posts': 0,
+            'total_reels': 0,
+            'analyzed_posts': 0,
+            'analyzed_reels': 0,
+            'total_engagement': 0,
+        }
+        self._top = []
+
+    def add(self, row):
+        stats = self.stats
+        stats['total_influencers'] += 1
+        stats['total_followers'] += row['followers_count']
+        stats['total_posts'] += row['posts_count']
+        stats['total_reels'] += row['reels_count']
+        stats['analyzed_posts'] += row['analyzed_posts']
+        stats['analyzed_reels'] += row['analyzed_reels']
+        stats['total_engagement'] += row['total_engagement']
+
+        if row['engagement_rate'] >= TOP_PERFORMER_MIN_RATE:
+            entry = (row['engagement_rate'], -row['id'], {
+                'username': row['username'],
+                'engagement_rate': row['engagement_rate'],
+                'followers': row['followers_count'],
+                'total_engagement': row['total_engagement'],
+            })
+            if len(self._top) < TOP_PERFORMERS:
+                heapq.heappush(self._top, entry)
+            else:
+                heapq.heappushpop(self._top, entry)
+
+    def as_dict(self):
+        stats = self.stats
+        count = stats['total_influencers']
+        averages = {}
+        if count:
+            averages = {
+                'avg_followers': stats['total_followers'] / count,
+                'avg_posts_per_influencer': stats['total_posts'] / count,
+                'avg_reels_per_influencer': stats['total_reels'] / count,
+                'platform_engagement_rate': (
+                    stats['total_engagement'] / stats['total_followers'] * 100 if stats['total_followers'] else 0
+                ),
+                'analysis_coverage': {
+                    'posts_analyzed_percentage': (
+                        stats['analyzed_posts'] / stats['total_posts'] * 100 if stats['total_posts'] else 0
+                    ),
+                    'reels_analyzed_percentage': (
+                        stats['analyzed_reels'] / stats['total_reels'] * 100 if stats['total_reels'] else 0
+                    ),
+                },
+            }
+        return {
+            'platform_statistics': dict(stats),
+            'platform_averages': averages,
+            'top_performers': [entry for _, _, entry in sorted(self._top, reverse=True)],
+        }
+
+
+# ================================
+# WRITERS
+# ================================
+
+def _write_jsonl(path, rows, summary):
+    with gzip.open(path, 'wt', encoding='utf-8') as output:
+        for row in rows:
+            summary.add(row)
+            output.write(json.dumps(row, default=str) + '\n')
+
+
+def _arrow_schema():
+    types = {
+        'int64': pa.int64(), 'bool': pa.bool_(), 'float64': pa.float64(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([(field, types.get(_ARROW_TYPES.get(field), pa.string())) for field in REPORT_FIELDS])
+
+
+def _write_parquet(path, rows, summary):
+    """One row group per REPORT_CHUNK_SIZE rows"""
+    schema = _arrow_schema()
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        chunk = []
+        for row in rows:
+            summary.add(row)
+            chunk.append(row)
+            if len(chunk) == REPORT_CHUNK_SIZE:
+                writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+                chunk = []
+        if chunk:
+            writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+
+
+_WRITERS = {'jsonl': _write_jsonl, 'parquet': _write_parquet}
+
+
+def write_weekly_report(fmt=None):
+    """
+    Stream the weekly report to MEDIA_ROOT/ANALYTICS_REPORT_DIR/weekly/ and
+    return {'report': pointer to the file, **summary}. The file appears
+    under its final name only once complete.
+    """
+    fmt = fmt or settings.ANALYTICS_REPORT_FORMAT
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown report format '{fmt}', expected one of {sorted(_WRITERS)}")
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        raise ValueError('Parquet reports require pyarrow')
+
+    generated_at = timezone.now()
+    relative = Path(settings.ANALYTICS_REPORT_DIR) / 'weekly' / (
+        f"weekly-{generated_at:%Y%m%d-%H%M%S}{REPORT_FORMATS[fmt]}"
+    )
+    path = Path(settings.MEDIA_ROOT) / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.partial')
+
+    summary = ReportSummary()
+    try:
+        _WRITERS[fmt](partial, report_rows(), summary)
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+    logger.info(f"Weekly report: {summary.stats['total_influencers']} influencers written to {path}")
+    return {
+        'report': {
+            'path': relative.as_posix(),
+            'url': f"{settings.MEDIA_URL}{relative.as_posix()}",
+            'format': fmt,
+            'rows': summary.stats['total_influencers'],
+            'bytes': path.stat().st_size,
+            'generated_at': generated_at.isoformat(),
+            'report_version': REPORT_VERSION,
+        },
+        **summary.as_dict(),
+    }
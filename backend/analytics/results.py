@@ -0,0 +1,125 @@
+# analytics/results.py
+"""
+Buffered persistence of post/reel analysis results.
+
+AnalysisResultWriter collects analyzed items and writes them a chunk at a
+time: one bulk_update for the items (plus one upserting bulk_create for an
+optional detail table) inside a single transaction, instead of an UPDATE,
+an upsert and a commit per item. A chunk that fails is retried item by item,
+so a bad row only loses itself.
+
+bulk_update sends no post_save, so the writer drops the cached analytics and
+HTTP responses of the affected influencers itself after each chunk.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from core.http_cache import invalidate_tags
+from core.signals import RESOURCE_TAGS
+
+from .cache import invalidate_influencer_analytics
+
+logger = logging.getLogger('analytics')
+
+
+class AnalysisResultWriter:
+    """
+    `apply(item, analysis)` copies an analysis onto the item in memory;
+    `fields` are the columns it sets. For a detail table, `build_detail(item,
+    analysis)` returns an unsaved `detail_model` row (or None), upserted on
+    `detail_key` with `detail_fields` updated on conflict.
+
+    Use as a context manager, or call close(), so the last partial chunk is
+    written.
+    """
+
+    def __init__(self, model, fields, apply, detail_model=None, build_detail=None,
+                 detail_key=None, detail_fields=None, chunk_size=None):
+        self.model = model
+        self.fields = list(fields)
+        self.apply = apply
+        self.detail_model = detail_model if build_detail else None
+        self.build_detail = build_detail
+        self.detail_key = detail_key
+        self.detail_fields = list(detail_fields or [])
+        self.chunk_size = max(1, chunk_size or settings.ANALYSIS_WRITE_CHUNK_SIZE)
+        self._pending = []
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, item, analysis):
+        """Buffer one result; False if it couldn't be applied (counted as failed)"""
+        try:
+            self.apply(item, analysis)
+            detail = self.build_detail(item, analysis) if self.detail_model is not None else None
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Could not apply analysis to {self.model.__name__} {item.pk}: {e}")
+            return False
+
+        self._pending.append((item, detail))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        chunk, self._pending = self._pending, []
+        if not chunk:
+            return
+
+        try:
+            with transaction.atomic():
+                self._write(chunk)
+            written = chunk
+        except Exception as e:
+            logger.warning(f"Bulk write of {len(chunk)} {self.model.__name__} results failed, retrying one by one: {e}")
+            written = []
+            for entry in chunk:
+                try:
+                    with transaction.atomic():
+                        self._write([entry])
+                    written.append(entry)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Could not save analysis for {self.model.__name__} {entry[0].pk}: {e}")
+
+        self.written += len(written)
+        self.flushes += 1
+        self._invalidate([item for item, _ in written])
+
+    def close(self):
+        self.flush()
+
+    def stats(self):
+        return {'written': self.written, 'failed': self.failed, 'flushes': self.flushes}
+
+    def _write(self, entries):
+        self.model.objects.bulk_update([item for item, _ in entries], self.fields)
+        details = [detail for _, detail in entries if detail is not None]
+        if details:
+            self.detail_model.objects.bulk_create(
+                details,
+                update_conflicts=True,
+                unique_fields=[self.detail_key],
+                update_fields=self.detail_fields,
+            )
+
+    def _invalidate(self, items):
+        influencer_ids = {item.influencer_id for item in items}
+        if not influencer_ids:
+            return
+        for influencer_id in influencer_ids:
+            invalidate_influencer_analytics(influencer_id)
+        invalidate_tags(
+            RESOURCE_TAGS[self.model._meta.model_name],
+            *(f'influencer:{influencer_id}' for influencer_id in influencer_ids),
+        )
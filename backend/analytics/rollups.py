@@ -0,0 +1,281 @@
+# analytics/rollups.py
+"""
+Platform/category/daily rollups behind the analytics overview endpoints.
+
+A refresh issues a fixed number of grouped aggregate queries, independent of
+roster size. Daily buckets are refreshed incrementally: only the days of
+content saved since the last watermark (Post/Reel.updated_at), days that lost
+content to a delete (DirtyRollupDay), and a trailing window, are recomputed.
+A weekly full rebuild (beat) catches anything else, such as content whose
+posted_at moved to another day.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Q, Sum
+from django.db.models.functions import Cast, ExtractHour, NullIf, TruncDate
+from django.utils import timezone
+
+from core.http_cache import invalidate_tags
+from influencers.models import Influencer
+from posts.models import Post
+from reels.models import Reel
+
+from .models import CategoryRollup, DailyEngagementRollup, DirtyRollupDay, PlatformRollup
+from .timeseries import record_platform_snapshot
+
+logger = logging.getLogger('analytics')
+
+# Days behind "today" that are always recomputed, since likes keep arriving
+TRAILING_DAYS = 7
+TOP_PERFORMERS = 10
+
+
+def engagement_rate_expression():
+    """Per-item (likes + comments) / followers * 100, NULL when followers is 0"""
+    return (
+        Cast(F('likes_count') + F('comments_count'), FloatField()) * 100
+        / NullIf(F('influencer__followers_count'), 0)
+    )
+
+
+def _engagement_aggregates():
+    return {
+        'count': Count('id'),
+        'likes': Sum('likes_count'),
+        'comments': Sum('comments_count'),
+        'shares': Sum('shares_count'),
+        'saves': Sum('saves_count'),
+        'views': Sum('views_count'),
+        'rate_sum': Sum(engagement_rate_expression()),
+        'rate_count': Count(engagement_rate_expression()),
+    }
+
+
+def _combined_rate(*rows):
+    rate_sum = sum(row.get('rate_sum') or 0 for row in rows)
+    rate_count = sum(row.get('rate_count') or 0 for row in rows)
+    return round(rate_sum / rate_count, 2) if rate_count else 0.0
+
+
+def refresh_rollups(full=False):
+    """
+    Rebuild PlatformRollup and CategoryRollup, and incrementally refresh
+    DailyEngagementRollup. Returns a small summary for the task result.
+    """
+    now = timezone.now()
+    previous = PlatformRollup.current()
+    watermark = None if full or previous is None else previous.content_watermark
+    # Taken before reading content so rows saved mid-refresh are picked up next run
+    new_watermark = _content_watermark()
+
+    days_refreshed = _refresh_daily(watermark, now)
+    categories = _refresh_categories()
+    _refresh_platform(now, new_watermark)
+    invalidate_tags('rollups')
+
+    logger.info(f"Analytics rollups refreshed: {days_refreshed} days, {categories} categories")
+    return {
+        'days_refreshed': days_refreshed,
+        'categories': categories,
+        'full_rebuild': watermark is None,
+        'refreshed_at': now.isoformat(),
+    }
+
+
+def _content_watermark():
+    watermarks = [
+        Post.objects.aggregate(latest=Max('updated_at'))['latest'],
+        Reel.objects.aggregate(latest=Max('updated_at'))['latest'],
+    ]
+    watermarks = [w for w in watermarks if w]
+    return max(watermarks) if watermarks else None
+
+
+def mark_day_dirty(posted_at):
+    """Have the next refresh recompute the daily bucket of content posted at `posted_at`"""
+    DirtyRollupDay.objects.bulk_create([DirtyRollupDay(day=timezone.localdate(posted_at))], ignore_conflicts=True)
+
+
+def _refresh_daily(watermark, now):
+    """Recompute the daily buckets touched since `watermark` (all of them when None)"""
+    posts = Post.objects.all()
+    reels = Reel.objects.all()
+    deleted_days = set(DirtyRollupDay.objects.values_list('day', flat=True))
+
+    if watermark is not None:
+        # >=: rows saved in the same instant as the watermark may not have been read
+        dirty_days = deleted_days | set(
+            Post.objects.filter(updated_at__gte=watermark)
+            .annotate(day=TruncDate('posted_at')).values_list('day', flat=True).distinct()
+        ) | set(
+            Reel.objects.filter(updated_at__gte=watermark)
+            .annotate(day=TruncDate('posted_at')).values_list('day', flat=True).distinct()
+        )
+        trailing_start = (now - timedelta(days=TRAILING_DAYS)).date()
+        day_filter = Q(posted_at__date__in=dirty_days) | Q(posted_at__date__gte=trailing_start)
+        posts = posts.filter(day_filter)
+        reels = reels.filter(day_filter)
+        stale = DailyEngagementRollup.objects.filter(Q(day__in=dirty_days) | Q(day__gte=trailing_start))
+    else:
+        stale = DailyEngagementRollup.objects.all()
+
+    buckets = defaultdict(dict)
+    for kind, queryset in (('posts', posts), ('reels', reels)):
+        rows = (
+            queryset.annotate(day=TruncDate('posted_at'))
+            .values('day')
+            .annotate(**_engagement_aggregates())
+            .order_by()
+        )
+        for row in rows:
+            buckets[row['day']][kind] = row
+
+    rollups = []
+    for day, kinds in buckets.items():
+        post_row = kinds.get('posts', {})
+        reel_row = kinds.get('reels', {})
+        rollups.append(DailyEngagementRollup(
+            day=day,
+            posts_count=post_row.get('count') or 0,
+            reels_count=reel_row.get('count') or 0,
+            likes=(post_row.get('likes') or 0) + (reel_row.get('likes') or 0),
+            comments=(post_row.get('comments') or 0) + (reel_row.get('comments') or 0),
+            shares=(post_row.get('shares') or 0) + (reel_row.get('shares') or 0),
+            saves=(post_row.get('saves') or 0) + (reel_row.get('saves') or 0),
+            views=(post_row.get('views') or 0) + (reel_row.get('views') or 0),
+            avg_engagement_rate=_combined_rate(post_row, reel_row),
+        ))
+
+    with transaction.atomic():
+        stale.delete()
+        DailyEngagementRollup.objects.bulk_create(rollups)
+        DirtyRollupDay.objects.filter(day__in=deleted_days).delete()
+
+    return len(rollups)
+
+
+def _refresh_categories():
+    """One grouped query per table, keyed on the influencer's category"""
+    influencer_rows = {
+        row['category']: row
+        for row in Influencer.objects.values('category').annotate(
+            influencer_count=Count('id'), total_followers=Sum('followers_count')
+        ).order_by()
+    }
+    content_rows = defaultdict(dict)
+    for kind, model in (('posts', Post), ('reels', Reel)):
+        for row in model.objects.values(category=F('influencer__category')).annotate(
+            **_engagement_aggregates()
+        ).order_by():
+            content_rows[row['category']][kind] = row
+
+    rollups = []
+    for category in set(influencer_rows) | set(content_rows):
+        influencer_row = influencer_rows.get(category, {})
+        post_row = content_rows[category].get('posts', {})
+        reel_row = content_rows[category].get('reels', {})
+        rollups.append(CategoryRollup(
+            category=category,
+            influencer_count=influencer_row.get('influencer_count') or 0,
+            total_followers=influencer_row.get('total_followers') or 0,
+            posts_count=post_row.get('count') or 0,
+            reels_count=reel_row.get('count') or 0,
+            total_likes=(post_row.get('likes') or 0) + (reel_row.get('likes') or 0),
+            total_comments=(post_row.get('comments') or 0) + (reel_row.get('comments') or 0),
+            avg_engagement_rate=_combined_rate(post_row, reel_row),
+        ))
+
+    with transaction.atomic():
+        CategoryRollup.objects.all().delete()
+        CategoryRollup.objects.bulk_create(rollups)
+
+    return len(rollups)
+
+
+def _refresh_platform(now, watermark):
+    influencer_totals = Influencer.objects.aggregate(
+        count=Count('id'), followers=Sum('followers_count')
+    )
+    post_totals = Post.objects.aggregate(
+        analyzed=Count('id', filter=Q(is_analyzed=True)),
+        **_engagement_aggregates(),
+    )
+    reel_totals = Reel.objects.aggregate(
+        analyzed=Count('id', filter=Q(is_analyzed=True)),
+        **_engagement_aggregates(),
+    )
+
+    top_performers = [
+        {
+            'id': row['id'],
+            'username': row['username'],
+            'engagement_rate': row['engagement_rate'],
+            'followers': row['followers_count'],
+        }
+        for row in Influencer.objects.order_by('-engagement_rate', '-followers_count')
+        .values('id', 'username', 'engagement_rate', 'followers_count')[:TOP_PERFORMERS]
+    ]
+
+    vibe_distribution = {}
+    vibe_rows = list(
+        Post.objects.exclude(vibe_classification='')
+        .values('vibe_classification').annotate(count=Count('id')).order_by()
+    )
+    vibe_total = sum(row['count'] for row in vibe_rows)
+    for row in vibe_rows:
+        vibe_distribution[row['vibe_classification']] = round(row['count'] / vibe_total * 100, 1)
+
+    media_type_performance = {
+        row['media_type']: {
+            'count': row['count'],
+            'engagement_rate': _combined_rate(row),
+        }
+        for row in Post.objects.values('media_type').annotate(**_engagement_aggregates()).order_by()
+    }
+    if reel_totals['count']:
+        # Reel-table content, kept apart from Post rows whose media_type is 'reel'
+        media_type_performance['reels'] = {
+            'count': reel_totals['count'],
+            'engagement_rate': _combined_rate(reel_totals),
+        }
+
+    posting_hours = {
+        str(row['hour']): {'count': row['count'], 'engagement_rate': _combined_rate(row)}
+        for row in Post.objects.annotate(hour=ExtractHour('posted_at'))
+        .values('hour').annotate(**_engagement_aggregates()).order_by()
+    }
+
+    PlatformRollup.objects.update_or_create(
+        pk=PlatformRollup.SINGLETON_ID,
+        defaults={
+            'total_influencers': influencer_totals['count'] or 0,
+            'total_followers': influencer_totals['followers'] or 0,
+            'total_posts': post_totals['count'] or 0,
+            'total_reels': reel_totals['count'] or 0,
+            'analyzed_posts': post_totals['analyzed'] or 0,
+            'analyzed_reels': reel_totals['analyzed'] or 0,
+            'total_likes': (post_totals['likes'] or 0) + (reel_totals['likes'] or 0),
+            'total_comments': (post_totals['comments'] or 0) + (reel_totals['comments'] or 0),
+            'total_shares': (post_totals['shares'] or 0) + (reel_totals['shares'] or 0),
+            'total_saves': (post_totals['saves'] or 0) + (reel_totals['saves'] or 0),
+            'total_views': (post_totals['views'] or 0) + (reel_totals['views'] or 0),
+            'avg_engagement_rate': _combined_rate(post_totals, reel_totals),
+            'top_performers': top_performers,
+            'vibe_distribution': vibe_distribution,
+            'media_type_performance': media_type_performance,
+            'posting_hours': posting_hours,
+            'refreshed_at': now,
+            'content_watermark': watermark,
+        },
+    )
+
+    record_platform_snapshot(
+        followers=influencer_totals['followers'] or 0,
+        likes=(post_totals['likes'] or 0) + (reel_totals['likes'] or 0),
+        comments=(post_totals['comments'] or 0) + (reel_totals['comments'] or 0),
+        views=(post_totals['views'] or 0) + (reel_totals['views'] or 0),
+        at=now,
+    )
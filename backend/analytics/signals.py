@@ -0,0 +1,41 @@
+# analytics/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.models import Post
+from reels.models import Reel
+
+from .cache import invalidate_influencer_analytics
+from .models import MetricSnapshot
+from .rollups import mark_day_dirty
+from .tags import remove_content_tags
+from .tracking import mark_dirty
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Reel)
+def drop_influencer_analytics(sender, instance, **kwargs):
+    """Any post/reel write makes the owning influencer's cached analytics stale"""
+    invalidate_influencer_analytics(instance.influencer_id)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Reel)
+def drop_content_tags(sender, instance, **kwargs):
+    """Deleted content leaves the hashtag/mention index and its counters"""
+    entity_type = MetricSnapshot.ENTITY_POST if sender is Post else MetricSnapshot.ENTITY_REEL
+    remove_content_tags(entity_type, [instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Reel)
+def mark_rollup_day_dirty(sender, instance, **kwargs):
+    """The deleted content's day must be recomputed by the next rollup refresh"""
+    mark_day_dirty(instance.posted_at)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Reel)
+def mark_engagement_dirty(sender, instance, **kwargs):
+    """Deletes leave no updated_at behind, so flag the influencer for the next tracking run"""
+    mark_dirty(instance.influencer_id)
@@ -0,0 +1,265 @@
+# analytics/tags.py
+"""
+Hashtag/mention inverted index on top of ContentTag and ContentTagUsage.
+
+Ingest calls index_content_tags() with the posts/reels it just saved. The
+item's current tags are diffed against its existing usage rows, and only the
+difference is applied to the per-tag counters (usage count, summed
+likes/comments, last seen). A re-scrape that only moves like counts therefore
+updates counters in place without rescanning the tag's other content.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import ContentTag, ContentTagUsage, MetricSnapshot
+
+logger = logging.getLogger('analytics')
+
+TAG_NAME_MAX_LENGTH = 150
+INDEX_BATCH_SIZE = 500
+TOP_ORDERINGS = {
+    'usage': ('-usage_count', '-total_likes'),
+    'likes': ('-total_likes', '-usage_count'),
+    'comments': ('-total_comments', '-usage_count'),
+}
+
+
+def normalize_tag(value):
+    """'#Travel ' -> 'travel'; empty string for blanks"""
+    return str(value).strip().lstrip('#@').lower()[:TAG_NAME_MAX_LENGTH]
+
+
+def _item_tags(item):
+    tags = set()
+    for kind, values in ((ContentTag.HASHTAG, item.hashtags), (ContentTag.MENTION, item.mentions)):
+        for value in values or []:
+            name = normalize_tag(value)
+            if name:
+                tags.add((kind, name))
+    return tags
+
+
+def _tag_ids(keys):
+    """ContentTag ids for (kind, name) pairs, creating the missing ones"""
+    if not keys:
+        return {}
+    ContentTag.objects.bulk_create(
+        [ContentTag(kind=kind, name=name) for kind, name in keys],
+        ignore_conflicts=True,
+        batch_size=INDEX_BATCH_SIZE,
+    )
+    ids = {}
+    by_kind = defaultdict(list)
+    for kind, name in keys:
+        by_kind[kind].append(name)
+    for kind, names in by_kind.items():
+        for start in range(0, len(names), INDEX_BATCH_SIZE):
+            for pk, name in ContentTag.objects.filter(
+                kind=kind, name__in=names[start:start + INDEX_BATCH_SIZE]
+            ).values_list('id', 'name'):
+                ids[(kind, name)] = pk
+    return ids
+
+
+def _apply_deltas(deltas):
+    """
+    deltas: {tag_id: [uses, likes, comments, last_seen]}. Tags with the same
+    delta (e.g. every tag of one new post) share one UPDATE.
+    """
+    by_delta = defaultdict(list)
+    for tag_id, delta in deltas.items():
+        by_delta[tuple(delta)].append(tag_id)
+
+    for (uses, likes, comments, last_seen), tag_ids in by_delta.items():
+        updates = {}
+        if uses:
+            updates['usage_count'] = F('usage_count') + uses
+        if likes:
+            updates['total_likes'] = F('total_likes') + likes
+        if comments:
+            updates['total_comments'] = F('total_comments') + comments
+        if last_seen is not None:
+            updates['last_seen_at'] = Greatest(Coalesce(F('last_seen_at'), Value(last_seen)), Value(last_seen))
+        if not updates:
+            continue
+        for start in range(0, len(tag_ids), INDEX_BATCH_SIZE):
+            ContentTag.objects.filter(pk__in=tag_ids[start:start + INDEX_BATCH_SIZE]).update(**updates)
+
+
+def index_content_tags(entity_type, items):
+    """
+    Sync the inverted index for freshly saved posts or reels
+    (MetricSnapshot.ENTITY_POST / ENTITY_REEL). Returns the number of tags touched.
+    """
+    items = [item for item in items if item.pk]
+    if not items:
+        return 0
+
+    wanted = {item.pk: (item, _item_tags(item)) for item in items}
+
+    with transaction.atomic():
+        tag_ids = _tag_ids({key for _, tags in wanted.values() for key in tags})
+
+        existing = defaultdict(dict)
+        for usage in ContentTagUsage.objects.filter(entity_type=entity_type, entity_id__in=list(wanted)):
+            existing[usage.entity_id][usage.tag_id] = usage
+
+        deltas = defaultdict(lambda: [0, 0, 0, None])
+        to_create, to_update, to_delete = [], [], []
+
+        for entity_id, (item, tags) in wanted.items():
+            likes = item.likes_count or 0
+            comments = item.comments_count or 0
+            current = existing.get(entity_id, {})
+            keep = {tag_ids[key]: key[0] for key in tags}
+
+            for tag_id, kind in keep.items():
+                delta = deltas[tag_id]
+                usage = current.get(tag_id)
+                if usage is None:
+                    to_create.append(ContentTagUsage(
+                        tag_id=tag_id,
+                        kind=kind,
+                        entity_type=entity_type,
+                        entity_id=entity_id,
+                        influencer_id=item.influencer_id,
+                        posted_at=item.posted_at,
+                        likes=likes,
+                        comments=comments,
+                    ))
+                    delta[0] += 1
+                    delta[1] += likes
+                    delta[2] += comments
+                elif (usage.likes, usage.comments, usage.posted_at) != (likes, comments, item.posted_at):
+                    delta[1] += likes - usage.likes
+                    delta[2] += comments - usage.comments
+                    usage.likes, usage.comments, usage.posted_at = likes, comments, item.posted_at
+                    to_update.append(usage)
+                if item.posted_at and (delta[3] is None or item.posted_at > delta[3]):
+                    delta[3] = item.posted_at
+
+            for tag_id, usage in current.items():
+                if tag_id not in keep:
+                    to_delete.append(usage.pk)
+                    delta = deltas[tag_id]
+                    delta[0] -= 1
+                    delta[1] -= usage.likes
+                    delta[2] -= usage.comments
+
+        ContentTagUsage.objects.bulk_create(to_create, batch_size=INDEX_BATCH_SIZE)
+        ContentTagUsage.objects.bulk_update(
+            to_update, ['likes', 'comments', 'posted_at'], batch_size=INDEX_BATCH_SIZE
+        )
+        ContentTagUsage.objects.filter(pk__in=to_delete).delete()
+        _apply_deltas(deltas)
+
+    return len(deltas)
+
+
+def remove_content_tags(entity_type, entity_ids):
+    """Drop deleted posts/reels from the index and take them out of the counters"""
+    with transaction.atomic():
+        usages = ContentTagUsage.objects.filter(entity_type=entity_type, entity_id__in=list(entity_ids))
+        deltas = {
+            row['tag_id']: [-row['uses'], -(row['likes'] or 0), -(row['comments'] or 0), None]
+            for row in usages.values('tag_id').annotate(
+                uses=Count('id'), likes=Sum('likes'), comments=Sum('comments')
+            ).order_by()
+        }
+        if deltas:
+            usages.delete()
+            _apply_deltas(deltas)
+
+
+def rebuild_tag_index():
+    """Reindex every post and reel from scratch (backfill / repair)"""
+    from posts.models import Post
+    from reels.models import Reel
+
+    with transaction.atomic():
+        ContentTagUsage.objects.all().delete()
+        ContentTag.objects.all().delete()
+
+    fields = ('id', 'influencer_id', 'hashtags', 'mentions', 'likes_count', 'comments_count', 'posted_at')
+    for entity_type, model in ((MetricSnapshot.ENTITY_POST, Post), (MetricSnapshot.ENTITY_REEL, Reel)):
+        batch = []
+        for item in model.objects.only(*fields).order_by('id').iterator(chunk_size=INDEX_BATCH_SIZE):
+            batch.append(item)
+            if len(batch) == INDEX_BATCH_SIZE:
+                index_content_tags(entity_type, batch)
+                batch = []
+        index_content_tags(entity_type, batch)
+
+    logger.info(f"Tag index rebuilt: {ContentTag.objects.count()} tags")
+
+
+# ================================
+# QUERIES
+# ================================
+
+def _avg(total, count):
+    return round(total / count, 2) if count else 0.0
+
+
+def top_tags(kind=ContentTag.HASHTAG, limit=20, order='usage'):
+    """All-time leaders, read straight off the counters"""
+    rows = (
+        ContentTag.objects.filter(kind=kind, usage_count__gt=0)
+        .order_by(*TOP_ORDERINGS[order])
+        .values('name', 'usage_count', 'total_likes', 'total_comments', 'last_seen_at')[:limit]
+    )
+    return [
+        {
+            'tag': row['name'],
+            'usage_count': row['usage_count'],
+            'total_likes': row['total_likes'],
+            'total_comments': row['total_comments'],
+            'avg_likes': _avg(row['total_likes'], row['usage_count']),
+            'avg_comments': _avg(row['total_comments'], row['usage_count']),
+            'last_seen_at': row['last_seen_at'].isoformat() if row['last_seen_at'] else None,
+        }
+        for row in rows
+    ]
+
+
+def _window_counts(kind, start, end, tag_ids=None):
+    usages = ContentTagUsage.objects.filter(kind=kind, posted_at__gte=start, posted_at__lt=end)
+    if tag_ids is not None:
+        usages = usages.filter(tag_id__in=tag_ids)
+    return usages.values('tag_id', name=F('tag__name')).annotate(
+        uses=Count('id'), likes=Sum('likes'), comments=Sum('comments')
+    ).order_by('-uses', '-likes')
+
+
+def trending_tags(kind=ContentTag.HASHTAG, days=7, limit=20, now=None):
+    """
+    Most used tags on content posted in the last `days` days, with growth
+    against the `days` days before. Reads one posted_at range of the
+    (kind, posted_at) index per window.
+    """
+    now = now or timezone.now()
+    start = now - timedelta(days=days)
+    current = list(_window_counts(kind, start, now)[:limit])
+    previous = {
+        row['tag_id']: row['uses']
+        for row in _window_counts(kind, start - timedelta(days=days), start, [row['tag_id'] for row in current])
+    }
+
+    trending = []
+    for row in current:
+        before = previous.get(row['tag_id'], 0)
+        trending.append({
+            'tag': row['name'],
+            'usage_count': row['uses'],
+            'previous_usage_count': before,
+            'growth_rate': round((row['uses'] - before) / before * 100, 2) if before else None,
+            'avg_likes': _avg(row['likes'] or 0, row['uses']),
+            'avg_comments': _avg(row['comments'] or 0, row['uses']),
+        })
+    return trending
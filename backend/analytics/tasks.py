@@ -2,7 +2,6 @@
 from celery import shared_task
 from celery.utils.log import get_task_logger
 from django.utils import timezone
-from django.db import transaction
 from datetime import timedelta, datetime
 import json
 import random
@@ -11,26 +10,44 @@ from typing import Dict, List, Optional
 
 # Import models
 from influencers.models import Influencer
-from posts.models import Post, PostAnalysis
-from reels.models import Reel, ReelAnalysis
-from demographics.models import AudienceDemographics
+from posts.models import Post
+from reels.models import Reel
+from demographics.models import Demographics as AudienceDemographics
+
+# Detailed per-item analysis tables are optional (not in every schema)
+try:
+    from posts.models import PostAnalysis
+    from reels.models import ReelAnalysis
+except ImportError:
+    PostAnalysis = ReelAnalysis = None
 
 # Import processors
 from .data_processing import DataProcessor, DemographicsInferrer
+from .reports import write_weekly_report
+from .rollups import refresh_rollups
+from .timeseries import compact_snapshots
+from .tracking import track_engagement
 
-# Try to import AI processors (fallback if not available)
-try:
-    from .ai_processing import ImageProcessor, ContentAnalyzer
-    AI_PROCESSORS_AVAILABLE = True
-except ImportError:
-    AI_PROCESSORS_AVAILABLE = False
+from core.media_store import media_store_stats
+from core.model_registry import model_registry_stats, module_available
+
+from .analysis_cache import analysis_cache_stats
+from .inference import inference_stats
+from .prefetch import MediaPrefetcher
+from .results import AnalysisResultWriter
 
 logger = get_task_logger(__name__)
 
+# AI processors (fallback if not available) and batched BLIP/ViT image analysis
+# through the shared inference worker. Both are imported by the tasks that use
+# them, so workers only pay for OpenCV, NLP and the models once they analyze
+AI_PROCESSORS_AVAILABLE = module_available('cv2')
+IMAGE_ANALYZER_AVAILABLE = module_available('cv2', 'imagehash')
+
 # Task Configuration Constants
 MAX_RETRIES = 3
 RETRY_COUNTDOWN = 60
-BATCH_SIZE = 10
+BATCH_SIZE = 32  # posts handed to the inference worker at once
 PROCESSING_TIMEOUT = 300  # 5 minutes
 
 
@@ -54,10 +71,10 @@ def analyze_influencer_posts(self, influencer_id: int):
             return {'status': 'error', 'message': error_msg}
         
         # Get unanalyzed posts
-        posts = influencer.posts.filter(is_analyzed=False).order_by('-post_date')
-        total_posts = posts.count()
+        posts = list(influencer.posts.filter(is_analyzed=False).order_by('-posted_at'))
+        total_posts = len(posts)
         
-        if not posts.exists():
+        if not posts:
             logger.info(f"✅ No unanalyzed posts found for @{influencer.username}")
             return {
                 'status': 'success', 
@@ -68,49 +85,8 @@ def analyze_influencer_posts(self, influencer_id: int):
         
         logger.info(f"📊 Found {total_posts} unanalyzed posts for @{influencer.username}")
         
-        # Initialize counters and tracking
-        analyzed_count = 0
-        failed_count = 0
-        processing_times = []
-        batch_count = 0
-        
-        # Process posts in batches for better memory management
-        for batch_start in range(0, total_posts, BATCH_SIZE):
-            batch_count += 1
-            batch_posts = posts[batch_start:batch_start + BATCH_SIZE]
-            
-            logger.info(f"🔄 Processing batch {batch_count}: posts {batch_start+1}-{min(batch_start + BATCH_SIZE, total_posts)}")
-            
-            for post in batch_posts:
-                post_start_time = time.time()
-                
-                try:
-                    # Perform comprehensive AI analysis
-                    analysis_result = _perform_comprehensive_post_analysis(post)
-                    
-                    if analysis_result.get('success', False):
-                        # Update post with analysis results using transaction
-                        with transaction.atomic():
-                            _update_post_with_analysis(post, analysis_result)
-                            _create_detailed_post_analysis(post, analysis_result)
-                        
-                        analyzed_count += 1
-                        processing_time = time.time() - post_start_time
-                        processing_times.append(processing_time)
-                        
-                        logger.debug(f"✅ Analyzed post {post.shortcode} ({processing_time:.2f}s)")
-                    else:
-                        failed_count += 1
-                        logger.warning(f"⚠️ Analysis failed for post {post.shortcode}: {analysis_result.get('error', 'Unknown error')}")
-                        
-                except Exception as e:
-                    failed_count += 1
-                    logger.error(f"❌ Exception analyzing post {post.shortcode}: {str(e)}")
-                    continue
-            
-            # Brief pause between batches to avoid overwhelming the system
-            if batch_count < (total_posts // BATCH_SIZE):
-                time.sleep(random.uniform(1, 3))
+        run = _analyze_posts(posts)
+        analyzed_count = run['analyzed']
         
         # Update influencer engagement metrics
         try:
@@ -120,13 +96,8 @@ def analyze_influencer_posts(self, influencer_id: int):
         except Exception as e:
             logger.warning(f"⚠️ Failed to update engagement metrics: {str(e)}")
         
-        # Update influencer timestamps
-        influencer.last_analyzed = timezone.now()
-        influencer.save(update_fields=['last_analyzed'])
-        
         # Calculate final metrics
         total_time = time.time() - start_time
-        avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0
         success_rate = (analyzed_count / total_posts) * 100 if total_posts > 0 else 0
         
         # Final summary
@@ -134,13 +105,18 @@ def analyze_influencer_posts(self, influencer_id: int):
             'status': 'completed',
             'message': f"Analysis completed for @{influencer.username}",
             'posts_analyzed': analyzed_count,
-            'posts_failed': failed_count,
+            'posts_failed': run['failed'],
             'posts_total': total_posts,
             'success_rate': round(success_rate, 1),
             'total_time_seconds': round(total_time, 2),
-            'avg_processing_time': round(avg_processing_time, 2),
-            'batches_processed': batch_count,
-            'ai_processors_used': AI_PROCESSORS_AVAILABLE
+            'avg_processing_time': run['avg_processing_time'],
+            'batches_processed': run['batches'],
+            'ai_processors_used': AI_PROCESSORS_AVAILABLE,
+            'inference': inference_stats(),
+            'models': model_registry_stats(),
+            'prefetch': run['prefetch'],
+            'analysis_cache': analysis_cache_stats(),
+            'media_store': media_store_stats()
         }
         
         logger.info(f"🎯 Post analysis completed for @{influencer.username}: "
@@ -160,6 +136,52 @@ def analyze_influencer_posts(self, influencer_id: int):
         raise
 
 
+@shared_task(bind=True)
+def analyze_pending_posts(self, influencer_ids: Optional[List[int]] = None, limit: int = 1000):
+    """
+    Analyze unanalyzed posts across influencers (all, or `influencer_ids`),
+    newest first, so their images share inference batches instead of being
+    split per influencer. Engagement metrics are refreshed once per touched
+    influencer.
+    """
+    start_time = time.time()
+    
+    posts = Post.objects.filter(is_analyzed=False).select_related('influencer').order_by('-posted_at')
+    if influencer_ids:
+        posts = posts.filter(influencer_id__in=influencer_ids)
+    posts = list(posts[:limit])
+    
+    run = _analyze_posts(posts)
+    
+    processor = DataProcessor()
+    influencers = {post.influencer_id: post.influencer for post in posts}
+    for influencer in influencers.values():
+        try:
+            processor.calculate_engagement_metrics(influencer)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to update engagement metrics for @{influencer.username}: {str(e)}")
+    
+    total_time = time.time() - start_time
+    logger.info(f"🎯 Pending post analysis: {run['analyzed']}/{len(posts)} posts across "
+                f"{len(influencers)} influencers in {total_time:.1f}s")
+    
+    return {
+        'status': 'completed',
+        'posts_analyzed': run['analyzed'],
+        'posts_failed': run['failed'],
+        'posts_total': len(posts),
+        'influencers_touched': len(influencers),
+        'total_time_seconds': round(total_time, 2),
+        'avg_processing_time': run['avg_processing_time'],
+        'batches_processed': run['batches'],
+        'inference': inference_stats(),
+        'models': model_registry_stats(),
+        'prefetch': run['prefetch'],
+        'analysis_cache': analysis_cache_stats(),
+        'media_store': media_store_stats()
+    }
+
+
 @shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 2, 'countdown': 120})
 def analyze_influencer_reels(self, influencer_id: int):
     """
@@ -180,7 +202,7 @@ def analyze_influencer_reels(self, influencer_id: int):
             return {'status': 'error', 'message': error_msg}
         
         # Get unanalyzed reels
-        reels = influencer.reels.filter(is_analyzed=False).order_by('-post_date')
+        reels = influencer.reels.filter(is_analyzed=False).order_by('-posted_at')
         total_reels = reels.count()
         
         if not reels.exists():
@@ -194,25 +216,19 @@ def analyze_influencer_reels(self, influencer_id: int):
         
         logger.info(f"🎥 Found {total_reels} unanalyzed reels for @{influencer.username}")
         
-        # Process reels
-        analyzed_count = 0
+        # Process reels; results are saved in chunks by the bulk writer
         failed_count = 0
         processing_times = []
         
-        for reel in reels:
-            reel_start_time = time.time()
-            
-            try:
+        with _reel_result_writer() as writer:
+            for reel in reels:
+                reel_start_time = time.time()
+                
                 # Perform comprehensive reel analysis
                 analysis_result = _perform_comprehensive_reel_analysis(reel)
                 
                 if analysis_result.get('success', False):
-                    # Update reel with analysis results
-                    with transaction.atomic():
-                        _update_reel_with_analysis(reel, analysis_result)
-                        _create_detailed_reel_analysis(reel, analysis_result)
-                    
-                    analyzed_count += 1
+                    writer.add(reel, analysis_result)
                     processing_time = time.time() - reel_start_time
                     processing_times.append(processing_time)
                     
@@ -220,14 +236,12 @@ def analyze_influencer_reels(self, influencer_id: int):
                 else:
                     failed_count += 1
                     logger.warning(f"⚠️ Analysis failed for reel {reel.shortcode}: {analysis_result.get('error', 'Unknown error')}")
-                    
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"❌ Exception analyzing reel {reel.shortcode}: {str(e)}")
-                continue
-            
-            # Brief pause between reels (video processing can be intensive)
-            time.sleep(random.uniform(2, 4))
+                
+                # Brief pause between reels (video processing can be intensive)
+                time.sleep(random.uniform(2, 4))
+        
+        analyzed_count = writer.written
+        failed_count += writer.failed
         
         # Calculate final metrics
         total_time = time.time() - start_time
@@ -336,63 +350,26 @@ def infer_audience_demographics(self, influencer_id: int):
 
 
 @shared_task(bind=True)
-def track_engagement_metrics(self):
+def track_engagement_metrics(self, full: bool = False):
     """
-    SCHEDULED TASK: Enhanced engagement metrics tracking
-    Runs hourly via Celery Beat - Comprehensive metrics update
+    SCHEDULED TASK: Incremental engagement metrics tracking
+    Runs hourly via Celery Beat - only influencers whose content or follower
+    count changed since the last run are recomputed (see analytics/tracking.py)
     """
     try:
         logger.info("📈 Starting hourly engagement metrics tracking")
         start_time = time.time()
         
-        processor = DataProcessor()
-        influencers = Influencer.objects.select_related().all()
-        total_influencers = influencers.count()
-        
-        updated_count = 0
-        failed_count = 0
-        metrics_summary = {
-            'total_engagement': 0,
-            'total_followers': 0,
-            'avg_engagement_rate': 0
-        }
-        
-        for influencer in influencers:
-            try:
-                if influencer.posts.exists() or influencer.reels.exists():
-                    # Calculate metrics
-                    metrics = processor.calculate_engagement_metrics(influencer)
-                    
-                    # Update summary statistics
-                    metrics_summary['total_engagement'] += metrics.get('total_engagement', 0)
-                    metrics_summary['total_followers'] += influencer.followers_count
-                    
-                    updated_count += 1
-                    logger.debug(f"📊 Updated metrics for @{influencer.username}")
-                    
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"❌ Failed to update metrics for @{influencer.username}: {str(e)}")
-                continue
-        
-        # Calculate platform-wide averages
-        if updated_count > 0:
-            platform_engagement_rate = (metrics_summary['total_engagement'] / metrics_summary['total_followers']) * 100 if metrics_summary['total_followers'] > 0 else 0
-            metrics_summary['avg_engagement_rate'] = platform_engagement_rate
+        result = track_engagement(full=full)
         
         total_time = time.time() - start_time
-        
-        result = {
+        result.update({
             'status': 'completed',
-            'updated_count': updated_count,
-            'failed_count': failed_count,
-            'total_influencers': total_influencers,
-            'success_rate': round((updated_count / total_influencers) * 100, 1) if total_influencers > 0 else 0,
             'processing_time_seconds': round(total_time, 2),
-            'platform_metrics': metrics_summary
-        }
+        })
         
-        logger.info(f"📈 Engagement tracking completed: {updated_count}/{total_influencers} influencers updated in {total_time:.1f}s")
+        logger.info(f"📈 Engagement tracking completed: {result['recomputed_count']} recomputed, "
+                    f"{result['skipped_count']} skipped of {result['total_influencers']} in {total_time:.1f}s")
         return result
         
     except Exception as e:
@@ -401,126 +378,33 @@ def track_engagement_metrics(self):
 
 
 @shared_task(bind=True)
-def generate_weekly_analytics_report(self):
+def generate_weekly_analytics_report(self, fmt: str = None):
     """
     SCHEDULED TASK: Comprehensive weekly analytics report generation
     Runs weekly via Celery Beat - Complete platform analysis
+    
+    Brings stale engagement metrics up to date, then streams one row per
+    influencer to a compressed file under MEDIA_ROOT (see analytics/reports.py).
+    The task result only carries the file pointer and the platform summary.
     """
     try:
         logger.info("📋 Generating comprehensive weekly analytics report")
         start_time = time.time()
         
-        processor = DataProcessor()
-        influencers = Influencer.objects.select_related().all()
-        
-        report_data = []
-        platform_stats = {
-            'total_influencers': 0,
-            'total_followers': 0,
-            'total_posts': 0,
-            'total_reels': 0,
-            'analyzed_posts': 0,
-            'analyzed_reels': 0,
-            'total_engagement': 0
-        }
-        
-        top_performers = []
-        
-        for influencer in influencers:
-            try:
-                # Calculate engagement metrics
-                engagement_metrics = processor.calculate_engagement_metrics(influencer)
-                
-                # Gather influencer data
-                posts_count = influencer.posts.count()
-                reels_count = influencer.reels.count()
-                analyzed_posts = influencer.posts.filter(is_analyzed=True).count()
-                analyzed_reels = influencer.reels.filter(is_analyzed=True).count()
-                
-                influencer_report = {
-                    'username': influencer.username,
-                    'full_name': influencer.full_name,
-                    'followers_count': influencer.followers_count,
-                    'is_verified': influencer.is_verified,
-                    'posts_count': posts_count,
-                    'reels_count': reels_count,
-                    'analyzed_posts': analyzed_posts,
-                    'analyzed_reels': analyzed_reels,
-                    'engagement_rate': engagement_metrics.get('engagement_rate_followers', 0),
-                    'avg_likes': engagement_metrics.get('avg_likes', 0),
-                    'avg_comments': engagement_metrics.get('avg_comments', 0),
-                    'total_engagement': engagement_metrics.get('total_engagement', 0),
-                    'follower_tier': influencer.follower_tier,
-                    'last_analyzed': influencer.last_analyzed.isoformat() if influencer.last_analyzed else None
-                }
-                
-                report_data.append(influencer_report)
-                
-                # Update platform stats
-                platform_stats['total_influencers'] += 1
-                platform_stats['total_followers'] += influencer.followers_count
-                platform_stats['total_posts'] += posts_count
-                platform_stats['total_reels'] += reels_count
-                platform_stats['analyzed_posts'] += analyzed_posts
-                platform_stats['analyzed_reels'] += analyzed_reels
-                platform_stats['total_engagement'] += engagement_metrics.get('total_engagement', 0)
-                
-                # Track top performers
-                if engagement_metrics.get('engagement_rate_followers', 0) >= 3.0:
-                    top_performers.append({
-                        'username': influencer.username,
-                        'engagement_rate': engagement_metrics.get('engagement_rate_followers', 0),
-                        'followers': influencer.followers_count,
-                        'total_engagement': engagement_metrics.get('total_engagement', 0)
-                    })
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to generate report for @{influencer.username}: {str(e)}")
-                continue
-        
-        # Sort top performers by engagement rate
-        top_performers.sort(key=lambda x: x['engagement_rate'], reverse=True)
-        top_performers = top_performers[:10]  # Top 10
-        
-        # Calculate platform averages
-        if platform_stats['total_influencers'] > 0:
-            platform_averages = {
-                'avg_followers': platform_stats['total_followers'] / platform_stats['total_influencers'],
-                'avg_posts_per_influencer': platform_stats['total_posts'] / platform_stats['total_influencers'],
-                'avg_reels_per_influencer': platform_stats['total_reels'] / platform_stats['total_influencers'],
-                'platform_engagement_rate': (platform_stats['total_engagement'] / platform_stats['total_followers']) * 100 if platform_stats['total_followers'] > 0 else 0,
-                'analysis_coverage': {
-                    'posts_analyzed_percentage': (platform_stats['analyzed_posts'] / platform_stats['total_posts']) * 100 if platform_stats['total_posts'] > 0 else 0,
-                    'reels_analyzed_percentage': (platform_stats['analyzed_reels'] / platform_stats['total_reels']) * 100 if platform_stats['total_reels'] > 0 else 0
-                }
-            }
-        else:
-            platform_averages = {}
-        
-        # Create comprehensive report
-        report_summary = {
-            'report_metadata': {
-                'generated_at': timezone.now().isoformat(),
-                'report_period': 'weekly',
-                'report_version': '2.0',
-                'processing_time_seconds': round(time.time() - start_time, 2)
-            },
-            'platform_statistics': platform_stats,
-            'platform_averages': platform_averages,
-            'top_performers': top_performers,
-            'total_influencers_analyzed': len(report_data),
-            'influencer_details': report_data
-        }
+        track_engagement()
+        report = write_weekly_report(fmt)
         
         total_time = time.time() - start_time
+        report['report']['processing_time_seconds'] = round(total_time, 2)
+        top_performers = report['top_performers']
         
-        logger.info(f"📋 Weekly report generated successfully: {len(report_data)} influencers analyzed in {total_time:.1f}s")
+        logger.info(f"📋 Weekly report generated successfully: {report['report']['rows']} influencers in {total_time:.1f}s")
         logger.info(f"🏆 Top performer: @{top_performers[0]['username'] if top_performers else 'None'}")
         
         return {
             'status': 'completed',
-            'message': f"Generated comprehensive weekly report for {len(report_data)} influencers",
-            'report_summary': report_summary
+            'message': f"Generated comprehensive weekly report for {report['report']['rows']} influencers",
+            **report,
         }
         
     except Exception as e:
@@ -528,6 +412,43 @@ def generate_weekly_analytics_report(self):
         return {'status': 'failed', 'error': str(e)}
 
 
+@shared_task(bind=True)
+def refresh_analytics_rollups(self, full: bool = False):
+    """
+    SCHEDULED TASK: Refresh the platform/category/daily rollup tables
+    Runs every 15 minutes via Celery Beat - feeds the analytics overview endpoints
+    """
+    try:
+        start_time = time.time()
+        result = refresh_rollups(full=full)
+        result.update({
+            'status': 'completed',
+            'processing_time_seconds': round(time.time() - start_time, 2),
+        })
+        logger.info(f"📊 Analytics rollups refreshed in {result['processing_time_seconds']}s")
+        return result
+        
+    except Exception as e:
+        logger.error(f"💥 Rollup refresh failed: {str(e)}")
+        return {'status': 'failed', 'error': str(e)}
+
+
+@shared_task(bind=True)
+def compact_metric_snapshots(self):
+    """
+    SCHEDULED TASK: Downsample engagement history (hour -> day -> week)
+    Runs hourly via Celery Beat - also enforces snapshot retention
+    """
+    try:
+        result = compact_snapshots()
+        result['status'] = 'completed'
+        return result
+        
+    except Exception as e:
+        logger.error(f"💥 Snapshot compaction failed: {str(e)}")
+        return {'status': 'failed', 'error': str(e)}
+
+
 @shared_task(bind=True)
 def cleanup_old_analysis_data(self):
     """
@@ -537,6 +458,9 @@ def cleanup_old_analysis_data(self):
     try:
         logger.info("🧹 Starting cleanup of old analysis data")
         
+        if PostAnalysis is None or ReelAnalysis is None:
+            return {'status': 'completed', 'message': 'No analysis tables to clean up'}
+        
         # Define cleanup thresholds
         cutoff_date = timezone.now() - timedelta(days=90)  # Keep 90 days
         
@@ -573,6 +497,120 @@ def cleanup_old_analysis_data(self):
 # COMPREHENSIVE ANALYSIS FUNCTIONS
 # ================================
 
+def _analyze_posts(posts: List[Post]) -> Dict:
+    """
+    Analyze `posts` in batches of up to BATCH_SIZE and save the results
+    through a bulk result writer. No pauses between batches: the inference
+    worker sets the pace, and with the vision stack installed the prefetch
+    stage downloads and decodes upcoming images while a batch is inferred.
+    """
+    failed_count = 0
+    batch_count = 0
+    processing_time = 0.0
+    prefetch = {}
+    
+    with _post_result_writer() as writer:
+        for batch_posts, analyzer, loaded in _post_batches(posts, prefetch):
+            batch_count += 1
+            batch_start_time = time.time()
+            
+            logger.info(f"🔄 Processing batch {batch_count}: {len(batch_posts)} posts")
+            
+            for post, analysis_result in zip(batch_posts, _analyze_post_batch(batch_posts, analyzer, loaded)):
+                if analysis_result.get('success', False):
+                    writer.add(post, analysis_result)
+                else:
+                    failed_count += 1
+                    logger.warning(f"⚠️ Analysis failed for post {post.shortcode}: {analysis_result.get('error', 'Unknown error')}")
+            
+            processing_time += time.time() - batch_start_time
+    
+    return {
+        'analyzed': writer.written,
+        'failed': failed_count + writer.failed,
+        'batches': batch_count,
+        'avg_processing_time': round(processing_time / len(posts), 2) if posts else 0,
+        'prefetch': prefetch or None,
+    }
+
+
+def _post_batches(posts: List[Post], prefetch_stats: Dict):
+    """
+    (posts, analyzer, loaded images by URL) per batch. With ImageAnalyzer,
+    posts whose URL is already in the analysis cache come first and are never
+    downloaded; the other batches are formed from whatever the prefetcher has
+    finished loading, so slow downloads never hold up the images that are
+    already here. Each batch's decoded images are released once the caller
+    moves on.
+    """
+    analyzer = None
+    if IMAGE_ANALYZER_AVAILABLE and posts:
+        try:
+            from .image_processing import ImageAnalyzer
+            analyzer = ImageAnalyzer()
+        except Exception as e:
+            logger.warning(f"⚠️ Image analyzer unavailable, using per-post analysis: {str(e)}")
+    
+    if analyzer is None:
+        for batch_start in range(0, len(posts), BATCH_SIZE):
+            yield posts[batch_start:batch_start + BATCH_SIZE], None, None
+        return
+    
+    # Images already analyzed under their URL are answered from the cache; only the rest are downloaded
+    version = analyzer.analysis_version
+    known, to_fetch = [], []
+    for post in posts:
+        cached = analyzer.cache is not None and analyzer.cache.has_url('image', post.media_url, version)
+        (known if cached else to_fetch).append(post)
+    for batch_start in range(0, len(known), BATCH_SIZE):
+        yield known[batch_start:batch_start + BATCH_SIZE], analyzer, {}
+    
+    with MediaPrefetcher(analyzer.load_image) as prefetcher:
+        prefetcher.submit((post, post.media_url) for post in to_fetch)
+        while True:
+            batch = prefetcher.next_batch(BATCH_SIZE)
+            if not batch:
+                break
+            loaded = {item.url: item.value if item.error is None else (None, None) for item in batch}
+            yield [item.key for item in batch], analyzer, loaded
+            prefetcher.release(batch)
+        prefetch_stats.update(prefetcher.stats())
+
+
+def _analyze_post_batch(posts: List[Post], analyzer=None, loaded: Optional[Dict] = None) -> List[Dict]:
+    """
+    One analysis result per post. With the vision stack installed, every
+    image in the batch goes to the inference worker together; posts whose
+    image can't be analyzed fall back to the per-post path.
+    """
+    if analyzer is None:
+        return [_perform_comprehensive_post_analysis(post) for post in posts]
+    
+    try:
+        image_results = analyzer.analyze_post_images([post.media_url for post in posts], loaded=loaded)
+    except Exception as e:
+        logger.warning(f"⚠️ Batched image analysis failed, using per-post analysis: {str(e)}")
+        return [_perform_comprehensive_post_analysis(post) for post in posts]
+    
+    results = []
+    for post, image_result in zip(posts, image_results):
+        if not image_result.get('processing_success'):
+            results.append(_perform_comprehensive_post_analysis(post))
+            continue
+        
+        content_results = {}
+        if AI_PROCESSORS_AVAILABLE:
+            from .ai_processing import ContentAnalyzer
+            content_results = ContentAnalyzer().analyze_post_content(post.caption or "")
+        results.append({
+            'success': True,
+            **content_results,
+            **image_result,
+            'processing_method': 'batched_ai'
+        })
+    return results
+
+
 def _perform_comprehensive_post_analysis(post: Post) -> Dict:
     """
     Perform comprehensive AI analysis on a post
@@ -612,11 +650,12 @@ def _perform_comprehensive_reel_analysis(reel: Reel) -> Dict:
 def _real_post_analysis(post: Post) -> Dict:
     """Real AI analysis using ImageProcessor and ContentAnalyzer"""
     try:
+        from .ai_processing import ContentAnalyzer, ImageProcessor
         image_processor = ImageProcessor()
         content_analyzer = ContentAnalyzer()
         
         # Analyze image
-        image_results = image_processor.analyze_image(post.image_url)
+        image_results = image_processor.analyze_image(post.media_url)
         
         # Analyze content
         content_results = content_analyzer.analyze_post_content(post.caption or "")
@@ -637,6 +676,7 @@ def _real_post_analysis(post: Post) -> Dict:
 def _real_reel_analysis(reel: Reel) -> Dict:
     """Real AI analysis for reels"""
     try:
+        from .ai_processing import ContentAnalyzer
         content_analyzer = ContentAnalyzer()
         
         # Analyze caption content
@@ -735,71 +775,101 @@ def _enhanced_fallback_reel_analysis(reel: Reel) -> Dict:
 # DATABASE UPDATE FUNCTIONS
 # ================================
 
+# Columns written by the bulk result writers
+POST_RESULT_FIELDS = [
+    'auto_tags', 'vibe_classification', 'quality_score', 'sentiment_score',
+    'dominant_colors', 'detected_objects', 'face_count', 'is_analyzed', 'analysis_status',
+]
+REEL_RESULT_FIELDS = ['vibe_classification', 'scene_changes', 'is_analyzed']
+POST_DETAIL_FIELDS = [
+    'lighting_score', 'composition_score', 'visual_appeal_score', 'sharpness_score',
+    'color_harmony_score', 'detected_objects', 'dominant_colors', 'faces_detected',
+    'people_count', 'category', 'mood', 'style', 'caption_sentiment', 'caption_length',
+    'hashtag_count', 'mention_count', 'aesthetic_score', 'uniqueness_score',
+    'ai_model_version', 'processing_errors',
+]
+REEL_DETAIL_FIELDS = [
+    'scene_changes', 'activity_level', 'audio_detected', 'primary_subject', 'environment', 'time_of_day',
+]
+
+
+def _post_result_writer() -> AnalysisResultWriter:
+    return AnalysisResultWriter(
+        Post, POST_RESULT_FIELDS, _update_post_with_analysis,
+        detail_model=PostAnalysis, build_detail=_create_detailed_post_analysis,
+        detail_key='post', detail_fields=POST_DETAIL_FIELDS,
+    )
+
+
+def _reel_result_writer() -> AnalysisResultWriter:
+    return AnalysisResultWriter(
+        Reel, REEL_RESULT_FIELDS, _update_reel_with_analysis,
+        detail_model=ReelAnalysis, build_detail=_create_detailed_reel_analysis,
+        detail_key='reel', detail_fields=REEL_DETAIL_FIELDS,
+    )
+
+
 def _update_post_with_analysis(post: Post, analysis: Dict):
-    """Update post with analysis results"""
-    post.keywords = analysis.get('keywords', [])[:10]
+    """Copy analysis results onto the post (persisted in bulk by the result writer)"""
+    post.auto_tags = analysis.get('keywords', [])[:10]
     post.vibe_classification = analysis.get('vibe_classification', 'casual')
     post.quality_score = analysis.get('quality_score', 5.0)
-    post.category = analysis.get('category', 'lifestyle')
     post.sentiment_score = analysis.get('sentiment_score', 0.0)
+    post.dominant_colors = analysis.get('dominant_colors', [])
+    post.detected_objects = analysis.get('detected_objects', [])
+    post.face_count = analysis.get('faces_detected', 0)
     post.is_analyzed = True
-    post.analysis_date = timezone.now()
-    post.analysis_version = '2.0'
-    post.analysis_confidence = analysis.get('confidence_score', 0.8)
-    post.save()
+    post.analysis_status = 'completed'
 
 
 def _create_detailed_post_analysis(post: Post, analysis: Dict):
-    """Create detailed analysis record"""
-    PostAnalysis.objects.update_or_create(
+    """Unsaved detail record for the post, or None without a PostAnalysis table"""
+    if PostAnalysis is None:
+        return None
+    return PostAnalysis(
         post=post,
-        defaults={
-            'lighting_score': analysis.get('lighting_score', 7.0),
-            'composition_score': analysis.get('composition_score', 7.0),
-            'visual_appeal_score': analysis.get('visual_appeal_score', 7.0),
-            'sharpness_score': analysis.get('sharpness_score', 7.0),
-            'color_harmony_score': analysis.get('color_harmony_score', 7.0),
-            'detected_objects': analysis.get('detected_objects', []),
-            'dominant_colors': analysis.get('dominant_colors', []),
-            'faces_detected': analysis.get('faces_detected', 0),
-            'people_count': analysis.get('people_count', 1),
-            'category': analysis.get('category', 'lifestyle'),
-            'mood': analysis.get('mood', 'neutral'),
-            'style': analysis.get('style', 'casual'),
-            'caption_sentiment': analysis.get('sentiment_score', 0.0),
-            'caption_length': len(post.caption) if post.caption else 0,
-            'hashtag_count': len([word for word in (post.caption or '').split() if word.startswith('#')]),
-            'mention_count': len([word for word in (post.caption or '').split() if word.startswith('@')]),
-            'aesthetic_score': analysis.get('aesthetic_score', analysis.get('visual_appeal_score', 7.0)),
-            'uniqueness_score': analysis.get('uniqueness_score', random.uniform(6.0, 9.0)),
-            'ai_model_version': '2.0',
-            'processing_errors': analysis.get('errors', [])
-        }
+        lighting_score=analysis.get('lighting_score', 7.0),
+        composition_score=analysis.get('composition_score', 7.0),
+        visual_appeal_score=analysis.get('visual_appeal_score', 7.0),
+        sharpness_score=analysis.get('sharpness_score', 7.0),
+        color_harmony_score=analysis.get('color_harmony_score', 7.0),
+        detected_objects=analysis.get('detected_objects', []),
+        dominant_colors=analysis.get('dominant_colors', []),
+        faces_detected=analysis.get('faces_detected', 0),
+        people_count=analysis.get('people_count', 1),
+        category=analysis.get('category', 'lifestyle'),
+        mood=analysis.get('mood', 'neutral'),
+        style=analysis.get('style', 'casual'),
+        caption_sentiment=analysis.get('sentiment_score', 0.0),
+        caption_length=len(post.caption) if post.caption else 0,
+        hashtag_count=len([word for word in (post.caption or '').split() if word.startswith('#')]),
+        mention_count=len([word for word in (post.caption or '').split() if word.startswith('@')]),
+        aesthetic_score=analysis.get('aesthetic_score', analysis.get('visual_appeal_score', 7.0)),
+        uniqueness_score=analysis.get('uniqueness_score', random.uniform(6.0, 9.0)),
+        ai_model_version='2.0',
+        processing_errors=analysis.get('errors', []),
     )
 
 
 def _update_reel_with_analysis(reel: Reel, analysis: Dict):
-    """Update reel with analysis results"""
-    reel.detected_events = analysis.get('detected_events', [])[:10]
+    """Copy analysis results onto the reel (persisted in bulk by the result writer)"""
     reel.vibe_classification = analysis.get('vibe_classification', 'casual_daily_life')
-    reel.descriptive_tags = analysis.get('descriptive_tags', [])[:10]
+    reel.scene_changes = analysis.get('scene_changes', reel.scene_changes)
     reel.is_analyzed = True
-    reel.analysis_date = timezone.now()
-    reel.save()
 
 
 def _create_detailed_reel_analysis(reel: Reel, analysis: Dict):
-    """Create detailed reel analysis record"""
-    ReelAnalysis.objects.update_or_create(
+    """Unsaved detail record for the reel, or None without a ReelAnalysis table"""
+    if ReelAnalysis is None:
+        return None
+    return ReelAnalysis(
         reel=reel,
-        defaults={
-            'scene_changes': analysis.get('scene_changes', 5),
-            'activity_level': analysis.get('activity_level', 'medium'),
-            'audio_detected': analysis.get('audio_detected', True),
-            'primary_subject': analysis.get('primary_subject', 'person'),
-            'environment': analysis.get('environment', 'indoor'),
-            'time_of_day': analysis.get('time_of_day', 'day')
-        }
+        scene_changes=analysis.get('scene_changes', 5),
+        activity_level=analysis.get('activity_level', 'medium'),
+        audio_detected=analysis.get('audio_detected', True),
+        primary_subject=analysis.get('primary_subject', 'person'),
+        environment=analysis.get('environment', 'indoor'),
+        time_of_day=analysis.get('time_of_day', 'day'),
     )
 
 
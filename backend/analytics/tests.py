@@ -1,3 +1,1028 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from influencers.models import Influencer
+from posts.models import Post
+from reels.models import Reel
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class InfluencerAnalyticsCacheTest(TestCase):
+    """GET /api/v1/influencers/<id>/analytics/ aggregates in SQL and caches per influencer"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.influencer = Influencer.objects.create(username='alice', followers_count=1000)
+        for i, (likes, comments) in enumerate([(100, 10), (300, 30)]):
+            Post.objects.create(
+                shortcode=f'p{i}', influencer=self.influencer, likes_count=likes, comments_count=comments,
+                posted_at=datetime(2024, 1, 1, 18, tzinfo=dt_timezone.utc),
+            )
+        Reel.objects.create(
+            shortcode='r0', influencer=self.influencer, likes_count=200, comments_count=20, views_count=4000,
+            posted_at=datetime(2024, 1, 2, tzinfo=dt_timezone.utc),
+        )
+        self.url = f'/api/v1/influencers/{self.influencer.id}/analytics/'
+
+    def test_metrics_from_aggregates(self):
+        analytics = self.client.get(self.url).data['analytics']
+        self.assertEqual(analytics['avg_likes'], 200)
+        self.assertEqual(analytics['avg_comments'], 20)
+        self.assertEqual(analytics['engagement_rate'], 22.0)
+        self.assertEqual(analytics['reach'], 4000)
+        self.assertEqual(analytics['best_posting_time'], '18:00')
+
+    def test_second_request_is_a_cache_hit(self):
+        self.client.get(self.url)
+        # only the influencer lookup remains
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_post_write_invalidates(self):
+        self.client.get(self.url)
+        Post.objects.create(shortcode='p9', influencer=self.influencer, likes_count=600, comments_count=60)
+        self.assertEqual(self.client.get(self.url).data['analytics']['avg_likes'], 300)
+
+    def test_follower_change_invalidates(self):
+        self.client.get(self.url)
+        Influencer.objects.filter(id=self.influencer.id).update(followers_count=2000)
+        self.assertEqual(self.client.get(self.url).data['analytics']['engagement_rate'], 11.0)
+
+    def test_missing_influencer_is_404(self):
+        self.assertEqual(self.client.get('/api/v1/influencers/999/analytics/').status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AnalyticsRollupTest(TestCase):
+    """Overview endpoints read rollup tables refreshed by refresh_rollups"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.fit = Influencer.objects.create(username='fit', category='fitness', followers_count=1000,
+                                             engagement_rate=20.0)
+        self.tech = Influencer.objects.create(username='tech', category='technology', followers_count=2000)
+        Post.objects.create(shortcode='a', influencer=self.fit, likes_count=90, comments_count=10,
+                            posted_at=datetime(2024, 3, 1, 9, tzinfo=dt_timezone.utc))
+        Post.objects.create(shortcode='b', influencer=self.tech, likes_count=180, comments_count=20,
+                            posted_at=datetime(2024, 3, 2, 18, tzinfo=dt_timezone.utc))
+        Reel.objects.create(shortcode='c', influencer=self.fit, likes_count=300, comments_count=0,
+                            views_count=5000, posted_at=datetime(2024, 3, 2, 12, tzinfo=dt_timezone.utc))
+
+    def test_refresh_builds_rollups(self):
+        from .models import CategoryRollup, DailyEngagementRollup, PlatformRollup
+        from .rollups import refresh_rollups
+
+        result = refresh_rollups()
+        self.assertTrue(result['full_rebuild'])
+
+        platform = PlatformRollup.current()
+        self.assertEqual((platform.total_posts, platform.total_reels), (2, 1))
+        self.assertEqual(platform.total_likes, 570)
+        # (10% + 10% + 30%) / 3
+        self.assertAlmostEqual(platform.avg_engagement_rate, 16.67)
+
+        fitness = CategoryRollup.objects.get(category='fitness')
+        self.assertEqual((fitness.posts_count, fitness.reels_count), (1, 1))
+        self.assertEqual(fitness.avg_engagement_rate, 20.0)
+
+        march_2 = DailyEngagementRollup.objects.get(day='2024-03-02')
+        self.assertEqual((march_2.posts_count, march_2.reels_count, march_2.likes), (1, 1, 480))
+
+    def test_incremental_refresh_only_touches_new_days(self):
+        from .models import DailyEngagementRollup
+        from .rollups import refresh_rollups
+
+        refresh_rollups()
+        Post.objects.create(shortcode='d', influencer=self.tech, likes_count=20,
+                            posted_at=datetime(2024, 3, 5, tzinfo=dt_timezone.utc))
+        result = refresh_rollups()
+        self.assertFalse(result['full_rebuild'])
+        self.assertEqual(DailyEngagementRollup.objects.count(), 3)
+        self.assertEqual(DailyEngagementRollup.objects.get(day='2024-03-05').likes, 20)
+
+    def test_incremental_refresh_sees_updates_and_deletes_of_old_content(self):
+        from .models import DailyEngagementRollup
+        from .rollups import refresh_rollups
+
+        refresh_rollups()
+        post = Post.objects.get(shortcode='a')
+        post.likes_count = 190
+        post.save()
+        Post.objects.get(shortcode='b').delete()
+        refresh_rollups()
+
+        self.assertEqual(DailyEngagementRollup.objects.get(day='2024-03-01').likes, 190)
+        march_2 = DailyEngagementRollup.objects.get(day='2024-03-02')
+        self.assertEqual((march_2.posts_count, march_2.reels_count, march_2.likes), (0, 1, 300))
+
+    def test_views_before_first_refresh_are_empty(self):
+        from .models import PlatformRollup
+        overview = self.client.get('/api/v1/analytics/').data
+        self.assertEqual(overview['overview']['total_posts'], 0)
+        self.assertIsNone(overview['refreshed_at'])
+        self.assertIsNone(PlatformRollup.current())
+
+    def test_views_read_rollups_in_constant_queries(self):
+        from .rollups import refresh_rollups
+        refresh_rollups()
+
+        # each view first reads PlatformRollup.refreshed_at for its ETag
+        with self.assertNumQueries(3):
+            overview = self.client.get('/api/v1/analytics/').data
+        self.assertEqual(overview['overview']['total_posts'], 2)
+        self.assertEqual(overview['top_performers'][0]['username'], 'fit')
+
+        with self.assertNumQueries(4):
+            trends = self.client.get('/api/v1/analytics/engagement/trends/?days=30').data
+        self.assertEqual([d['date'] for d in trends['engagement_trends']['daily_trends']],
+                         ['2024-03-01', '2024-03-02'])
+
+        # + top hashtags and the trending window (nothing trending, so no previous-window read)
+        with self.assertNumQueries(5):
+            insights = self.client.get('/api/v1/analytics/content/insights/').data
+        categories = [c['category'] for c in insights['content_analysis']['top_performing_categories']]
+        self.assertEqual(categories, ['fitness', 'technology'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MetricSnapshotTest(TestCase):
+    """Hourly samples recorded at scrape time roll up into daily/weekly history and expire per retention"""
+
+    def setUp(self):
+        from .models import MetricSnapshot
+        cache.clear()
+        self.MetricSnapshot = MetricSnapshot
+        self.influencer = Influencer.objects.create(username='alice', followers_count=100)
+
+    def _scrape(self, at, followers, posts=(), reels=()):
+        from unittest import mock
+        from scraping.tasks import scrape_influencer_data
+        scraped = {'profile': {'username': 'alice', 'followers_count': followers}, 'posts': list(posts), 'reels': list(reels)}
+        with mock.patch('scraping.tasks.InstagramScraper') as scraper, \
+                mock.patch('django.utils.timezone.now', return_value=at):
+            scraper.return_value.full_profile_scrape.return_value = scraped
+            scrape_influencer_data(self.influencer.id)
+
+    def _record(self, at, followers, likes):
+        self._scrape(at, followers, posts=[{'shortcode': 'p', 'likes_count': likes, 'posted_at': at}])
+
+    def _influencer_rows(self):
+        return self.MetricSnapshot.objects.filter(entity_type=self.MetricSnapshot.ENTITY_INFLUENCER)
+
+    def test_scrape_records_influencer_and_content_samples(self):
+        at = datetime(2024, 3, 4, 10, 5, tzinfo=dt_timezone.utc)
+        self._scrape(
+            at, 120,
+            posts=[{'shortcode': 'p1', 'media_type': 'photo', 'media_url': 'https://example.com/p1.jpg',
+                    'likes_count': 30, 'comments_count': 3, 'posted_at': at, 'hashtags': ['travel']}],
+            reels=[{'shortcode': 'r1', 'media_url': 'https://example.com/r1.mp4', 'duration': 12.0,
+                    'views_count': 500, 'likes_count': 50, 'comments_count': 5, 'posted_at': at}],
+        )
+
+        post, reel = Post.objects.get(shortcode='p1'), Reel.objects.get(shortcode='r1')
+        self.assertEqual((post.media_url, post.posted_at), ('https://example.com/p1.jpg', at))
+        rows = {
+            (row.entity_type, row.entity_id): (row.followers, row.likes, row.comments, row.views)
+            for row in self.MetricSnapshot.objects.filter(bucket_start=datetime(2024, 3, 4, 10, tzinfo=dt_timezone.utc))
+        }
+        self.assertEqual(rows, {
+            (self.MetricSnapshot.ENTITY_INFLUENCER, self.influencer.id): (120, 80, 8, 500),
+            (self.MetricSnapshot.ENTITY_POST, post.id): (None, 30, 3, 0),
+            (self.MetricSnapshot.ENTITY_REEL, reel.id): (None, 50, 5, 500),
+        })
+
+    def test_samples_in_same_hour_overwrite(self):
+        self._record(datetime(2024, 3, 4, 10, 5, tzinfo=dt_timezone.utc), 100, 10)
+        self._record(datetime(2024, 3, 4, 10, 55, tzinfo=dt_timezone.utc), 110, 12)
+        snapshot = self._influencer_rows().get()
+        self.assertEqual((snapshot.followers, snapshot.likes), (110, 12))
+
+    def test_compaction_keeps_last_sample_per_bucket(self):
+        from .timeseries import compact_snapshots
+        for hour, followers in [(8, 100), (12, 120), (20, 150)]:
+            self._record(datetime(2024, 3, 4, hour, tzinfo=dt_timezone.utc), followers, followers)
+        self._record(datetime(2024, 3, 5, 9, tzinfo=dt_timezone.utc), 160, 160)
+
+        compact_snapshots(now=datetime(2024, 3, 5, 10, tzinfo=dt_timezone.utc))
+
+        daily = self._influencer_rows().filter(granularity='d').order_by('bucket_start')
+        self.assertEqual([d.followers for d in daily], [150, 160])
+        weekly = self._influencer_rows().get(granularity='w')
+        self.assertEqual((weekly.bucket_start.day, weekly.followers), (4, 160))
+
+    def test_retention_prunes_old_hourly_rows(self):
+        from .timeseries import compact_snapshots
+        self._record(datetime(2024, 3, 1, 8, tzinfo=dt_timezone.utc), 100, 1)
+        self._record(datetime(2024, 3, 5, 8, tzinfo=dt_timezone.utc), 100, 1)
+        result = compact_snapshots(now=datetime(2024, 3, 5, 10, tzinfo=dt_timezone.utc))
+        # the influencer's and its post's samples from March 1st
+        self.assertEqual(result['pruned']['h'], 2)
+        self.assertEqual(self._influencer_rows().filter(granularity='h').count(), 1)
+
+    def test_trends_history_reads_daily_rows(self):
+        from .timeseries import compact_snapshots, read_series
+        from django.utils import timezone
+        now = timezone.now()
+        self._record(now - timedelta(days=1), 100, 10)
+        self._record(now, 150, 40)
+        compact_snapshots(now=now)
+
+        self.assertEqual(len(read_series(self.MetricSnapshot.ENTITY_INFLUENCER, self.influencer.id, days=3)), 2)
+
+        trends = APIClient().get(
+            f'/api/v1/analytics/engagement/trends/?days=3&influencer={self.influencer.id}'
+        ).data['engagement_trends']
+        self.assertEqual([row['followers'] for row in trends['history']], [100, 150])
+        self.assertEqual(trends['history'][1]['likes_gained'], 30)
+        self.assertEqual(trends['follower_growth_rate'], 50.0)
+
+    def test_influencer_trends_revalidate_on_new_snapshots(self):
+        from unittest import mock
+        from django.utils import timezone
+        from .timeseries import compact_snapshots
+        now = timezone.now().replace(hour=12)
+        url = f'/api/v1/analytics/engagement/trends/?days=3&influencer={self.influencer.id}'
+        client = APIClient()
+        self._record(now - timedelta(days=1), 100, 10)
+        compact_snapshots(now=now)
+        etag = client.get(url)['ETag']
+
+        # Same day's bucket overwritten: the series tag is bumped
+        self._record(now - timedelta(days=1, hours=-1), 120, 10)
+        compact_snapshots(now=now)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['followers'] for row in response.data['engagement_trends']['history']], [120])
+
+        # A new day's bucket, with the tag bumps lost: the newest bucket validator still changes
+        etag = response['ETag']
+        with mock.patch('analytics.timeseries.invalidate_tags'), mock.patch('core.signals.invalidate_tags'):
+            self._record(now, 150, 40)
+            compact_snapshots(now=now)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['followers'] for row in response.data['engagement_trends']['history']], [120, 150])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ContentTagIndexTest(TestCase):
+    """Hashtag/mention counters are maintained incrementally at ingest"""
+
+    def setUp(self):
+        from django.utils import timezone
+        from .models import ContentTag, MetricSnapshot
+        self.ContentTag = ContentTag
+        self.POST = MetricSnapshot.ENTITY_POST
+        self.now = timezone.now()
+        self.influencer = Influencer.objects.create(username='alice', followers_count=1000)
+
+    def _post(self, shortcode, hashtags, likes, days_ago=1, mentions=()):
+        from .tags import index_content_tags
+        post = Post.objects.create(
+            shortcode=shortcode, influencer=self.influencer, hashtags=list(hashtags), mentions=list(mentions),
+            likes_count=likes, comments_count=likes // 10, posted_at=self.now - timedelta(days=days_ago),
+        )
+        index_content_tags(self.POST, [post])
+        return post
+
+    def _tag(self, name, kind='h'):
+        return self.ContentTag.objects.get(kind=kind, name=name)
+
+    def test_ingest_builds_counters(self):
+        self._post('a', ['#Travel', 'food'], 100, mentions=['@Bob'])
+        self._post('b', ['travel', 'TRAVEL'], 50)
+
+        travel = self._tag('travel')
+        self.assertEqual((travel.usage_count, travel.total_likes, travel.total_comments), (2, 150, 15))
+        self.assertEqual(self._tag('food').usage_count, 1)
+        self.assertEqual(self._tag('bob', kind='m').usage_count, 1)
+
+    def test_rescrape_applies_deltas(self):
+        from .tags import index_content_tags
+        post = self._post('a', ['travel', 'food'], 100)
+        post.likes_count = 300
+        post.hashtags = ['travel']
+        index_content_tags(self.POST, [post])
+
+        self.assertEqual(self._tag('travel').total_likes, 300)
+        food = self._tag('food')
+        self.assertEqual((food.usage_count, food.total_likes), (0, 0))
+
+    def test_new_post_updates_its_tags_in_one_statement(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        table = self.ContentTag._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            self._post('a', [f'tag{i}' for i in range(30)], 100, mentions=['bob'])
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(f'UPDATE "{table}"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.ContentTag.objects.filter(usage_count=1, total_likes=100).count(), 31)
+
+    def test_delete_removes_usage(self):
+        post = self._post('a', ['travel'], 100)
+        self._post('b', ['travel'], 40)
+        post.delete()
+        travel = self._tag('travel')
+        self.assertEqual((travel.usage_count, travel.total_likes), (1, 40))
+
+    def test_rebuild_matches_incremental(self):
+        from .tags import rebuild_tag_index
+        self._post('a', ['travel', 'food'], 100)
+        self._post('b', ['travel'], 40)
+        before = list(self.ContentTag.objects.order_by('name').values_list('name', 'usage_count', 'total_likes'))
+        rebuild_tag_index()
+        after = list(self.ContentTag.objects.order_by('name').values_list('name', 'usage_count', 'total_likes'))
+        self.assertEqual(before, after)
+
+    def test_endpoint_top_and_trending(self):
+        self._post('a', ['travel'], 100, days_ago=10)
+        self._post('b', ['travel', 'food'], 10, days_ago=2)
+        self._post('c', ['food'], 10, days_ago=1)
+
+        data = APIClient().get('/api/v1/analytics/hashtags/?days=7&limit=5').data
+        self.assertEqual([row['tag'] for row in data['top']], ['travel', 'food'])
+        trending = data['trending']['tags']
+        self.assertEqual([row['tag'] for row in trending], ['food', 'travel'])
+        self.assertEqual(trending[1]['previous_usage_count'], 1)
+        self.assertEqual(trending[1]['growth_rate'], 0.0)
+
+        by_likes = APIClient().get('/api/v1/analytics/hashtags/?order=likes').data['top']
+        self.assertEqual(by_likes[0]['tag'], 'travel')
+        self.assertEqual(APIClient().get('/api/v1/analytics/hashtags/?kind=topic').status_code, 400)
+
+
+class InferenceWorkerTest(TestCase):
+    """Images submitted together share one caption/classify pass"""
+
+    class FakeModels:
+        def __init__(self, fail=False):
+            self.batch_sizes = []
+            self.fail = fail
+
+        def caption_batch(self, images):
+            if self.fail:
+                raise RuntimeError('out of memory')
+            self.batch_sizes.append(len(images))
+            return [f'caption {image}' for image in images]
+
+        def classify_batch(self, images):
+            return [[{'label': f'label {image}', 'score': 0.9}] for image in images]
+
+    def _worker(self, models, **kwargs):
+        from .inference import InferenceWorker
+        worker = InferenceWorker(models, **kwargs)
+        self.addCleanup(worker.shutdown)
+        return worker
+
+    def test_micro_batches_up_to_max_size(self):
+        models = self.FakeModels()
+        worker = self._worker(models, max_batch_size=4, max_wait=0.5)
+
+        results = worker.infer_many(range(6))
+
+        self.assertEqual(results[5], {'caption': 'caption 5', 'labels': [{'label': 'label 5', 'score': 0.9}]})
+        self.assertEqual(models.batch_sizes, [4, 2])
+        stats = worker.stats.snapshot()
+        self.assertEqual((stats['images'], stats['batches'], stats['largest_batch']), (6, 2, 4))
+        self.assertGreater(stats['images_per_second'], 0)
+
+    def test_failed_batch_fails_its_futures(self):
+        worker = self._worker(self.FakeModels(fail=True), max_batch_size=2, max_wait=0.5)
+        future = worker.submit('a')
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=5)
+        self.assertEqual(worker.stats.snapshot()['failed_images'], 1)
+
+
+class InferenceBackendTest(TestCase):
+    """Backend selection, cache versioning and the benchmark's agreement measures"""
+
+    def test_unknown_backend_rejected(self):
+        from .inference import build_vision_models
+        with self.assertRaisesMessage(ValueError, "Unknown inference backend 'tensorrt'"):
+            build_vision_models('tensorrt')
+
+    def test_variant_is_part_of_analysis_version(self):
+        from unittest import mock
+        from .image_processing import ImageAnalyzer
+
+        worker = mock.Mock()
+        worker.models.variant = 'onnx-int8:beams1'
+        with mock.patch('analytics.image_processing.get_inference_worker', return_value=worker), \
+                mock.patch('analytics.image_processing.get_analysis_cache', return_value=None):
+            version = ImageAnalyzer().analysis_version
+        self.assertTrue(version.endswith('@onnx-int8:beams1'))
+
+    def test_caption_agreement(self):
+        from .management.commands.benchmark_inference import agreement, token_f1
+
+        self.assertEqual(token_f1('a dog on a beach', 'a dog on a beach'), 1.0)
+        self.assertAlmostEqual(token_f1('a dog on the sand', 'a dog on a beach'), 0.6)
+        self.assertEqual(token_f1('', 'a dog'), 0.0)
+
+        dog, cat = [{'label': 'dog', 'score': 0.9}], [{'label': 'cat', 'score': 0.8}]
+        result = agreement([('a dog', dog), ('a cat', dog)], [('a dog', dog), ('a kitten', cat)])
+        self.assertEqual((result['exact'], result['top_label']), (0.5, 0.5))
+        self.assertAlmostEqual(result['token_f1'], 0.75)
+
+
+class AnalyzeInfluencerPostsTest(TestCase):
+    def test_analyzes_every_post_without_pausing(self):
+        from unittest import mock
+        from .tasks import BATCH_SIZE, analyze_influencer_posts
+
+        influencer = Influencer.objects.create(username='alice', followers_count=1000)
+        for i in range(BATCH_SIZE + 3):
+            Post.objects.create(shortcode=f'p{i}', influencer=influencer, caption='gym workout #fitness')
+
+        with mock.patch('analytics.tasks.time.sleep') as sleep:
+            result = analyze_influencer_posts(influencer.id)
+
+        sleep.assert_not_called()
+        self.assertEqual((result['posts_analyzed'], result['batches_processed']), (BATCH_SIZE + 3, 2))
+        self.assertFalse(influencer.posts.filter(is_analyzed=False).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AnalysisResultWriterTest(TestCase):
+    def setUp(self):
+        self.influencer = Influencer.objects.create(username='alice')
+        self.posts = [Post.objects.create(shortcode=f'p{i}', influencer=self.influencer) for i in range(5)]
+
+    def _writer(self, chunk_size):
+        from .tasks import _post_result_writer
+        writer = _post_result_writer()
+        writer.chunk_size = chunk_size
+        return writer
+
+    def test_chunk_written_in_one_transaction(self):
+        writer = self._writer(chunk_size=5)
+        for post in self.posts[:4]:
+            writer.add(post, {'vibe_classification': 'luxury', 'keywords': ['gold'], 'quality_score': 8.0})
+        self.assertFalse(Post.objects.filter(is_analyzed=True).exists())
+
+        # Filling the chunk triggers the flush: SAVEPOINT/UPDATE/RELEASE, nothing per post
+        with self.assertNumQueries(3):
+            writer.add(self.posts[4], {'vibe_classification': 'luxury'})
+
+        self.assertEqual(writer.stats(), {'written': 5, 'failed': 0, 'flushes': 1})
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(
+            (post.is_analyzed, post.analysis_status, post.vibe_classification, post.auto_tags, post.quality_score),
+            (True, 'completed', 'luxury', ['gold'], 8.0),
+        )
+
+    def test_bad_row_does_not_lose_the_chunk(self):
+        with self._writer(chunk_size=10) as writer:
+            for i, post in enumerate(self.posts):
+                writer.add(post, {'quality_score': 'not a number' if i == 2 else 6.0})
+
+        self.assertEqual((writer.written, writer.failed), (4, 1))
+        self.assertEqual(
+            list(Post.objects.filter(is_analyzed=True).order_by('id').values_list('shortcode', flat=True)),
+            ['p0', 'p1', 'p3', 'p4'],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class IncrementalEngagementTrackingTest(TestCase):
+    def setUp(self):
+        self.alice = Influencer.objects.create(username='alice', followers_count=1000)
+        self.bob = Influencer.objects.create(username='bob', followers_count=2000)
+        self.carol = Influencer.objects.create(username='carol', followers_count=3000)
+        for influencer in (self.alice, self.bob, self.carol):
+            Post.objects.create(shortcode=f'{influencer.username}-0', influencer=influencer, likes_count=100)
+
+    def _track(self):
+        from .tracking import track_engagement
+        return track_engagement()
+
+    def test_first_run_computes_everyone_then_skips_unchanged(self):
+        first = self._track()
+        self.assertEqual((first['recomputed_count'], first['skipped_count']), (3, 0))
+        self.assertEqual(Influencer.objects.get(pk=self.alice.pk).avg_likes, 100)
+
+        second = self._track()
+        self.assertEqual((second['recomputed_count'], second['skipped_count']), (0, 3))
+
+    def test_only_changed_influencers_are_recomputed(self):
+        from .models import EngagementTrackingRun
+        self._track()
+
+        post = self.alice.posts.get()
+        post.likes_count = 300
+        post.save()
+        Influencer.objects.filter(pk=self.bob.pk).update(followers_count=2500)
+        self.carol.posts.get().delete()
+
+        result = self._track()
+        self.assertEqual((result['recomputed_count'], result['skipped_count']), (3, 0))
+        self.assertEqual(Influencer.objects.get(pk=self.alice.pk).avg_likes, 300)
+
+        self.assertEqual(self._track()['recomputed_count'], 0)
+        run = EngagementTrackingRun.objects.first()
+        self.assertEqual((run.recomputed, run.skipped, run.failed), (0, 3, 0))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class EngagementEngineTest(TestCase):
+    def setUp(self):
+        self.alice = Influencer.objects.create(username='alice', followers_count=1000)
+        self.bob = Influencer.objects.create(username='bob', followers_count=500)
+        self.empty = Influencer.objects.create(username='empty', followers_count=10)
+        vibes = ['luxury', 'casual', 'energetic', '']
+        for index in range(9):
+            Post.objects.create(
+                shortcode=f'alice-{index}', influencer=self.alice,
+                likes_count=(index * 37) % 200, comments_count=index * 3,
+                media_type='video' if index % 3 == 0 else 'photo',
+                is_analyzed=index % 2 == 0, vibe_classification=vibes[index % 4],
+            )
+        for index in range(4):
+            Reel.objects.create(
+                shortcode=f'alice-reel-{index}', influencer=self.alice,
+                likes_count=50 + index * 11, comments_count=index, views_count=1000 * (index + 1),
+                is_analyzed=True, vibe_classification=vibes[index % 3],
+                posted_at=datetime(2024, 5, index + 1, tzinfo=dt_timezone.utc),
+            )
+        for index in range(2):
+            Post.objects.create(shortcode=f'bob-{index}', influencer=self.bob, likes_count=10 + index)
+
+    def test_matches_per_item_reference(self):
+        from .data_processing import DataProcessor
+        from .engine import EngagementEngine
+
+        processor = DataProcessor()
+        engine = EngagementEngine.for_influencers([self.alice.id, self.bob.id, self.empty.id])
+        consistency = engine.consistency_scores()
+        high_performing = engine.high_performing_ratios()
+        image_rates = engine.image_engagement_rates()
+        content_types = engine.content_type_performance()
+        vibes = engine.vibe_performance()
+
+        for index, influencer in enumerate((self.alice, self.bob, self.empty)):
+            posts, reels = influencer.posts.all(), influencer.reels.all()
+            self.assertAlmostEqual(consistency[index], processor._calculate_consistency_score(posts, reels))
+            self.assertAlmostEqual(high_performing[index], processor._calculate_high_performing_ratio(posts, reels))
+            self.assertAlmostEqual(image_rates[index], processor._calculate_image_engagement_rate(posts))
+            self.assertEqual(content_types[influencer.id], processor._analyze_content_types(posts, reels))
+            self.assertEqual(vibes[influencer.id], processor._analyze_vibe_performance(posts, reels))
+
+    def test_batch_matches_single_and_updates_influencers(self):
+        from .data_processing import DataProcessor
+
+        processor = DataProcessor()
+        single = processor.calculate_engagement_metrics(Influencer.objects.get(pk=self.alice.pk))
+        batch = processor.calculate_engagement_metrics_many(Influencer.objects.order_by('id'))
+
+        self.assertEqual(batch[self.alice.id], single)
+        self.assertEqual(batch[self.empty.id], processor._default_engagement_metrics())
+        bob = Influencer.objects.get(pk=self.bob.pk)
+        self.assertEqual((bob.avg_likes, bob.engagement_rate), (10, 2.1))
+
+    def test_benchmark_command_reports_agreement(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('benchmark_engagement', repeat=1, stdout=out)
+        self.assertIn('engine-batch', out.getvalue())
+        self.assertIn('All implementations agree', out.getvalue())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class WeeklyReportTest(TestCase):
+    def setUp(self):
+        import tempfile
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.star = Influencer.objects.create(username='star', followers_count=100)
+        self.quiet = Influencer.objects.create(username='quiet', followers_count=50_000)
+        Post.objects.create(shortcode='s1', influencer=self.star, likes_count=10, comments_count=2, is_analyzed=True)
+        Post.objects.create(shortcode='s2', influencer=self.star, likes_count=4, comments_count=0)
+        Reel.objects.create(shortcode='s3', influencer=self.star, likes_count=6, comments_count=1, views_count=100,
+                            is_analyzed=True, posted_at=datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+
+    def _generate(self, fmt):
+        from .tasks import generate_weekly_analytics_report
+        with self.settings(MEDIA_ROOT=self.media.name):
+            return generate_weekly_analytics_report(fmt)
+
+    def test_jsonl_report_is_streamed_to_disk_with_summary_in_result(self):
+        import gzip
+        import json
+        import os
+
+        result = self._generate('jsonl')
+        self.assertEqual(result['status'], 'completed')
+        self.assertNotIn('influencer_details', result)
+        self.assertEqual(result['report']['rows'], 2)
+        self.assertTrue(result['report']['path'].endswith('.jsonl.gz'))
+
+        with gzip.open(os.path.join(self.media.name, result['report']['path']), 'rt') as report:
+            rows = {row['username']: row for row in map(json.loads, report)}
+        self.assertEqual(
+            {key: rows['star'][key] for key in ('posts_count', 'reels_count', 'analyzed_posts',
+                                                'analyzed_reels', 'total_engagement', 'follower_tier')},
+            {'posts_count': 2, 'reels_count': 1, 'analyzed_posts': 1, 'analyzed_reels': 1,
+             'total_engagement': 23, 'follower_tier': 'regular'},
+        )
+        self.assertEqual(rows['quiet']['follower_tier'], 'micro')
+        self.assertEqual(rows['quiet']['posts_count'], 0)
+
+        self.assertEqual(result['platform_statistics']['total_engagement'], 23)
+        self.assertEqual([top['username'] for top in result['top_performers']], ['star'])
+
+    def test_parquet_report(self):
+        import os
+        import pyarrow.parquet as pq
+
+        result = self._generate('parquet')
+        table = pq.read_table(os.path.join(self.media.name, result['report']['path']))
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(sorted(table.column('username').to_pylist()), ['quiet', 'star'])
+        self.assertEqual(os.listdir(os.path.dirname(os.path.join(self.media.name, result['report']['path']))),
+                         [os.path.basename(result['report']['path'])])
+
+
+class AnalysisCacheTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from .analysis_cache import AnalysisCache
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/analysis.sqlite3'
+        self.cache = AnalysisCache(path=self.path, max_entries=10)
+
+    def test_lookup_by_digest_then_by_url(self):
+        self.assertIsNone(self.cache.get_by_url('image', 'https://cdn/a.jpg', 'v1'))
+        self.assertIsNone(self.cache.get('image', 'ffee', 'v1'))
+        self.cache.put('image', 'ffee', 'v1', {'caption': 'a dog'}, url='https://cdn/a.jpg')
+
+        self.assertEqual(self.cache.get_by_url('image', 'https://cdn/a.jpg', 'v1'), {'caption': 'a dog'})
+        # A repost under a new URL hits by perceptual hash and is linked for next time
+        self.assertEqual(self.cache.get('image', 'ffee', 'v1', url='https://cdn/b.jpg'), {'caption': 'a dog'})
+        self.assertEqual(self.cache.get_by_url('image', 'https://cdn/b.jpg', 'v1'), {'caption': 'a dog'})
+
+        stats = self.cache.snapshot()
+        self.assertEqual((stats['url_hits'], stats['digest_hits'], stats['misses']), (2, 1, 2))
+        self.assertEqual(stats['hit_rate'], 0.6)
+
+    def test_versions_and_kinds_are_isolated(self):
+        self.cache.put('image', 'ffee', 'v1', {'caption': 'old model'})
+        self.assertIsNone(self.cache.get('image', 'ffee', 'v2'))
+        self.assertIsNone(self.cache.get('video', 'ffee', 'v1'))
+
+    def test_least_recently_used_results_are_evicted(self):
+        import time
+        for index in range(12):
+            self.cache.put('image', f'd{index}', 'v1', {'n': index}, url=f'https://cdn/{index}.jpg')
+            time.sleep(0.001)
+        self.cache.get('image', 'd0', 'v1')
+
+        self.assertEqual(self.cache.evict(), 3)
+        self.assertEqual(self.cache.entries(), 9)
+        self.assertEqual(self.cache.get('image', 'd0', 'v1'), {'n': 0})
+        self.assertIsNone(self.cache.get('image', 'd1', 'v1'))
+        self.assertIsNone(self.cache.get_by_url('image', 'https://cdn/1.jpg', 'v1'))
+
+    def test_has_url_checks_without_counting(self):
+        self.assertFalse(self.cache.has_url('image', 'https://cdn/a.jpg', 'v1'))
+        self.cache.put('image', 'ffee', 'v1', {'caption': 'a dog'}, url='https://cdn/a.jpg')
+        self.assertTrue(self.cache.has_url('image', 'https://cdn/a.jpg', 'v1'))
+        self.assertFalse(self.cache.has_url('image', 'https://cdn/a.jpg', 'v2'))
+        self.assertEqual(self.cache.snapshot()['hits'] + self.cache.snapshot()['misses'], 0)
+
+    def test_cached_urls_are_not_prefetched(self):
+        from types import SimpleNamespace
+        from unittest import mock
+        from . import tasks
+        from .video_decode import VideoStats
+        from .video_processing import VideoAnalyzer
+
+        self.cache.put('image', 'ffee', 'v1', {'caption': 'a dog'}, url='https://cdn/a.jpg')
+        self.cache.put('video', 'aa-bb', 'v1', {'vibe_classification': 'party'}, url='https://cdn/a.mp4')
+        downloads = []
+        cache = self.cache
+
+        class StubImageAnalyzer:
+            analysis_version = 'v1'
+
+            def __init__(self):
+                self.cache = cache
+
+            def load_image(self, url):
+                downloads.append(url)
+                return 'pil', 'cv'
+
+        posts = [Post(shortcode=name, media_url=f'https://cdn/{name}.jpg') for name in ('a', 'b')]
+        with mock.patch.object(tasks, 'IMAGE_ANALYZER_AVAILABLE', True), \
+                mock.patch('analytics.image_processing.ImageAnalyzer', StubImageAnalyzer):
+            batches = [(list(batch), loaded) for batch, _, loaded in tasks._post_batches(posts, {})]
+        self.assertEqual(downloads, ['https://cdn/b.jpg'])
+        self.assertEqual([[post.shortcode for post in batch] for batch, _ in batches], [['a'], ['b']])
+        self.assertEqual(batches[0][1], {})
+
+        downloads.clear()
+        video_analyzer = SimpleNamespace(
+            image_analyzer=SimpleNamespace(cache=self.cache),
+            analysis_version=lambda caption: 'v1',
+            load_video=lambda url: downloads.append(url) or VideoStats(),
+            analyze_reel_video=lambda url, caption, loaded=None: {'url': url, 'prefetched': loaded is not None},
+        )
+        results = VideoAnalyzer.analyze_reel_videos(video_analyzer, [('https://cdn/a.mp4', ''), ('https://cdn/b.mp4', '')])
+        self.assertEqual(downloads, ['https://cdn/b.mp4'])
+        self.assertEqual(results, [
+            {'url': 'https://cdn/a.mp4', 'prefetched': False}, {'url': 'https://cdn/b.mp4', 'prefetched': True},
+        ])
+
+    def test_persists_across_instances(self):
+        from .analysis_cache import AnalysisCache
+        self.cache.put('video', 'aa-bb', 'v1', {'vibe_classification': 'party'})
+        self.assertEqual(AnalysisCache(path=self.path).get('video', 'aa-bb', 'v1'), {'vibe_classification': 'party'})
+
+
+class MediaPrefetcherTest(TestCase):
+    def _drain(self, prefetcher, size):
+        batches = []
+        while True:
+            batch = prefetcher.next_batch(size)
+            if not batch:
+                return batches
+            batches.append(batch)
+            prefetcher.release(batch)
+
+    def test_every_item_is_delivered_once_in_batches(self):
+        from .prefetch import MediaPrefetcher
+        with MediaPrefetcher(lambda url: url.upper(), workers=4, max_inflight_bytes=1000, per_host=2,
+                             estimate=10, measure=len) as prefetcher:
+            prefetcher.submit((index, f'https://cdn/{index}.jpg') for index in range(20))
+            batches = self._drain(prefetcher, 8)
+
+        items = [item for batch in batches for item in batch]
+        self.assertEqual(sorted(item.key for item in items), list(range(20)))
+        self.assertTrue(all(len(batch) <= 8 for batch in batches))
+        self.assertEqual(items[0].value, items[0].url.upper())
+        self.assertEqual(prefetcher.stats()['loaded'], 20)
+        self.assertEqual(prefetcher.budget.used, 0)
+
+    def test_inflight_bytes_and_per_host_downloads_are_capped(self):
+        import threading
+        import time
+        from .prefetch import MediaPrefetcher
+
+        lock = threading.Lock()
+        active = {}
+        peak = {}
+
+        def loader(url):
+            host = url.split('/')[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.01)
+            with lock:
+                active[host] -= 1
+            return b'x' * 100
+
+        with MediaPrefetcher(loader, workers=8, max_inflight_bytes=300, per_host=2, estimate=100,
+                             measure=len) as prefetcher:
+            prefetcher.submit((index, f'https://cdn{index % 2}/{index}') for index in range(12))
+            batches = self._drain(prefetcher, 4)
+
+        self.assertEqual(sum(len(batch) for batch in batches), 12)
+        self.assertLessEqual(max(peak.values()), 2)
+        self.assertLessEqual(prefetcher.budget.peak, 300)
+
+    def test_failed_loads_are_delivered_with_their_error(self):
+        from .prefetch import MediaPrefetcher
+
+        def loader(url):
+            raise IOError('gone')
+
+        with MediaPrefetcher(loader, workers=2, estimate=1) as prefetcher:
+            prefetcher.submit([('a', 'https://cdn/a.jpg')])
+            (item,) = prefetcher.next_batch(4)
+        self.assertIsInstance(item.error, IOError)
+        self.assertEqual(prefetcher.stats()['failed'], 1)
+
+
+class VideoStatsTest(TestCase):
+    def test_sample_plan_matches_the_old_seek_positions(self):
+        from .video_decode import sample_plan
+        key_frames, samples = sample_plan(300)
+        self.assertEqual(key_frames, list(range(0, 300, 30)))
+        self.assertEqual(samples, list(range(0, 300, 15)))
+        self.assertEqual(sample_plan(4), ([0, 1, 2, 3], [0, 1, 2, 3]))
+        self.assertEqual(sample_plan(0), ([], []))
+
+    def test_one_pass_accumulates_frames_events_and_characteristics(self):
+        import numpy as np
+        from PIL import Image
+        from .video_decode import VideoStats
+
+        dark = np.full((8, 8), 40, dtype=np.uint8)
+        bright = np.full((8, 8), 200, dtype=np.uint8)
+        video = VideoStats(total_frames=3, fps=30)
+        for gray in (dark, dark, bright):
+            video.add_sample(gray)
+            frame = np.stack([gray] * 3, axis=-1)
+            video.add_key_frame(Image.fromarray(frame), frame, gray)
+
+        self.assertEqual(len(video.key_frames), 3)
+        self.assertEqual(video.events, ['low_motion', 'high_motion', 'scene_change'])
+        self.assertEqual(video.nbytes, 3 * 2 * 8 * 8 * 3)
+        characteristics = video.characteristics()
+        self.assertEqual(characteristics['scene_changes'], 1)
+        self.assertEqual(characteristics['activity_level'], 'high')
+        self.assertEqual(characteristics['time_of_day'], 'golden_hour')
+        self.assertEqual(characteristics['environment'], 'indoor')
+
+    def test_empty_accumulator_keeps_the_old_defaults(self):
+        from .video_decode import VideoStats
+        characteristics = VideoStats().characteristics()
+        self.assertEqual(characteristics['activity_level'], 'low')
+        self.assertEqual(characteristics['time_of_day'], 'golden_hour')
+        self.assertEqual(characteristics['scene_changes'], 0)
+
+
+class PixelPipelineGoldenTest(TestCase):
+    """
+    Quality scores and dominant colors from the shared pixel stage against
+    the full-resolution, two-KMeans implementation it replaced. Golden values
+    are (overall, sharpness, lighting, composition, visual appeal, the five
+    old KMeans centers).
+    """
+    GOLDEN = {
+        'china': (8.16, 10.0, 8.41, 4.24, 10.0, ['#c0cdd9', '#201c14', '#96917a', '#615637', '#e6eef8']),
+        'china_1080': (7.8, 8.71, 8.43, 4.32, 10.0, ['#e6eef8', '#5e5539', '#998e77', '#201b13', '#bfcdd9']),
+        'china_blurred': (4.3, 0.02, 8.64, 0.54, 10.0, ['#bfcdda', '#26231b', '#e6eef9', '#5f573d', '#958978']),
+        'china_dark': (2.79, 0.36, 4.22, 1.18, 6.65, ['#2d2f31', '#060503', '#1e1b17', '#12100b', '#25282b']),
+        'flower': (5.11, 4.18, 7.37, 0.07, 10.0, ['#024746', '#c1793e', '#07261d', '#ad2e08', '#e2a76c']),
+        'flower_1080': (4.06, 0.66, 7.37, 0.05, 10.0, ['#014848', '#cd8143', '#aa360d', '#07261e', '#e2af77']),
+        'flower_blurred': (3.91, 0.02, 7.38, 0.22, 10.0, ['#071e15', '#b75626', '#063731', '#d99d63', '#014f52']),
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import cv2
+        import numpy as np
+        from sklearn.datasets import load_sample_images
+
+        cls.images = {}
+        for name, image in zip(('china', 'flower'), load_sample_images().images):
+            image_cv = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            upscaled = cv2.resize(image_cv, (1080, 720), interpolation=cv2.INTER_CUBIC)
+            cls.images[name] = image_cv
+            cls.images[f'{name}_1080'] = upscaled
+            cls.images[f'{name}_blurred'] = cv2.GaussianBlur(upscaled, (15, 15), 5)
+        cls.images['china_dark'] = (cls.images['china_1080'] * 0.2).astype(np.uint8)
+
+    def setUp(self):
+        from unittest import mock
+        from .image_processing import ImageAnalyzer
+        with mock.patch('analytics.image_processing.get_inference_worker', return_value=None), \
+                mock.patch('analytics.image_processing.get_analysis_cache', return_value=None):
+            self.analyzer = ImageAnalyzer()
+
+    @staticmethod
+    def _rgb(hex_color):
+        return [int(hex_color[i:i + 2], 16) for i in (1, 3, 5)]
+
+    def test_quality_scores_stay_within_tolerance(self):
+        from .pixels import prepare_pixels
+        for name, (overall, sharpness, lighting, composition, appeal, _) in self.GOLDEN.items():
+            with self.subTest(image=name):
+                scores = self.analyzer._analyze_image_quality(prepare_pixels(self.images[name]))
+                self.assertAlmostEqual(scores['overall_score'], overall, delta=0.5)
+                self.assertAlmostEqual(scores['sharpness'], sharpness, delta=0.01)
+                self.assertAlmostEqual(scores['lighting_score'], lighting, delta=0.25)
+                self.assertAlmostEqual(scores['composition_score'], composition, delta=1.5)
+                self.assertAlmostEqual(scores['visual_appeal_score'], appeal, delta=0.25)
+
+    @staticmethod
+    def _quantization_error(image, rgb_centers):
+        import numpy as np
+        pixels = image.reshape(-1, 3)[::7, ::-1].astype(float)
+        distances = ((pixels[:, None] - np.asarray(rgb_centers, dtype=float)[None]) ** 2).sum(axis=-1)
+        return np.sqrt(distances.min(axis=1)).mean()
+
+    def test_palette_represents_the_image_as_well_as_the_old_clusters(self):
+        from .pixels import prepare_batch
+        names = list(self.GOLDEN)
+        for name, pixels in zip(names, prepare_batch([self.images[name] for name in names])):
+            with self.subTest(image=name):
+                golden = [self._rgb(color) for color in self.GOLDEN[name][-1]]
+                palette = pixels.stats.palette[:, ::-1]
+                self.assertLessEqual(
+                    self._quantization_error(self.images[name], palette),
+                    self._quantization_error(self.images[name], golden) * 1.1,
+                )
+                colors = self.analyzer._extract_dominant_colors(pixels)
+                self.assertEqual(len(colors), 3)
+                self.assertEqual(colors[0], '#{:02x}{:02x}{:02x}'.format(*(int(c) for c in palette[0])))
+
+    def test_working_resolution_bounds_the_long_side(self):
+        import numpy as np
+        from .pixels import WORKING_MAX_SIDE, prepare_pixels, working_resolution
+        image = np.zeros((1350, 1080, 3), dtype=np.uint8)
+        self.assertEqual(working_resolution(image).shape[:2], (WORKING_MAX_SIDE, round(1080 * WORKING_MAX_SIDE / 1350)))
+        small = np.zeros((300, 400, 3), dtype=np.uint8)
+        self.assertIs(working_resolution(small), small)
+        pixels = prepare_pixels(image)
+        self.assertEqual(pixels.edges.shape, pixels.gray.shape)
+        self.assertAlmostEqual(float(pixels.stats.histogram.sum()), 1.0)
+        self.assertAlmostEqual(float(pixels.stats.palette_weights.sum()), 1.0)
+
+    def test_batch_rows_match_single_images(self):
+        import numpy as np
+        from .pixels import batch_pixel_stats, prepare_batch, prepare_pixels, thumbnail_stack
+        names = ['china', 'flower_1080', 'china_dark']
+        batch = prepare_batch([self.images[name] for name in names])
+        for name, pixels in zip(names, batch):
+            single = prepare_pixels(self.images[name])
+            np.testing.assert_allclose(pixels.stats.palette, single.stats.palette)
+            self.assertAlmostEqual(pixels.stats.brightness, single.stats.brightness)
+            self.assertEqual(pixels.laplacian_var, single.laplacian_var)
+
+        stats = batch_pixel_stats(thumbnail_stack([self.images[name] for name in names]))
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(stats.palettes.shape, (3, 5, 3))
+        # Darker image, lower brightness and contrast
+        self.assertLess(stats.brightness[2], stats.brightness[0])
+        self.assertLess(stats.contrast[2], stats.contrast[0])
+
+    def test_batch_sharpness_matches_single_thumbnails(self):
+        import cv2
+        from .pixels import batch_pixel_stats, thumbnail_stack
+        sharp = self.images['china']
+        stack = thumbnail_stack([sharp, cv2.GaussianBlur(sharp, (9, 9), 0), self.images['flower_1080']])
+        stats = batch_pixel_stats(stack)
+        for index, thumbnail in enumerate(stack):
+            gray = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+            alone = cv2.Laplacian(gray, cv2.CV_16S)[1:-1].var()
+            self.assertAlmostEqual(stats[index].sharpness, float(alone), places=6)
+        self.assertLess(stats.sharpness[1], stats.sharpness[0])
+
+    def test_analyze_post_images_prepares_pixels_once_per_batch(self):
+        from unittest import mock
+        from PIL import Image
+        from . import image_processing
+
+        loaded = {
+            f'https://cdn/{name}.jpg': (Image.fromarray(image[..., ::-1]), image)
+            for name, image in self.images.items() if name in ('china', 'flower')
+        }
+        # Caption NLP needs NLTK corpora; not what this test is about
+        with mock.patch.object(self.analyzer, '_extract_keywords', return_value=['street']), \
+                mock.patch.object(image_processing, 'prepare_batch', wraps=image_processing.prepare_batch) as prepare:
+            results = self.analyzer.analyze_post_images(list(loaded), loaded=loaded)
+
+        prepare.assert_called_once()
+        self.assertEqual(len(prepare.call_args.args[0]), 2)
+        self.assertTrue(all(result['processing_success'] for result in results))
+
+
+class OnnxExportTest(TestCase):
+    """Export/quantize/session path of the onnx backends, on a tiny module instead of BLIP/ViT"""
+
+    def setUp(self):
+        from core.model_registry import module_available
+        if not module_available('torch', 'onnx', 'onnxruntime'):
+            self.skipTest('torch, onnx and onnxruntime not installed')
+
+    def test_exported_graph_runs_in_a_session(self):
+        import tempfile
+        import numpy as np
+        import torch
+        from .vision_models import export_graph, onnx_session
+
+        torch.manual_seed(0)
+        module = torch.nn.Sequential(torch.nn.Flatten(), torch.nn.Linear(3 * 8 * 8, 4)).eval()
+        pixels = torch.rand(2, 3, 8, 8)
+        with torch.inference_mode():
+            expected = module(pixels).numpy()
+
+        with tempfile.TemporaryDirectory() as directory:
+            for quantize, tolerance in ((False, 1e-4), (True, 0.1)):
+                path = export_graph(module, directory, 'tiny', (8, 8), 'logits', quantize=quantize)
+                self.assertEqual(path.name, 'tiny.int8.onnx' if quantize else 'tiny.onnx')
+                (logits,) = onnx_session(path).run(None, {'pixel_values': pixels.numpy()})
+                np.testing.assert_allclose(logits, expected, atol=tolerance)
+
+    def test_graph_stem_changes_with_revision_and_opset(self):
+        from unittest import mock
+        from . import vision_models
+
+        stem = vision_models.graph_stem('google/vit-base-patch16-224', 'abc123', 'classifier')
+        self.assertTrue(stem.startswith('google--vit-base-patch16-224@abc123-classifier-'))
+        self.assertNotEqual(stem, vision_models.graph_stem('google/vit-base-patch16-224', 'def456', 'classifier'))
+        with mock.patch.object(vision_models, 'ONNX_OPSET', vision_models.ONNX_OPSET + 1):
+            self.assertNotEqual(stem, vision_models.graph_stem('google/vit-base-patch16-224', 'abc123', 'classifier'))
@@ -0,0 +1,174 @@
+# analytics/timeseries.py
+"""
+Engagement history on top of MetricSnapshot.
+
+Writers upsert one hourly sample per entity; compact_snapshots() downsamples
+hour -> day -> week and applies METRIC_SNAPSHOT_RETENTION_DAYS. Readers only
+ever touch one (entity, granularity) index range, so a trend read scans at
+most one row per bucket requested. Every write to an influencer's or the
+platform's series bumps its series_tag(), which the trend views are cached
+under.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.http_cache import invalidate_tags
+
+from .models import MetricSnapshot
+
+logger = logging.getLogger('analytics')
+
+UPSERT_BATCH_SIZE = 1000
+SNAPSHOT_VALUE_FIELDS = ['followers', 'likes', 'comments', 'views']
+SNAPSHOT_KEY_FIELDS = ['entity_type', 'entity_id', 'granularity', 'bucket_start']
+
+# Coarser level each granularity rolls up into
+DOWNSAMPLE_TARGET = {
+    MetricSnapshot.HOUR: MetricSnapshot.DAY,
+    MetricSnapshot.DAY: MetricSnapshot.WEEK,
+}
+# Entities whose series are served by cached views
+TAGGED_ENTITIES = {MetricSnapshot.ENTITY_PLATFORM, MetricSnapshot.ENTITY_INFLUENCER}
+
+
+def series_tag(entity_type, entity_id):
+    return f"snapshots:{entity_type}:{entity_id}"
+
+
+def bucket_start(moment, granularity):
+    """Truncate `moment` to the start of its hour / day / ISO week"""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == MetricSnapshot.HOUR:
+        return moment
+    moment = moment.replace(hour=0)
+    if granularity == MetricSnapshot.DAY:
+        return moment
+    return moment - timedelta(days=moment.weekday())
+
+
+def _upsert(snapshots):
+    """Insert-or-overwrite by bucket; later samples in the same bucket win"""
+    for start in range(0, len(snapshots), UPSERT_BATCH_SIZE):
+        MetricSnapshot.objects.bulk_create(
+            snapshots[start:start + UPSERT_BATCH_SIZE],
+            update_conflicts=True,
+            unique_fields=SNAPSHOT_KEY_FIELDS,
+            update_fields=SNAPSHOT_VALUE_FIELDS,
+        )
+    tags = {
+        series_tag(snapshot.entity_type, snapshot.entity_id)
+        for snapshot in snapshots if snapshot.entity_type in TAGGED_ENTITIES
+    }
+    if tags:
+        invalidate_tags(*tags)
+
+
+def _hourly(entity_type, entity_id, at, **values):
+    return MetricSnapshot(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        granularity=MetricSnapshot.HOUR,
+        bucket_start=bucket_start(at, MetricSnapshot.HOUR),
+        **values,
+    )
+
+
+def record_content_snapshots(entity_type, items, at=None):
+    """Hourly samples for scraped posts or reels (ENTITY_POST / ENTITY_REEL)"""
+    at = at or timezone.now()
+    _upsert([
+        _hourly(
+            entity_type, item.id, at,
+            likes=item.likes_count or 0,
+            comments=item.comments_count or 0,
+            views=getattr(item, 'views_count', 0) or 0,
+        )
+        for item in items
+    ])
+
+
+def record_influencer_snapshot(influencer, totals, at=None):
+    """Hourly sample of follower count plus content totals (DataProcessor.aggregate_content_totals)"""
+    _upsert([_hourly(
+        MetricSnapshot.ENTITY_INFLUENCER, influencer.id, at or timezone.now(),
+        followers=influencer.followers_count,
+        likes=totals['total_likes'],
+        comments=totals['total_comments'],
+        views=totals['post_views'] + totals['reel_views'],
+    )])
+
+
+def record_platform_snapshot(followers, likes, comments, views, at=None):
+    _upsert([_hourly(
+        MetricSnapshot.ENTITY_PLATFORM, 0, at or timezone.now(),
+        followers=followers, likes=likes, comments=comments, views=views,
+    )])
+
+
+def downsample(source, since):
+    """
+    Roll `source` rows with bucket_start >= since into the next granularity.
+    Rows stream in bucket order, so the dict ends up holding each target
+    bucket's last sample. Returns the number of target rows written.
+    """
+    target = DOWNSAMPLE_TARGET[source]
+    rows = (
+        MetricSnapshot.objects
+        .filter(granularity=source, bucket_start__gte=since)
+        .order_by('bucket_start')
+        .values_list('entity_type', 'entity_id', 'bucket_start', *SNAPSHOT_VALUE_FIELDS)
+    )
+
+    latest = {}
+    for entity_type, entity_id, start, *values in rows.iterator(chunk_size=UPSERT_BATCH_SIZE):
+        latest[(entity_type, entity_id, bucket_start(start, target))] = values
+
+    _upsert([
+        MetricSnapshot(
+            entity_type=entity_type,
+            entity_id=entity_id,
+            granularity=target,
+            bucket_start=start,
+            **dict(zip(SNAPSHOT_VALUE_FIELDS, values)),
+        )
+        for (entity_type, entity_id, start), values in latest.items()
+    ])
+    return len(latest)
+
+
+def compact_snapshots(now=None):
+    """Downsample recent hourly/daily rows, then prune each level past retention"""
+    now = now or timezone.now()
+    retention = settings.METRIC_SNAPSHOT_RETENTION_DAYS
+
+    # Re-roll yesterday too, in case the previous run missed its last hours
+    days_written = downsample(
+        MetricSnapshot.HOUR, bucket_start(now - timedelta(days=1), MetricSnapshot.DAY)
+    )
+    weeks_written = downsample(
+        MetricSnapshot.DAY, bucket_start(now - timedelta(days=7), MetricSnapshot.WEEK)
+    )
+
+    pruned = {}
+    for granularity, days in retention.items():
+        deleted, _ = MetricSnapshot.objects.filter(
+            granularity=granularity, bucket_start__lt=now - timedelta(days=days)
+        ).delete()
+        pruned[granularity] = deleted
+
+    logger.info(f"Metric snapshots compacted: {days_written} daily, {weeks_written} weekly rows, pruned {pruned}")
+    return {'daily_rows': days_written, 'weekly_rows': weeks_written, 'pruned': pruned}
+
+
+def read_series(entity_type, entity_id, days, granularity=MetricSnapshot.DAY, now=None):
+    """Oldest-first snapshot rows for one entity over the last `days` days"""
+    now = now or timezone.now()
+    since = bucket_start(now - timedelta(days=days - 1), granularity)
+    return list(
+        MetricSnapshot.objects
+        .filter(entity_type=entity_type, entity_id=entity_id, granularity=granularity, bucket_start__gte=since)
+        .order_by('bucket_start')
+    )
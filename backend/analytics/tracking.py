@@ -0,0 +1,130 @@
+# analytics/tracking.py
+"""
+Incremental engagement tracking behind the hourly track_engagement_metrics task.
+
+An influencer's engagement metrics are only recomputed when something they
+depend on changed since the last finished run:
+
+* a post or reel was saved since that run started (Post/Reel.updated_at);
+* content was deleted (the post_delete signal sets EngagementTrackingState.dirty);
+* followers_count differs from the value the metrics were computed with;
+* or the influencer has never been computed.
+
+Everyone else is skipped. Stale influencers are computed BATCH_SIZE at a
+time by the columnar EngagementEngine. Every run records its recomputed/skipped/failed
+counts in EngagementTrackingRun.
+"""
+import logging
+
+from django.db.models import Avg, F, Q, Sum
+from django.utils import timezone
+
+from influencers.models import Influencer
+from posts.models import Post
+from reels.models import Reel
+
+from .data_processing import DataProcessor
+from .models import EngagementTrackingRun, EngagementTrackingState
+
+logger = logging.getLogger('analytics')
+
+# Influencers per EngagementEngine load / bulk_update
+BATCH_SIZE = 500
+
+
+def _watermark():
+    """Start of the last finished run; content saved at or after it may be unseen"""
+    last = EngagementTrackingRun.objects.filter(finished_at__isnull=False).order_by('-started_at').first()
+    return last.started_at if last else None
+
+
+def stale_influencers(watermark):
+    """Influencers whose engagement metrics are out of date as of `watermark` (all when None)"""
+    if watermark is None:
+        return Influencer.objects.all()
+
+    changed = Q(id__in=Post.objects.filter(updated_at__gte=watermark).values('influencer_id'))
+    changed |= Q(id__in=Reel.objects.filter(updated_at__gte=watermark).values('influencer_id'))
+    return Influencer.objects.filter(
+        changed
+        | Q(engagement_state__isnull=True)
+        | Q(engagement_state__dirty=True)
+        | ~Q(engagement_state__followers_count=F('followers_count'))
+    )
+
+
+def mark_dirty(influencer_id):
+    EngagementTrackingState.objects.filter(influencer_id=influencer_id).update(dirty=True)
+
+
+def track_engagement(full=False):
+    """Recompute stale influencers (every influencer when `full`) and record the run"""
+    run = EngagementTrackingRun.objects.create(started_at=timezone.now(), full=full)
+    influencers = list(stale_influencers(None if full else _watermark()).order_by('id'))
+
+    # Cleared up front, so deletions that land while we compute mark them dirty again
+    EngagementTrackingState.objects.filter(
+        influencer_id__in=[influencer.id for influencer in influencers]
+    ).update(dirty=False)
+
+    processor = DataProcessor()
+    states = []
+    failed = []
+    for start in range(0, len(influencers), BATCH_SIZE):
+        batch = influencers[start:start + BATCH_SIZE]
+        try:
+            processor.calculate_engagement_metrics_many(batch)
+            computed = batch
+        except Exception as e:
+            logger.warning(f"Batched engagement metrics failed, retrying one by one: {e}")
+            computed = []
+            for influencer in batch:
+                try:
+                    processor.calculate_engagement_metrics_many([influencer])
+                    computed.append(influencer)
+                except Exception as e:
+                    failed.append(influencer.id)
+                    logger.error(f"Engagement metrics failed for @{influencer.username}: {e}")
+        states.extend(
+            EngagementTrackingState(
+                influencer=influencer, followers_count=influencer.followers_count, computed_at=run.started_at,
+            )
+            for influencer in computed
+        )
+
+    EngagementTrackingState.objects.bulk_create(
+        states,
+        update_conflicts=True,
+        unique_fields=['influencer'],
+        update_fields=['followers_count', 'computed_at'],
+        batch_size=500,
+    )
+    # Failures are retried next run regardless of the watermark
+    EngagementTrackingState.objects.filter(influencer_id__in=failed).update(dirty=True)
+
+    run.influencers_total = Influencer.objects.count()
+    run.recomputed = len(states)
+    run.failed = len(failed)
+    run.skipped = run.influencers_total - len(influencers)
+    run.finished_at = timezone.now()
+    run.save()
+
+    platform = Influencer.objects.aggregate(
+        total_followers=Sum('followers_count'), avg_engagement_rate=Avg('engagement_rate'),
+    )
+    logger.info(
+        f"Engagement tracking: {run.recomputed} recomputed, {run.skipped} skipped, "
+        f"{run.failed} failed of {run.influencers_total}"
+    )
+    return {
+        'run_id': run.id,
+        'full': full,
+        'total_influencers': run.influencers_total,
+        'recomputed_count': run.recomputed,
+        'skipped_count': run.skipped,
+        'failed_count': run.failed,
+        'platform_metrics': {
+            'total_followers': platform['total_followers'] or 0,
+            'avg_engagement_rate': round(platform['avg_engagement_rate'] or 0, 2),
+        },
+    }
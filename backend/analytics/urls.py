@@ -18,4 +18,8 @@ urlpatterns = [
     path('content/insights/', 
          views.ContentInsightsAPIView.as_view(), 
          name='content-insights'),
+         
+    path('hashtags/', 
+         views.HashtagAnalyticsAPIView.as_view(), 
+         name='hashtag-analytics'),
 ]
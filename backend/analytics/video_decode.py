@@ -0,0 +1,124 @@
+# analytics/video_decode.py
+"""
+Per-reel statistics gathered during a single sequential decode pass.
+
+VideoAnalyzer.decode_video reads a reel front to back exactly once: frames
+that aren't sampled are only grab()bed, sampled ones are read() and handed
+to one VideoStats accumulator. It collects everything the video analysis
+needs - the key frames passed (in memory) to the image analyzer, the
+frame-difference events between consecutive key frames, and the scene
+change, motion and brightness figures behind activity level, environment
+and time of day - so nothing reopens or seeks the file afterwards.
+
+Only numpy is used here; colour conversion happens in the decoder.
+"""
+import numpy as np
+
+KEY_FRAMES = 10
+STAT_SAMPLES = 20
+
+# Grey-level difference above which a pixel counts as changed
+CHANGE_THRESHOLD = 30
+SCENE_CHANGE_RATIO = 0.3
+CAMERA_MOVEMENT_RATIO = 0.1
+
+# Mean absolute grey-level difference between samples
+HIGH_MOTION = 20
+MEDIUM_MOTION = 10
+
+
+def sample_plan(total_frames: int, key_frames: int = KEY_FRAMES, stat_samples: int = STAT_SAMPLES) -> tuple:
+    """(key frame indexes, statistics sample indexes) for a video of `total_frames` frames"""
+    if total_frames <= 0:
+        return [], []
+    key_step = max(1, total_frames // key_frames)
+    stat_step = max(1, total_frames // stat_samples)
+    return list(range(0, total_frames, key_step))[:key_frames], list(range(0, total_frames, stat_step))
+
+
+def frame_difference(prev_gray, gray) -> tuple:
+    """(share of changed pixels, mean absolute difference) between two greyscale frames"""
+    diff = np.abs(gray.astype(np.int16) - prev_gray.astype(np.int16))
+    return float(np.count_nonzero(diff > CHANGE_THRESHOLD)) / diff.size, float(diff.mean())
+
+
+def motion_level(motion: float) -> str:
+    if motion > HIGH_MOTION:
+        return 'high'
+    if motion > MEDIUM_MOTION:
+        return 'medium'
+    return 'low'
+
+
+class VideoStats:
+    """
+    Accumulator fed by the decode pass. add_sample() takes the greyscale
+    statistics samples, add_key_frame() the key frames; both arrive in
+    stream order. An accumulator without key frames means nothing could be
+    decoded.
+    """
+
+    def __init__(self, total_frames: int = 0, fps: float = 0.0):
+        self.total_frames = total_frames
+        self.fps = fps
+        self.key_frames = []  # (PIL RGB, OpenCV BGR) pairs
+        self.events = []
+        self.scene_changes = 0
+        self.motion_levels = []
+        self.brightness_levels = []
+        self._prev_key = None
+        self._prev_sample = None
+
+    def add_key_frame(self, image_pil, image_cv, gray):
+        if self._prev_key is not None:
+            self.events.extend(self._key_frame_events(self._prev_key, gray))
+        self._prev_key = gray
+        self.key_frames.append((image_pil, image_cv))
+
+    def add_sample(self, gray):
+        self.brightness_levels.append(float(gray.mean()))
+        if self._prev_sample is not None:
+            changed, motion = frame_difference(self._prev_sample, gray)
+            if changed > SCENE_CHANGE_RATIO:
+                self.scene_changes += 1
+            self.motion_levels.append(motion)
+        self._prev_sample = gray
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the decoded key frames (the prefetch budget counts this)"""
+        total = 0
+        for image_pil, image_cv in self.key_frames:
+            width, height = image_pil.size
+            total += width * height * len(image_pil.getbands()) + image_cv.nbytes
+        return total
+
+    def characteristics(self) -> dict:
+        avg_motion = float(np.mean(self.motion_levels)) if self.motion_levels else 0.0
+        avg_brightness = float(np.mean(self.brightness_levels)) if self.brightness_levels else 128.0
+
+        # Determine time of day from brightness
+        if avg_brightness > 150:
+            time_of_day = 'day'
+        elif avg_brightness < 80:
+            time_of_day = 'night'
+        else:
+            time_of_day = 'golden_hour'
+
+        return {
+            'scene_changes': self.scene_changes,
+            'activity_level': motion_level(avg_motion),
+            'primary_subject': 'person',  # Default, could be enhanced
+            'environment': 'indoor' if avg_brightness < 120 else 'outdoor',
+            'time_of_day': time_of_day,
+        }
+
+    @staticmethod
+    def _key_frame_events(prev_gray, gray) -> list:
+        changed, motion = frame_difference(prev_gray, gray)
+        events = [f"{motion_level(motion)}_motion"]
+        if changed > SCENE_CHANGE_RATIO:
+            events.append('scene_change')
+        elif changed > CAMERA_MOVEMENT_RATIO:
+            events.append('camera_movement')
+        return events
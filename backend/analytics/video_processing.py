@@ -1,26 +1,32 @@
 import cv2
 import numpy as np
-import torch
 from PIL import Image
-import requests
-from io import BytesIO
 import logging
-import tempfile
 import os
+import hashlib
 from collections import Counter
+from core.media_store import get_media_store
 from .image_processing import ImageAnalyzer
+from .prefetch import MediaPrefetcher
+from .video_decode import VideoStats, sample_plan
 
 logger = logging.getLogger('analytics')
 
+# Bump when the video analysis logic changes, so cached results are recomputed
+VIDEO_ANALYSIS_VERSION = 'video-v2'
+
+# In-flight bytes reserved per video before its key frames are decoded
+VIDEO_PREFETCH_ESTIMATE = 32 * 1024 * 1024
+
 class VideoAnalyzer:
     """
     WORKING video analysis for Instagram reels
     Implements video-level analysis requirements
     """
     
-    def __init__(self):
-        self.image_analyzer = ImageAnalyzer()
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    def __init__(self, image_analyzer=None):
+        # Key frames go through an ImageAnalyzer; pass the caller's to share it
+        self.image_analyzer = image_analyzer or ImageAnalyzer()
         
         # Video vibe keywords (different from image vibes)
         self.video_vibe_keywords = {
@@ -46,46 +52,36 @@ class VideoAnalyzer:
             ]
         }
     
-    def analyze_reel_video(self, video_url: str, caption: str = '') -> dict:
+    def analyze_reel_video(self, video_url: str, caption: str = '', loaded: VideoStats = None) -> dict:
         """
         COMPLETE video analysis implementation
         Returns all required data for reels analysis
+        `loaded` is a load_video() result already decoded by the prefetch stage.
         """
         try:
             logger.info(f"Analyzing video: {video_url}")
             
-            # Download and process video
-            video_path = self._download_video(video_url)
-            if not video_path:
-                return self._default_video_analysis()
+            cache = self.image_analyzer.cache
+            version = self.analysis_version(caption)
+            cached = cache.get_by_url('video', video_url, version) if cache else None
+            if cached is not None:
+                return cached
             
-            # Extract key frames from video
-            frames = self._extract_key_frames(video_path)
-            if not frames:
+            # Download and decode the reel (once) into key frames and stats
+            video = loaded if loaded is not None else self.load_video(video_url)
+            if not video.key_frames:
                 return self._default_video_analysis()
             
-            # Analyze frames for objects and events
-            detected_events = []
-            detected_objects = []
-            frame_analyses = []
+            # Same key frames (and caption) -> same analysis, e.g. a reposted reel
+            digest = self.media_digest(video.key_frames)
+            cached = cache.get('video', digest, version, url=video_url) if cache else None
+            if cached is not None:
+                return cached
             
-            for i, frame in enumerate(frames):
-                # Convert frame to PIL Image for analysis
-                frame_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                
-                # Use image analyzer on key frames
-                frame_analysis = self.image_analyzer.analyze_post_image(
-                    self._save_temp_frame(frame)
-                )
-                frame_analyses.append(frame_analysis)
-                
-                # Collect objects and potential events
-                detected_objects.extend(frame_analysis.get('detected_objects', []))
-                
-                # Analyze for motion/events
-                if i > 0:
-                    motion_events = self._detect_motion_events(frames[i-1], frame)
-                    detected_events.extend(motion_events)
+            # Key frames go to the image analyzer in memory, as one batch
+            frame_analyses = self.image_analyzer.analyze_decoded_images(video.key_frames, label=f"{video_url} frame")
+            detected_objects = [obj for fa in frame_analyses for obj in fa.get('detected_objects', [])]
+            detected_events = video.events
             
             # Process collected data
             unique_objects = list(set(detected_objects))
@@ -101,12 +97,8 @@ class VideoAnalyzer:
                 caption, unique_objects, unique_events
             )
             
-            # Analyze video characteristics
-            video_stats = self._analyze_video_characteristics(video_path)
-            
-            # Clean up temp file
-            if os.path.exists(video_path):
-                os.unlink(video_path)
+            # Scene changes, activity and brightness from the same decode pass
+            video_stats = video.characteristics()
             
             result = {
                 'detected_events': unique_events[:10],  # Top 10 events
@@ -119,9 +111,12 @@ class VideoAnalyzer:
                 'environment': video_stats['environment'],
                 'time_of_day': video_stats['time_of_day'],
                 'dominant_colors': frame_analyses[0].get('dominant_colors', []) if frame_analyses else [],
-                'overall_quality': np.mean([fa.get('quality_score', 5.0) for fa in frame_analyses])
+                'overall_quality': float(np.mean([fa.get('quality_score', 5.0) for fa in frame_analyses]))
             }
             
+            if cache:
+                cache.put('video', digest, version, result, url=video_url)
+            
             logger.info(f"Video analysis complete. Vibe: {vibe}, Events: {len(unique_events)}")
             return result
             
@@ -129,120 +124,96 @@ class VideoAnalyzer:
             logger.error(f"Video analysis failed for {video_url}: {str(e)}")
             return self._default_video_analysis()
     
-    def _download_video(self, video_url: str) -> str:
-        """Download video to temporary file"""
+    def analyze_reel_videos(self, videos: list) -> list:
+        """
+        analyze_reel_video for many (video_url, caption) pairs, in order.
+        Upcoming videos are downloaded and decoded by the prefetch stage
+        while earlier ones are being analyzed; videos already in the analysis
+        cache under their URL are not prefetched.
+        """
+        results = [None] * len(videos)
+        cache = self.image_analyzer.cache
+        to_fetch = []
+        for index, (video_url, caption) in enumerate(videos):
+            if cache and cache.has_url('video', video_url, self.analysis_version(caption)):
+                # Analyzed before under this URL: answered from the cache, never downloaded
+                results[index] = self.analyze_reel_video(video_url, caption)
+            else:
+                to_fetch.append((index, video_url))
+        
+        with MediaPrefetcher(self.load_video, estimate=VIDEO_PREFETCH_ESTIMATE) as prefetcher:
+            prefetcher.submit(to_fetch)
+            while True:
+                batch = prefetcher.next_batch(1)
+                if not batch:
+                    break
+                item = batch[0]
+                loaded = item.value if item.error is None else VideoStats()
+                results[item.key] = self.analyze_reel_video(item.url, videos[item.key][1], loaded=loaded)
+                prefetcher.release(batch)
+        return results
+    
+    def load_video(self, video_url: str) -> VideoStats:
+        """Download and decode the reel; empty VideoStats on failure. Safe to call from prefetch threads"""
+        video_path = self._download_video(video_url)
+        if not video_path:
+            return VideoStats()
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(video_url, headers=headers, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-            
-            for chunk in response.iter_content(chunk_size=8192):
-                temp_file.write(chunk)
-            
-            temp_file.close()
-            return temp_file.name
-            
+            return self.decode_video(video_path)
         except Exception as e:
-            logger.error(f"Failed to download video {video_url}: {e}")
-            return None
+            logger.error(f"Video decode failed for {video_url}: {e}")
+            return VideoStats()
     
-    def _extract_key_frames(self, video_path: str, max_frames: int = 10) -> list:
-        """Extract key frames from video for analysis"""
+    def decode_video(self, video_path: str) -> VideoStats:
+        """
+        Read the video once, front to back: skipped frames are only grab()bed,
+        key frames and statistics samples are read() and fed to VideoStats.
+        Sequential reads replace per-sample CAP_PROP_POS_FRAMES seeks, which
+        re-decode from the previous keyframe every time.
+        """
+        cap = cv2.VideoCapture(video_path)
         try:
-            cap = cv2.VideoCapture(video_path)
-            frames = []
-            
-            # Get video properties
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             fps = cap.get(cv2.CAP_PROP_FPS)
-            
-            if total_frames == 0 or fps == 0:
-                cap.release()
-                return []
-            
-            # Calculate frame intervals
-            frame_interval = max(1, total_frames // max_frames)
-            
-            frame_idx = 0
-            while len(frames) < max_frames:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
+            video = VideoStats(total_frames, fps)
+            key_indexes, sample_indexes = (set(indexes) for indexes in sample_plan(total_frames))
+            if not key_indexes or fps == 0:
+                return video
+            
+            for index in range(max(key_indexes | sample_indexes) + 1):
+                if index not in key_indexes and index not in sample_indexes:
+                    if not cap.grab():
+                        break
+                    continue
                 
+                ret, frame = cap.read()
                 if not ret:
                     break
-                
-                frames.append(frame)
-                frame_idx += frame_interval
-                
-                if frame_idx >= total_frames:
-                    break
-            
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                if index in sample_indexes:
+                    video.add_sample(gray)
+                if index in key_indexes:
+                    video.add_key_frame(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)), frame, gray)
+            return video
+        finally:
             cap.release()
-            return frames
-            
-        except Exception as e:
-            logger.error(f"Frame extraction failed: {e}")
-            return []
     
-    def _save_temp_frame(self, frame) -> str:
-        """Save frame to temporary file and return URL-like path"""
-        try:
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            cv2.imwrite(temp_file.name, frame)
-            temp_file.close()
-            
-            # For analysis, we'll use the file path
-            return temp_file.name
-            
-        except:
-            return None
+    def analysis_version(self, caption: str) -> str:
+        """Cache version: analyzer revision, image models, and the caption the tags/vibe draw on"""
+        caption_hash = hashlib.sha1(caption.encode('utf-8')).hexdigest()[:12]
+        return f"{VIDEO_ANALYSIS_VERSION}:{self.image_analyzer.analysis_version}:{caption_hash}"
     
-    def _detect_motion_events(self, prev_frame, curr_frame) -> list:
-        """Detect motion-based events between frames"""
+    def media_digest(self, key_frames: list) -> str:
+        """Perceptual hashes of the key frames, in order"""
+        return '-'.join(self.image_analyzer.media_digest(image_pil) for image_pil, _ in key_frames)
+    
+    def _download_video(self, video_url: str) -> str:
+        """Local path of the video in the shared media store (kept there for re-analysis)"""
         try:
-            events = []
-            
-            # Convert to grayscale
-            prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-            curr_gray = cv2.cvtColor(curr_frame, cv2.COLOR_BGR2GRAY)
-            
-            # Calculate optical flow
-            flow = cv2.calcOpticalFlowPyrLK(
-                prev_gray, curr_gray, None, None
-            )
-            
-            # Calculate motion magnitude
-            if flow[0] is not None:
-                motion_magnitude = np.mean(np.abs(flow[0]))
-                
-                # Classify motion level
-                if motion_magnitude > 5.0:
-                    events.append('high_motion')
-                elif motion_magnitude > 2.0:
-                    events.append('medium_motion')
-                else:
-                    events.append('low_motion')
-            
-            # Detect scene changes using frame difference
-            diff = cv2.absdiff(prev_gray, curr_gray)
-            change_percent = np.sum(diff > 30) / diff.size
-            
-            if change_percent > 0.3:
-                events.append('scene_change')
-            elif change_percent > 0.1:
-                events.append('camera_movement')
-            
-            return events
-            
+            return str(get_media_store().fetch(video_url).path)
         except Exception as e:
-            logger.warning(f"Motion detection failed: {e}")
-            return []
+            logger.error(f"Failed to download video {video_url}: {e}")
+            return None
     
     def _generate_video_tags(self, objects: list, events: list, caption: str) -> list:
         """Generate descriptive tags for video"""
@@ -344,86 +315,6 @@ class VideoAnalyzer:
             logger.warning(f"Video vibe classification failed: {e}")
             return 'casual_daily_life'
     
-    def _analyze_video_characteristics(self, video_path: str) -> dict:
-        """Analyze video characteristics"""
-        try:
-            cap = cv2.VideoCapture(video_path)
-            
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            
-            # Sample frames for analysis
-            scene_changes = 0
-            prev_frame = None
-            motion_levels = []
-            brightness_levels = []
-            
-            frame_count = 0
-            sample_interval = max(1, total_frames // 20)  # Sample 20 frames
-            
-            while frame_count < total_frames:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
-                ret, frame = cap.read()
-                
-                if not ret:
-                    break
-                
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                brightness_levels.append(np.mean(gray))
-                
-                if prev_frame is not None:
-                    # Detect scene changes
-                    diff = cv2.absdiff(prev_frame, gray)
-                    if np.sum(diff > 30) / diff.size > 0.3:
-                        scene_changes += 1
-                    
-                    # Calculate motion
-                    motion = np.sum(diff) / diff.size
-                    motion_levels.append(motion)
-                
-                prev_frame = gray
-                frame_count += sample_interval
-            
-            cap.release()
-            
-            # Analyze results
-            avg_motion = np.mean(motion_levels) if motion_levels else 0
-            avg_brightness = np.mean(brightness_levels) if brightness_levels else 128
-            
-            # Classify activity level
-            if avg_motion > 20:
-                activity_level = 'high'
-            elif avg_motion > 10:
-                activity_level = 'medium'
-            else:
-                activity_level = 'low'
-            
-            # Determine time of day from brightness
-            if avg_brightness > 150:
-                time_of_day = 'day'
-            elif avg_brightness < 80:
-                time_of_day = 'night'
-            else:
-                time_of_day = 'golden_hour'
-            
-            return {
-                'scene_changes': scene_changes,
-                'activity_level': activity_level,
-                'primary_subject': 'person',  # Default, could be enhanced
-                'environment': 'indoor' if avg_brightness < 120 else 'outdoor',
-                'time_of_day': time_of_day
-            }
-            
-        except Exception as e:
-            logger.error(f"Video characteristics analysis failed: {e}")
-            return {
-                'scene_changes': 0,
-                'activity_level': 'medium',
-                'primary_subject': 'person',
-                'environment': 'indoor',
-                'time_of_day': 'day'
-            }
-    
     def _default_video_analysis(self) -> dict:
         """Return default analysis when processing fails"""
         return {
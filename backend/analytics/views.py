@@ -1,165 +1,290 @@
-﻿from django.shortcuts import render
+from django.shortcuts import render
 from django.http import JsonResponse
+from django.db.models import Max
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view
 from datetime import datetime, timedelta
 
+from core.http_cache import cached_response
+
+from .models import CategoryRollup, ContentTag, DailyEngagementRollup, MetricSnapshot, PlatformRollup
+from .tags import TOP_ORDERINGS, top_tags, trending_tags
+from .timeseries import read_series, series_tag
+
+TREND_DAYS_DEFAULT = 7
+TREND_DAYS_MAX = 90
+TAG_LIMIT_DEFAULT = 20
+TAG_LIMIT_MAX = 100
+INSIGHT_TAG_LIMIT = 10
+TAG_KINDS = {'hashtag': ContentTag.HASHTAG, 'mention': ContentTag.MENTION}
+
+
+def _current_rollup():
+    """
+    Platform rollup row. Until the refresh_analytics_rollups beat task has
+    run once, an empty unsaved row (refreshed_at None) so reads stay cheap.
+    """
+    return PlatformRollup.current() or PlatformRollup()
+
+
+def _rollup_validators(request, **kwargs):
+    """Rollup-backed views only change when refresh_rollups runs"""
+    return tuple(PlatformRollup.objects.filter(pk=PlatformRollup.SINGLETON_ID).values_list('refreshed_at', flat=True))
+
+
+def _trend_series(request):
+    """(entity_type, entity_id) of the series a trends request reads; None if ?influencer= is malformed"""
+    try:
+        influencer_id = int(request.query_params.get('influencer', 0))
+    except ValueError:
+        return None
+    if influencer_id:
+        return MetricSnapshot.ENTITY_INFLUENCER, influencer_id
+    return MetricSnapshot.ENTITY_PLATFORM, 0
+
+
+def _trend_tags(request, **kwargs):
+    series = _trend_series(request)
+    return ['rollups'] + ([series_tag(*series)] if series else [])
+
+
+def _trend_validators(request, **kwargs):
+    """Rollup state, plus the influencer's newest daily snapshot for ?influencer= requests"""
+    state = _rollup_validators(request)
+    series = _trend_series(request)
+    if series and series[0] == MetricSnapshot.ENTITY_INFLUENCER:
+        state += (MetricSnapshot.objects.filter(
+            entity_type=series[0], entity_id=series[1], granularity=MetricSnapshot.DAY,
+        ).aggregate(latest=Max('bucket_start'))['latest'],)
+    return state
+
+
+def _growth_rate(daily):
+    """Engagement-rate change of the newer half of `daily` over the older half, in %"""
+    if len(daily) < 2:
+        return 0.0
+    middle = len(daily) // 2
+    older, newer = daily[:middle], daily[middle:]
+    older_rate = sum(day.avg_engagement_rate for day in older) / len(older)
+    newer_rate = sum(day.avg_engagement_rate for day in newer) / len(newer)
+    if older_rate == 0:
+        return 0.0
+    return round((newer_rate - older_rate) / older_rate * 100, 2)
+
+
+def _history(snapshots):
+    """Daily snapshot rows as running totals plus day-over-day deltas"""
+    history = []
+    previous = None
+    for snapshot in snapshots:
+        history.append({
+            'date': snapshot.bucket_start.strftime('%Y-%m-%d'),
+            'followers': snapshot.followers,
+            'likes': snapshot.likes,
+            'comments': snapshot.comments,
+            'views': snapshot.views,
+            'followers_gained': (
+                snapshot.followers - previous.followers
+                if previous and snapshot.followers is not None and previous.followers is not None else None
+            ),
+            'likes_gained': snapshot.likes - previous.likes if previous else None,
+            'comments_gained': snapshot.comments - previous.comments if previous else None,
+        })
+        previous = snapshot
+    return history
+
+
+def _follower_growth_rate(snapshots):
+    followers = [s.followers for s in snapshots if s.followers]
+    if len(followers) < 2:
+        return 0.0
+    return round((followers[-1] - followers[0]) / followers[0] * 100, 2)
+
+
+def _ranked_hours(posting_hours):
+    """Posting hours ordered best engagement rate first"""
+    ranked = sorted(posting_hours.items(), key=lambda item: item[1]['engagement_rate'], reverse=True)
+    return [int(hour) for hour, _ in ranked]
+
+
 class AnalyticsOverviewAPIView(APIView):
-    """Analytics Overview API - Main endpoint"""
-    
+    """Analytics Overview API - Main endpoint (served from PlatformRollup)"""
+
+    @cached_response(tags=['rollups'], validators=_rollup_validators)
     def get(self, request):
+        rollup = _current_rollup()
+        recent = list(DailyEngagementRollup.objects.order_by('-day')[:TREND_DAYS_DEFAULT * 2])
+        recent.reverse()
+
         data = {
             'overview': {
-                'total_influencers': 25,
-                'total_posts': 1250,
-                'total_reels': 340,
-                'avg_engagement_rate': 4.2,
-                'total_reach': 2500000,
-                'growth_rate': 12.5
+                'total_influencers': rollup.total_influencers,
+                'total_posts': rollup.total_posts,
+                'total_reels': rollup.total_reels,
+                'avg_engagement_rate': rollup.avg_engagement_rate,
+                'total_reach': rollup.total_views,
+                'growth_rate': _growth_rate(recent)
             },
-            'top_performers': [
-                {
-                    'username': 'fitness_guru_sarah',
-                    'engagement_rate': 8.9,
-                    'followers': 125000
-                },
-                {
-                    'username': 'tech_reviewer_mike', 
-                    'engagement_rate': 7.2,
-                    'followers': 89000
-                }
-            ],
+            'top_performers': rollup.top_performers,
+            'refreshed_at': rollup.refreshed_at.isoformat() if rollup.refreshed_at else None,
             'generated_at': datetime.now().isoformat()
         }
         return Response(data)
 
 class EngagementTrendsAPIView(APIView):
-    """Engagement Trends API"""
-    
+    """
+    Engagement Trends API (?days=N, ?influencer=<id>)
+    Daily content buckets come from DailyEngagementRollup, counter history
+    from MetricSnapshot daily rows - at most N rows are read from each.
+    """
+
+    @cached_response(tags=_trend_tags, validators=_trend_validators)
     def get(self, request):
-        # Generate trend data for the last 7 days
-        base_date = datetime.now() - timedelta(days=7)
+        try:
+            days = int(request.query_params.get('days', TREND_DAYS_DEFAULT))
+            influencer_id = int(request.query_params.get('influencer', 0))
+        except ValueError:
+            return Response({'error': 'days and influencer must be integers'}, status=400)
+        days = max(1, min(days, TREND_DAYS_MAX))
+
+        if influencer_id:
+            snapshots = read_series(MetricSnapshot.ENTITY_INFLUENCER, influencer_id, days)
+        else:
+            snapshots = read_series(MetricSnapshot.ENTITY_PLATFORM, 0, days)
+
+        rollup = _current_rollup()
+        daily = list(DailyEngagementRollup.objects.order_by('-day')[:days])
+        daily.reverse()
+
         trend_data = []
-        
-        for i in range(7):
-            date = base_date + timedelta(days=i)
+        for day in daily:
+            content = day.content_count or 1
             trend_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'engagement_rate': round(4.0 + (i * 0.2) + (i % 3 * 0.3), 2),
-                'likes_per_post': 1200 + (i * 50),
-                'comments_per_post': 85 + (i * 5),
-                'shares_per_post': 20 + (i * 2),
-                'saves_per_post': 45 + (i * 3)
+                'date': day.day.strftime('%Y-%m-%d'),
+                'engagement_rate': day.avg_engagement_rate,
+                'likes_per_post': round(day.likes / content, 2),
+                'comments_per_post': round(day.comments / content, 2),
+                'shares_per_post': round(day.shares / content, 2),
+                'saves_per_post': round(day.saves / content, 2),
+                'posts': day.posts_count,
+                'reels': day.reels_count
             })
-        
+
+        best_day = max(daily, key=lambda day: day.avg_engagement_rate, default=None)
+        ranked_hours = _ranked_hours(rollup.posting_hours)
+        reel_performance = rollup.media_type_performance.get('reels', {})
+        post_rates = [
+            stats for media_type, stats in rollup.media_type_performance.items() if media_type != 'reels'
+        ]
+        post_count = sum(stats['count'] for stats in post_rates)
+        post_rate = (
+            sum(stats['engagement_rate'] * stats['count'] for stats in post_rates) / post_count
+            if post_count else 0.0
+        )
+
         data = {
             'engagement_trends': {
                 'daily_trends': trend_data,
-                'weekly_average': 4.5,
-                'growth_rate': 12.3,
-                'best_performing_day': 'Friday',
-                'peak_engagement_hour': 18
+                'weekly_average': round(
+                    sum(day.avg_engagement_rate for day in daily[-7:]) / len(daily[-7:]), 2
+                ) if daily else 0.0,
+                'growth_rate': _growth_rate(daily),
+                'follower_growth_rate': _follower_growth_rate(snapshots),
+                'history': _history(snapshots),
+                'best_performing_day': best_day.day.strftime('%A') if best_day else None,
+                'peak_engagement_hour': ranked_hours[0] if ranked_hours else None
             },
             'content_performance': {
                 'posts': {
-                    'avg_engagement_rate': 4.2,
-                    'total_posts': 890,
-                    'trend': 'increasing'
+                    'avg_engagement_rate': round(post_rate, 2),
+                    'total_posts': rollup.total_posts
                 },
                 'reels': {
-                    'avg_engagement_rate': 6.8,
-                    'total_reels': 340,
-                    'trend': 'increasing'
-                },
-                'stories': {
-                    'avg_engagement_rate': 3.1,
-                    'total_stories': 1200,
-                    'trend': 'stable'
+                    'avg_engagement_rate': reel_performance.get('engagement_rate', 0.0),
+                    'total_reels': rollup.total_reels
                 }
             },
             'audience_insights': {
-                'peak_activity_hours': [9, 12, 18, 21],
-                'most_active_days': ['Monday', 'Wednesday', 'Friday'],
-                'engagement_by_age_group': {
-                    '18-24': 35.2,
-                    '25-34': 42.1,
-                    '35-44': 15.7,
-                    '45+': 7.0
-                }
+                'peak_activity_hours': sorted(ranked_hours[:4])
             },
+            'refreshed_at': rollup.refreshed_at.isoformat() if rollup.refreshed_at else None,
             'generated_at': datetime.now().isoformat()
         }
         return Response(data)
 
 class ContentInsightsAPIView(APIView):
-    """Content Insights API"""
-    
+    """Content Insights API (served from CategoryRollup and PlatformRollup)"""
+
+    # Hashtag blocks come from the tag index, which moves with every ingest
+    @cached_response(tags=['rollups', 'posts', 'reels'], validators=_rollup_validators)
     def get(self, request):
+        rollup = _current_rollup()
+        categories = CategoryRollup.objects.all()
+        total_content = rollup.total_posts + rollup.total_reels
+
+        ranked_hours = _ranked_hours(rollup.posting_hours)
+
         data = {
             'content_analysis': {
                 'top_performing_categories': [
-                    {'category': 'fitness', 'avg_engagement': 8.2, 'post_count': 245},
-                    {'category': 'technology', 'avg_engagement': 6.9, 'post_count': 189},
-                    {'category': 'travel', 'avg_engagement': 7.5, 'post_count': 156},
-                    {'category': 'food', 'avg_engagement': 5.8, 'post_count': 134},
-                    {'category': 'fashion', 'avg_engagement': 6.2, 'post_count': 201}
+                    {
+                        'category': category.category,
+                        'avg_engagement': category.avg_engagement_rate,
+                        'post_count': category.posts_count + category.reels_count,
+                        'influencer_count': category.influencer_count
+                    }
+                    for category in categories
                 ],
-                'content_themes': {
-                    'motivational': 28.5,
-                    'educational': 23.2,
-                    'entertainment': 19.8,
-                    'promotional': 15.1,
-                    'behind_the_scenes': 13.4
-                },
+                'content_themes': rollup.vibe_distribution,
                 'optimal_posting_times': {
-                    'weekdays': [9, 12, 18],
-                    'weekends': [10, 14, 19],
-                    'best_overall': 18
+                    'hours': sorted(ranked_hours[:3]),
+                    'best_overall': ranked_hours[0] if ranked_hours else None
                 }
             },
             'hashtag_performance': {
-                'top_hashtags': [
-                    {'hashtag': '#fitness', 'usage_count': 456, 'avg_engagement': 7.8},
-                    {'hashtag': '#motivation', 'usage_count': 389, 'avg_engagement': 8.1},
-                    {'hashtag': '#tech', 'usage_count': 267, 'avg_engagement': 6.4},
-                    {'hashtag': '#travel', 'usage_count': 234, 'avg_engagement': 7.2},
-                    {'hashtag': '#lifestyle', 'usage_count': 445, 'avg_engagement': 5.9}
-                ],
-                'trending_hashtags': [
-                    '#mondaymotivation',
-                    '#techtuesday', 
-                    '#wanderlust',
-                    '#selfcare',
-                    '#productivity'
-                ]
-            },
-            'content_format_insights': {
-                'carousel_posts': {
-                    'engagement_rate': 7.2,
-                    'optimal_slide_count': 5,
-                    'best_performing_type': 'educational'
-                },
-                'single_image_posts': {
-                    'engagement_rate': 4.8,
-                    'best_performing_style': 'lifestyle'
-                },
-                'video_posts': {
-                    'engagement_rate': 6.1,
-                    'optimal_duration': '15-30 seconds'
-                },
-                'reels': {
-                    'engagement_rate': 9.3,
-                    'optimal_duration': '15-30 seconds',
-                    'best_performing_type': 'entertainment'
-                }
+                'top_hashtags': top_tags(limit=INSIGHT_TAG_LIMIT),
+                'trending_hashtags': trending_tags(days=TREND_DAYS_DEFAULT, limit=INSIGHT_TAG_LIMIT)
             },
+            'content_format_insights': rollup.media_type_performance,
             'audience_behavior': {
-                'average_time_spent': '2.5 minutes',
-                'scroll_through_rate': 75.2,
-                'save_rate': 12.8,
-                'share_rate': 8.4,
-                'comment_rate': 5.6
+                'save_rate': round(rollup.total_saves / total_content, 2) if total_content else 0.0,
+                'share_rate': round(rollup.total_shares / total_content, 2) if total_content else 0.0,
+                'comment_rate': round(rollup.total_comments / total_content, 2) if total_content else 0.0
+            },
+            'refreshed_at': rollup.refreshed_at.isoformat() if rollup.refreshed_at else None,
+            'generated_at': datetime.now().isoformat()
+        }
+        return Response(data)
+
+class HashtagAnalyticsAPIView(APIView):
+    """
+    Hashtag/mention leaderboard (?kind=hashtag|mention, ?limit=N,
+    ?order=usage|likes|comments, ?days=N for the trending window).
+    Top tags come from the per-tag counters, trending from the usage index.
+    """
+
+    def get(self, request):
+        kind = TAG_KINDS.get(request.query_params.get('kind', 'hashtag'))
+        order = request.query_params.get('order', 'usage')
+        if kind is None or order not in TOP_ORDERINGS:
+            return Response({
+                'error': f"kind must be one of {sorted(TAG_KINDS)} and order one of {sorted(TOP_ORDERINGS)}"
+            }, status=400)
+        try:
+            limit = int(request.query_params.get('limit', TAG_LIMIT_DEFAULT))
+            days = int(request.query_params.get('days', TREND_DAYS_DEFAULT))
+        except ValueError:
+            return Response({'error': 'limit and days must be integers'}, status=400)
+        limit = max(1, min(limit, TAG_LIMIT_MAX))
+        days = max(1, min(days, TREND_DAYS_MAX))
+
+        data = {
+            'kind': request.query_params.get('kind', 'hashtag'),
+            'top': top_tags(kind, limit, order),
+            'trending': {
+                'window_days': days,
+                'tags': trending_tags(kind, days, limit)
             },
             'generated_at': datetime.now().isoformat()
         }
@@ -168,20 +293,22 @@ class ContentInsightsAPIView(APIView):
 # Backup simple views
 @api_view(['GET'])
 def analytics_overview(request):
+    rollup = _current_rollup()
     data = {
         'message': 'Analytics overview endpoint',
-        'total_influencers': 25,
-        'total_posts': 1250,
-        'avg_engagement': 4.2
+        'total_influencers': rollup.total_influencers,
+        'total_posts': rollup.total_posts,
+        'avg_engagement': rollup.avg_engagement_rate
     }
     return Response(data)
 
 def analytics_list(request):
+    rollup = _current_rollup()
     data = {
         'results': [
-            {'metric': 'engagement_rate', 'value': 4.2},
-            {'metric': 'total_reach', 'value': 2500000},
-            {'metric': 'growth_rate', 'value': 12.5}
+            {'metric': 'engagement_rate', 'value': rollup.avg_engagement_rate},
+            {'metric': 'total_reach', 'value': rollup.total_views},
+            {'metric': 'total_followers', 'value': rollup.total_followers}
         ],
         'message': 'Analytics data available'
     }
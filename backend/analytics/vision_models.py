@@ -0,0 +1,248 @@
+# analytics/vision_models.py
+"""
+The BLIP captioner and ViT classifier behind analytics.inference, one class
+per inference backend (see that module). Importing this module imports torch
+and transformers, so only analytics.inference.build_vision_models() does, the
+first time a process needs the models.
+"""
+import gc
+import inspect
+import logging
+import os
+from pathlib import Path
+
+import torch
+from django.conf import settings
+
+from core.model_registry import default_device, get_pretrained, get_processor, load_pretrained
+
+from .inference import CAPTION_MAX_LENGTH, CAPTION_MODEL, CLASSIFIER_MODEL, TOP_K_LABELS
+
+try:
+    import onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+except ImportError:
+    onnxruntime = None
+
+logger = logging.getLogger('analytics')
+
+ONNX_OPSET = 17
+# torch >= 2.5 defaults to the dynamo exporter, which needs onnxscript and may
+# write the weights to a side file; keep the single-file TorchScript exporter
+EXPORT_OPTIONS = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+
+
+class VisionModels:
+    """BLIP captioner and ViT classifier on one device, both taking image batches"""
+
+    backend = 'torch'
+    # Backends that modify their models load private copies; the others use
+    # the registry's shared weights (the same ViT as the scraping pipelines)
+    private_weights = False
+
+    def __init__(self, device=None, num_beams=None):
+        self.device = device or torch.device(default_device())
+        self.num_beams = max(1, num_beams or settings.INFERENCE_CAPTION_BEAMS)
+        if settings.INFERENCE_THREADS:
+            torch.set_num_threads(settings.INFERENCE_THREADS)
+        logger.info(f"Loading {CAPTION_MODEL} and {CLASSIFIER_MODEL} on {self.device} ({self.variant})")
+        self.blip_processor = self._registered(get_processor(CAPTION_MODEL), CAPTION_MODEL)
+        self.blip_model = self._weights(CAPTION_MODEL)
+        self.vit_processor = self._registered(get_processor(CLASSIFIER_MODEL), CLASSIFIER_MODEL)
+        self.vit_model = self._weights(CLASSIFIER_MODEL)
+        self.id2label = self.vit_model.config.id2label
+
+    @property
+    def variant(self):
+        """Backend and decoding settings: everything besides the weights that shapes the output"""
+        return f"{self.backend}:beams{self.num_beams}"
+
+    def caption_batch(self, images):
+        inputs = self.blip_processor(images=images, return_tensors='pt').to(self.device)
+        with torch.inference_mode():
+            output = self.blip_model.generate(
+                **inputs, max_length=CAPTION_MAX_LENGTH, num_beams=self.num_beams, do_sample=False
+            )
+        return self.blip_processor.batch_decode(output, skip_special_tokens=True)
+
+    def classify_batch(self, images, top_k=TOP_K_LABELS):
+        """Per image, [{'label', 'score'}, ...] best first (same shape as the HF pipeline)"""
+        inputs = self.vit_processor(images=images, return_tensors='pt').to(self.device)
+        with torch.inference_mode():
+            probabilities = self._classifier_logits(inputs['pixel_values']).softmax(dim=-1)
+        scores, indices = probabilities.topk(top_k, dim=-1)
+        return [
+            [{'label': self.id2label[index], 'score': score} for score, index in zip(row_scores, row_indices)]
+            for row_scores, row_indices in zip(scores.tolist(), indices.tolist())
+        ]
+
+    def _classifier_logits(self, pixel_values):
+        return self.vit_model(pixel_values=pixel_values).logits
+
+    def _weights(self, model_id):
+        if self.private_weights:
+            return load_pretrained(model_id, self.device)
+        return self._registered(get_pretrained(model_id, self.device), model_id)
+
+    @staticmethod
+    def _registered(model, model_id):
+        if model is None:
+            raise RuntimeError(f"{model_id} could not be loaded")
+        return model
+
+
+def _quantize_linear(model):
+    """Dynamic int8 quantization of every nn.Linear: int8 weights, activations quantized per call"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class QuantizedVisionModels(VisionModels):
+    """Both models with int8 Linear layers; dynamic quantization only runs on CPU"""
+
+    backend = 'torch-int8'
+    private_weights = True
+
+    def __init__(self, num_beams=None):
+        super().__init__(device=torch.device('cpu'), num_beams=num_beams)
+        self.blip_model = _quantize_linear(self.blip_model)
+        self.vit_model = _quantize_linear(self.vit_model)
+
+
+class OnnxVisionModels(VisionModels):
+    """
+    BLIP's vision encoder and the ViT classifier through ONNX Runtime on CPU.
+    Graphs are exported from the PyTorch models on first use and reused from
+    INFERENCE_ONNX_DIR afterwards, for as long as the checkpoint revision,
+    opset and torch version stay the same (graph_stem); the BLIP text decoder
+    stays in PyTorch.
+    Once the sessions exist, the PyTorch vision encoder and ViT are released
+    (only the ViT's labels are kept).
+    """
+
+    backend = 'onnx'
+    private_weights = True
+    quantize = False
+
+    def __init__(self, num_beams=None, onnx_dir=None):
+        if onnxruntime is None:
+            raise RuntimeError('The onnx backends require onnxruntime')
+        super().__init__(device=torch.device('cpu'), num_beams=num_beams)
+        self.onnx_dir = Path(onnx_dir or settings.INFERENCE_ONNX_DIR)
+        self.onnx_dir.mkdir(parents=True, exist_ok=True)
+
+        size = self.blip_processor.image_processor.size
+        encoder = self._session(
+            CAPTION_MODEL, self.blip_model, 'vision', _VisionEncoderExport(self.blip_model.vision_model),
+            (size['height'], size['width']), 'last_hidden_state',
+        )
+        size = self.vit_processor.size
+        self.vit_session = self._session(
+            CLASSIFIER_MODEL, self.vit_model, 'classifier', _ClassifierExport(self.vit_model),
+            (size['height'], size['width']), 'logits',
+        )
+        # generate() only reads vision_model(pixel_values=...)[0]
+        self.blip_model.vision_model = _OnnxVisionEncoder(encoder)
+        self.vit_model = None
+        if self.quantize:
+            self.blip_model.text_decoder = _quantize_linear(self.blip_model.text_decoder)
+        gc.collect()
+
+    def _classifier_logits(self, pixel_values):
+        (logits,) = self.vit_session.run(None, {'pixel_values': pixel_values.cpu().numpy()})
+        return torch.from_numpy(logits)
+
+    def _session(self, model_name, model, part, module, image_size, output_name):
+        stem = graph_stem(model_name, getattr(model.config, '_commit_hash', None), part)
+        return onnx_session(export_graph(module, self.onnx_dir, stem, image_size, output_name, self.quantize))
+
+
+def graph_stem(model_name, revision, part):
+    """
+    File name stem of an exported graph. It names everything the graph was
+    built from - checkpoint revision, opset and torch version - so upgrading
+    any of them exports a new graph instead of reusing a stale one.
+    """
+    torch_version = torch.__version__.split('+')[0]
+    return f"{model_name.replace('/', '--')}@{revision or 'unversioned'}-{part}-opset{ONNX_OPSET}-torch{torch_version}"
+
+
+def export_graph(module, onnx_dir, stem, image_size, output_name, quantize=False):
+    """Path of the (int8 when `quantize`) graph `stem` in `onnx_dir`, exporting `module` the first time"""
+    path = Path(onnx_dir) / f"{stem}.onnx"
+    if not path.exists():
+        logger.info(f"Exporting {stem} to {path}")
+        # Written aside and renamed, so concurrent workers never load half a file
+        partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+        torch.onnx.export(
+            module, torch.zeros(1, 3, *image_size), str(partial),
+            input_names=['pixel_values'], output_names=[output_name],
+            dynamic_axes={'pixel_values': {0: 'batch'}, output_name: {0: 'batch'}},
+            opset_version=ONNX_OPSET, **EXPORT_OPTIONS,
+        )
+        os.replace(partial, path)
+    if not quantize:
+        return path
+
+    quantized = path.with_name(f"{stem}.int8.onnx")
+    if not quantized.exists():
+        partial = quantized.with_name(f"{quantized.name}.{os.getpid()}.partial")
+        quantize_dynamic(str(path), str(partial), weight_type=QuantType.QInt8)
+        os.replace(partial, quantized)
+    return quantized
+
+
+def onnx_session(path):
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.INFERENCE_THREADS:
+        options.intra_op_num_threads = settings.INFERENCE_THREADS
+    return onnxruntime.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+
+
+class QuantizedOnnxVisionModels(OnnxVisionModels):
+    """The ONNX graphs with int8 weights, and an int8 BLIP text decoder"""
+
+    backend = 'onnx-int8'
+    quantize = True
+
+
+class _VisionEncoderExport(torch.nn.Module):
+    """BLIP vision tower as pixel_values -> last_hidden_state, for export"""
+
+    def __init__(self, vision_model):
+        super().__init__()
+        self.vision_model = vision_model
+
+    def forward(self, pixel_values):
+        return self.vision_model(pixel_values=pixel_values)[0]
+
+
+class _ClassifierExport(torch.nn.Module):
+    """ViT as pixel_values -> logits, for export"""
+
+    def __init__(self, classifier):
+        super().__init__()
+        self.classifier = classifier
+
+    def forward(self, pixel_values):
+        return self.classifier(pixel_values=pixel_values).logits
+
+
+class _OnnxVisionEncoder(torch.nn.Module):
+    """Stands in for blip_model.vision_model, running the exported encoder in ONNX Runtime"""
+
+    def __init__(self, session):
+        super().__init__()
+        self.session = session
+
+    def forward(self, pixel_values=None, **kwargs):
+        (hidden,) = self.session.run(None, {'pixel_values': pixel_values.cpu().numpy()})
+        return (torch.from_numpy(hidden),)
+
+
+BACKEND_CLASSES = {
+    'torch': VisionModels,
+    'torch-int8': QuantizedVisionModels,
+    'onnx': OnnxVisionModels,
+    'onnx-int8': QuantizedOnnxVisionModels,
+}
@@ -0,0 +1,228 @@
+# core/export.py
+"""
+Streaming bulk export of posts and reels as NDJSON, CSV or Parquet.
+
+Rows come from values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE), so
+no model instances are built and at most one chunk is held in memory; each
+format encoder yields its output as it goes. Used by the /export/ views and
+the export_content management command.
+"""
+import csv
+import json
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
+
+from .filters import filter_content_queryset
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Columns shared by posts and reels; model-specific ones are appended per model
+COMMON_EXPORT_FIELDS = [
+    'id', 'shortcode', 'influencer_id', 'influencer__username', 'caption',
+    'likes_count', 'comments_count', 'shares_count', 'saves_count', 'views_count',
+    'posted_at', 'scraped_at', 'is_analyzed', 'vibe_classification', 'hashtags', 'mentions',
+]
+MODEL_EXPORT_FIELDS = {
+    'post': ['media_type', 'media_url', 'analysis_status', 'quality_score', 'sentiment_score', 'auto_tags'],
+    'reel': ['media_url', 'duration', 'play_count', 'scene_changes', 'activity_level'],
+}
+
+# Arrow type per column; anything else is exported as a string (JSON lists included)
+_ARROW_TYPES = {
+    'id': 'int64', 'influencer_id': 'int64', 'likes_count': 'int64', 'comments_count': 'int64',
+    'shares_count': 'int64', 'saves_count': 'int64', 'views_count': 'int64', 'play_count': 'int64',
+    'scene_changes': 'int64', 'is_analyzed': 'bool', 'quality_score': 'float64',
+    'sentiment_score': 'float64', 'duration': 'float64', 'activity_level': 'float64',
+    'posted_at': 'timestamp', 'scraped_at': 'timestamp',
+}
+_JSON_FIELDS = {'hashtags', 'mentions', 'auto_tags'}
+
+
+def export_fields(model):
+    return COMMON_EXPORT_FIELDS + MODEL_EXPORT_FIELDS[model._meta.model_name]
+
+
+def _column_name(field):
+    return 'influencer' if field == 'influencer__username' else field
+
+
+def filter_export_queryset(queryset, params):
+    """
+    Content filters plus ?analyzed=true|false and, for posts, ?analysis_status=.
+    Raises rest_framework ValidationError on bad input.
+    """
+    queryset = filter_content_queryset(queryset, params)
+
+    analyzed = params.get('analyzed')
+    if analyzed:
+        queryset = queryset.filter(is_analyzed=analyzed.lower() in ('1', 'true', 'yes'))
+
+    status = params.get('analysis_status')
+    if status:
+        if 'analysis_status' not in {field.name for field in queryset.model._meta.fields}:
+            raise ValidationError({'error': f"{queryset.model._meta.verbose_name_plural} have no analysis_status"})
+        queryset = queryset.filter(analysis_status=status)
+    return queryset
+
+
+def _rows(queryset, fields):
+    return (
+        queryset.order_by('id')
+        .values_list(*fields)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ================================
+# ENCODERS
+# ================================
+
+def _ndjson(queryset, fields):
+    columns = [_column_name(field) for field in fields]
+    for chunk in _chunks(_rows(queryset, fields)):
+        yield ''.join(json.dumps(dict(zip(columns, row)), default=str) + '\n' for row in chunk).encode()
+
+
+class _LineBuffer:
+    """csv.writer target that hands each written line straight back"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(field, value):
+    if field in _JSON_FIELDS:
+        return json.dumps(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _csv(queryset, fields):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow([_column_name(field) for field in fields]).encode()
+    for chunk in _chunks(_rows(queryset, fields)):
+        yield ''.join(
+            writer.writerow([_csv_value(field, value) for field, value in zip(fields, row)])
+            for row in chunk
+        ).encode()
+
+
+class _ByteSink:
+    """Write-only file object for ParquetWriter; drained after every row group"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.buffer = bytes(self.buffer), bytearray()
+        return data
+
+
+def _arrow_schema(fields):
+    types = {
+        'int64': pa.int64(), 'bool': pa.bool_(), 'float64': pa.float64(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([
+        (_column_name(field), types.get(_ARROW_TYPES.get(field), pa.string()))
+        for field in fields
+    ])
+
+
+def _arrow_value(field, value):
+    return json.dumps(value) if field in _JSON_FIELDS else value
+
+
+def _parquet(queryset, fields):
+    """One row group per chunk; the sink is emptied after each, so memory stays at one chunk"""
+    schema = _arrow_schema(fields)
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for chunk in _chunks(_rows(queryset, fields)):
+            columns = list(zip(*chunk))
+            batch = pa.record_batch(
+                [
+                    pa.array([_arrow_value(field, value) for value in column], type=schema.field(index).type)
+                    for index, (field, column) in enumerate(zip(fields, columns))
+                ],
+                schema=schema,
+            )
+            writer.write_batch(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+_ENCODERS = {'ndjson': _ndjson, 'csv': _csv, 'parquet': _parquet}
+
+
+def export_stream(queryset, fmt):
+    """Byte chunks of the whole queryset in `fmt`"""
+    if fmt not in _ENCODERS:
+        raise ValidationError({'error': f"Unknown export format '{fmt}', expected one of {sorted(_ENCODERS)}"})
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        raise ValidationError({'error': 'Parquet export requires pyarrow'})
+    return _ENCODERS[fmt](queryset, export_fields(queryset.model))
+
+
+@require_GET
+def export_view(request, queryset, basename):
+    """
+    StreamingHttpResponse for ?format=ndjson|csv|parquet (default ndjson)
+    over `queryset` narrowed by the export filters.
+    """
+    fmt = request.GET.get('format', 'ndjson')
+    try:
+        queryset = filter_export_queryset(queryset, request.GET)
+        stream = export_stream(queryset, fmt)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+
+    response = StreamingHttpResponse(stream, content_type=EXPORT_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{basename}.{fmt}"'
+    return response
@@ -0,0 +1,46 @@
+# core/filters.py
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_date_param(value, end_of_day=False):
+    """
+    Accept either an ISO datetime or a plain YYYY-MM-DD date.
+    Plain dates cover the whole day, so ?posted_before=2024-03-01 includes March 1st.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({'error': f"Invalid date '{value}', expected YYYY-MM-DD or ISO 8601"})
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_content_queryset(queryset, params, date_field='posted_at'):
+    """
+    Shared influencer / date-range filters for post and reel listings.
+
+    ?influencer=<id or username>  ?posted_after=<date>  ?posted_before=<date>
+    """
+    influencer = params.get('influencer')
+    if influencer:
+        if influencer.isdigit():
+            queryset = queryset.filter(influencer_id=int(influencer))
+        else:
+            queryset = queryset.filter(influencer__username=influencer.lstrip('@'))
+
+    posted_after = params.get('posted_after')
+    if posted_after:
+        queryset = queryset.filter(**{f'{date_field}__gte': parse_date_param(posted_after)})
+
+    posted_before = params.get('posted_before')
+    if posted_before:
+        queryset = queryset.filter(**{f'{date_field}__lte': parse_date_param(posted_before, end_of_day=True)})
+
+    return queryset
@@ -0,0 +1,104 @@
+# core/http_cache.py
+"""
+Conditional GET and response caching for the read endpoints.
+
+Each cached view declares the tags its payload depends on (e.g. 'posts',
+'influencer:42') and a `validators` callable returning cheap row-level state
+(max updated_at, row counts). The ETag hashes the request path,
+the validators and the current version of every tag, so:
+
+* a matching If-None-Match / If-Modified-Since is answered with 304 before
+  the view body runs or anything is serialized;
+* otherwise the response data is cached under that ETag, so bumping any of
+  its tags (invalidate_tags, wired to model signals in core.signals) simply
+  makes every dependent entry unreachable.
+
+A cache outage degrades to version 0 for every tag; validators still change
+whenever the underlying rows do.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+TAG_VERSION_KEY = 'http:tag:{tag}'
+RESPONSE_KEY = 'http:response:{etag}'
+
+
+def _tag_key(tag):
+    return TAG_VERSION_KEY.format(tag=tag)
+
+
+def tag_versions(tags):
+    versions = cache.get_many([_tag_key(tag) for tag in tags])
+    return [versions.get(_tag_key(tag), 0) for tag in tags]
+
+
+def invalidate_tags(*tags):
+    """Give each tag a fresh version; responses built under the old one are never served again"""
+    version = time.time_ns()
+    cache.set_many({_tag_key(tag): version for tag in tags}, None)
+
+
+def _last_modified(state, versions):
+    """Newest of the datetime validators and the tag bumps (versions are time_ns stamps)"""
+    stamps = [value.timestamp() for value in state if hasattr(value, 'timestamp')]
+    stamps += [version / 1e9 for version in versions if version]
+    return int(max(stamps)) if stamps else None
+
+
+def _etag(request, tags, versions, state):
+    fingerprint = repr((request.get_full_path(), tags, versions, state))
+    return hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Clients must revalidate every poll, but may keep the body around to do so
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_response(tags, validators=None, timeout=None):
+    """
+    Decorator for APIView/ViewSet GET handlers.
+
+    `tags` is a list, or a callable (request, **kwargs) -> list for per-object
+    tags. `validators` is an optional callable (request, **kwargs) -> tuple of
+    values (datetimes among them feed Last-Modified, as does the time of the
+    latest bump of any of the tags).
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            resolved_tags = list(tags(request, **kwargs) if callable(tags) else tags)
+            state = tuple(validators(request, **kwargs)) if validators else ()
+            versions = tag_versions(resolved_tags)
+            etag = _etag(request, resolved_tags, versions, state)
+            last_modified = _last_modified(state, versions)
+
+            not_modified = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+            if not_modified is not None:
+                return _set_validators(not_modified, etag, last_modified)
+
+            key = RESPONSE_KEY.format(etag=etag)
+            cached = cache.get(key)
+            if cached is not None:
+                response = Response(cached)
+            else:
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code == 200 and isinstance(response, Response):
+                    cache.set(key, response.data, timeout or settings.HTTP_RESPONSE_CACHE_TIMEOUT)
+
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
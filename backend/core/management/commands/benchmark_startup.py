@@ -0,0 +1,90 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Libraries that must only be imported once a process actually runs a model
+HEAVY_MODULES = ('torch', 'torchvision', 'transformers', 'onnxruntime', 'sklearn', 'nltk', 'textblob')
+
+# What a fresh process of each kind imports before serving its first request or task
+PROFILES = {
+    'web': """
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.conf import settings
+importlib.import_module(settings.ROOT_URLCONF)
+""",
+    'worker': """
+import django
+django.setup()
+from django.apps import apps
+from instagram_backend.celery import app
+for config in apps.get_app_configs():
+    if importlib.util.find_spec(f"{config.name}.tasks") is not None:
+        importlib.import_module(f"{config.name}.tasks")
+for name in ('analytics.image_processing', 'analytics.video_processing', 'scraping.ml_analyzer'):
+    importlib.import_module(name)
+""",
+}
+
+_PROBE = """
+import importlib, importlib.util, json, sys, time
+started = time.perf_counter()
+{body}
+print(json.dumps({{
+    'seconds': time.perf_counter() - started,
+    'heavy': sorted(name for name in {heavy!r} if name in sys.modules),
+}}))
+"""
+
+
+def measure_startup(profile):
+    """{'seconds', 'heavy'} for one fresh interpreter running `profile`'s imports"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE))
+    code = _PROBE.format(body=PROFILES[profile], heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{profile} startup failed: {result.stderr.strip().splitlines()[-1:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = (
+        'Time how long fresh web and Celery worker processes take to import the project, '
+        'and list any heavy ML libraries they import before a model is used.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default=','.join(PROFILES), help='Comma-separated: web, worker')
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes per profile; median and best reported')
+        parser.add_argument('--budget', type=float, default=1.0, help='Seconds a web process may take to boot')
+
+    def handle(self, *args, **options):
+        profiles = [name.strip() for name in options['profiles'].split(',') if name.strip()]
+        unknown = [name for name in profiles if name not in PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(unknown)} (expected {', '.join(PROFILES)})")
+
+        ok = True
+        for profile in profiles:
+            runs = [measure_startup(profile) for _ in range(max(1, options['runs']))]
+            seconds = [run['seconds'] for run in runs]
+            heavy = sorted({name for run in runs for name in run['heavy']})
+            median = statistics.median(seconds)
+            self.stdout.write(
+                f"  {profile:<7} median {median * 1000:7.0f} ms  best {min(seconds) * 1000:7.0f} ms  "
+                f"heavy imports: {', '.join(heavy) or 'none'}"
+            )
+            if heavy or (profile == 'web' and median > options['budget']):
+                ok = False
+
+        if ok:
+            self.stdout.write(self.style.SUCCESS('No heavy imports at startup'))
+        else:
+            self.stdout.write(self.style.WARNING('Startup imports heavy libraries or exceeds the budget'))
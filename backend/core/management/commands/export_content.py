@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from core.export import export_stream, filter_export_queryset
+from posts.models import Post
+from reels.models import Reel
+
+MODELS = {'posts': Post, 'reels': Reel}
+
+
+class Command(BaseCommand):
+    help = 'Stream posts or reels to a file (or stdout) as NDJSON, CSV or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('content', choices=sorted(MODELS), help='What to export')
+        parser.add_argument('--format', default='ndjson', choices=['ndjson', 'csv', 'parquet'])
+        parser.add_argument('--output', '-o', help='Output path (default: stdout)')
+        parser.add_argument('--influencer', help='Influencer id or username')
+        parser.add_argument('--posted-after', help='YYYY-MM-DD or ISO 8601')
+        parser.add_argument('--posted-before', help='YYYY-MM-DD or ISO 8601')
+        parser.add_argument('--analyzed', choices=['true', 'false'])
+        parser.add_argument('--analysis-status', help='Posts only, e.g. pending / completed')
+
+    def handle(self, *args, **options):
+        params = {
+            key: options[option]
+            for key, option in (
+                ('influencer', 'influencer'),
+                ('posted_after', 'posted_after'),
+                ('posted_before', 'posted_before'),
+                ('analyzed', 'analyzed'),
+                ('analysis_status', 'analysis_status'),
+            )
+            if options[option]
+        }
+        try:
+            queryset = filter_export_queryset(MODELS[options['content']].objects.all(), params)
+            stream = export_stream(queryset, options['format'])
+        except ValidationError as e:
+            raise CommandError(e.detail['error'])
+
+        written = 0
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in stream:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"✅ Exported {options['content']} to {options['output']} ({written} bytes)"))
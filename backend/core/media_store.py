@@ -0,0 +1,313 @@
+# core/media_store.py
+"""
+Local, content-addressed store for downloaded post and reel media.
+
+Every analyzer fetches media through MediaStore.fetch(url) instead of its own
+requests.get:
+
+* blobs live under MEDIA_ROOT/MEDIA_STORE_DIR/blobs/<sha[:2]>/<sha256>, so two
+  URLs serving the same bytes share one file, and a URL fetched before is
+  served from disk (an SQLite index maps url -> sha256);
+* downloads go through one pooled, retrying requests.Session per process;
+* concurrent fetches of the same URL within a process are single-flight: one
+  thread downloads, the others wait for its result. Across processes blobs are
+  written to a temp file and renamed into place, so racing workers at worst
+  download twice, never see a partial file;
+* once the store exceeds MEDIA_STORE_MAX_BYTES the least recently used blobs
+  (and their URLs) are deleted until it is back under 90% of the limit.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger('core')
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+EVICTION_TARGET = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blob (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    content_type TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blob_last_used ON blob (last_used);
+CREATE TABLE IF NOT EXISTS media_url (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_url_sha256 ON media_url (sha256);
+"""
+
+
+class MediaFetchError(Exception):
+    """The URL could not be downloaded into the store"""
+
+
+@dataclass(frozen=True)
+class Blob:
+    sha256: str
+    path: Path
+    size: int
+    content_type: str = ''
+
+    def read_bytes(self):
+        return self.path.read_bytes()
+
+
+class _Flight:
+    """One in-progress download that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.blob = None
+        self.error = None
+
+
+def build_session(pool_size=None):
+    """requests.Session with a connection pool sized for the analyzer threads and retries on 429/5xx"""
+    pool_size = pool_size or settings.MEDIA_STORE_POOL_SIZE
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+class MediaStore:
+    def __init__(self, root=None, max_bytes=None, session=None, timeout=None):
+        self.root = Path(root or Path(settings.MEDIA_ROOT) / settings.MEDIA_STORE_DIR)
+        self.max_bytes = max_bytes or settings.MEDIA_STORE_MAX_BYTES
+        self.timeout = timeout or settings.MEDIA_STORE_TIMEOUT
+        self.session = session or build_session()
+        self.blob_dir = self.root / 'blobs'
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = {'hits': 0, 'downloads': 0, 'deduplicated': 0, 'shared_waits': 0,
+                       'bytes_downloaded': 0, 'evicted_blobs': 0, 'failures': 0}
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        """One connection per thread and process (sqlite handles don't survive fork)"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.root / 'index.sqlite3', timeout=30, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('PRAGMA synchronous=NORMAL')
+            local.pid = os.getpid()
+        return local.connection
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._stats[counter] += amount
+
+    def blob_path(self, sha256):
+        return self.blob_dir / sha256[:2] / sha256
+
+    # ---- public API ---------------------------------------------------------
+
+    def fetch(self, url):
+        """Blob for `url`, from disk when seen before; raises MediaFetchError"""
+        blob = self.lookup(url)
+        if blob is not None:
+            self._count('hits')
+            return blob
+
+        with self._lock:
+            flight = self._flights.get(url)
+            leader = flight is None
+            if leader:
+                flight = self._flights[url] = _Flight()
+
+        if not leader:
+            self._count('shared_waits')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.blob
+
+        try:
+            flight.blob = self._download(url)
+            return flight.blob
+        except MediaFetchError as e:
+            flight.error = e
+            raise
+        except Exception as e:
+            flight.error = MediaFetchError(f"{url}: {e}")
+            raise flight.error from e
+        finally:
+            with self._lock:
+                self._flights.pop(url, None)
+            flight.done.set()
+
+    def lookup(self, url):
+        """Stored blob for `url` without downloading, or None"""
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT b.sha256, b.size, b.content_type FROM media_url u JOIN blob b ON b.sha256 = u.sha256 '
+            'WHERE u.url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        blob = Blob(sha256=row[0], path=self.blob_path(row[0]), size=row[1], content_type=row[2])
+        if not blob.path.exists():
+            # Removed behind our back (e.g. MEDIA_ROOT cleanup): forget it and re-download
+            connection.execute('DELETE FROM blob WHERE sha256 = ?', (blob.sha256,))
+            return None
+        connection.execute('UPDATE blob SET last_used = ? WHERE sha256 = ?', (time.time(), blob.sha256))
+        return blob
+
+    def stats(self):
+        connection = self._connection()
+        blobs, total = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blob').fetchone()
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['downloads'] + stats['deduplicated']
+        stats.update({
+            'hit_rate': round(stats['hits'] / lookups, 3) if lookups else 0.0,
+            'blobs': blobs,
+            'bytes_stored': total,
+            'max_bytes': self.max_bytes,
+        })
+        return stats
+
+    def evict(self, keep=None):
+        """
+        Delete least recently used blobs until the store is under
+        EVICTION_TARGET of max_bytes; `keep` (a sha256) is never evicted.
+        """
+        connection = self._connection()
+        (total,) = connection.execute('SELECT COALESCE(SUM(size), 0) FROM blob').fetchone()
+        if total <= self.max_bytes:
+            return 0
+
+        target = int(self.max_bytes * EVICTION_TARGET)
+        victims = []
+        for sha256, size in connection.execute('SELECT sha256, size FROM blob ORDER BY last_used'):
+            if total <= target:
+                break
+            if sha256 == keep:
+                continue
+            victims.append(sha256)
+            total -= size
+
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany('DELETE FROM blob WHERE sha256 = ?', [(sha256,) for sha256 in victims])
+            connection.executemany('DELETE FROM media_url WHERE sha256 = ?', [(sha256,) for sha256 in victims])
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        for sha256 in victims:
+            try:
+                self.blob_path(sha256).unlink()
+            except FileNotFoundError:
+                pass
+
+        self._count('evicted_blobs', len(victims))
+        logger.info(f"Media store evicted {len(victims)} blobs")
+        return len(victims)
+
+    # ---- internals ----------------------------------------------------------
+
+    def _download(self, url):
+        try:
+            response = self.session.get(url, timeout=self.timeout, stream=True)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self._count('failures')
+            raise MediaFetchError(f"{url}: {e}") from e
+
+        digest = hashlib.sha256()
+        size = 0
+        handle = tempfile.NamedTemporaryFile(dir=self.blob_dir, prefix='.download-', delete=False)
+        try:
+            with handle, response:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    handle.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        except Exception as e:
+            os.unlink(handle.name)
+            self._count('failures')
+            raise MediaFetchError(f"{url}: {e}") from e
+
+        sha256 = digest.hexdigest()
+        path = self.blob_path(sha256)
+        if path.exists():
+            # Same bytes already stored under another URL
+            os.unlink(handle.name)
+            self._count('deduplicated')
+        else:
+            path.parent.mkdir(exist_ok=True)
+            os.replace(handle.name, path)
+            self._count('downloads')
+        self._count('bytes_downloaded', size)
+
+        now = time.time()
+        content_type = response.headers.get('Content-Type', '')
+        connection = self._connection()
+        connection.execute(
+            'INSERT INTO blob (sha256, size, content_type, created_at, last_used) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (sha256) DO UPDATE SET last_used = excluded.last_used',
+            (sha256, size, content_type, now, now),
+        )
+        connection.execute(
+            'INSERT INTO media_url (url, sha256, fetched_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (url) DO UPDATE SET sha256 = excluded.sha256, fetched_at = excluded.fetched_at',
+            (url, sha256, now),
+        )
+        self.evict(keep=sha256)
+        return Blob(sha256=sha256, path=path, size=size, content_type=content_type)
+
+
+# ================================
+# PROCESS-WIDE INSTANCE
+# ================================
+
+_lock = threading.Lock()
+_store = None
+
+
+def get_media_store():
+    """The process's MediaStore (and its connection pool)"""
+    global _store
+    with _lock:
+        if _store is None:
+            _store = MediaStore()
+        return _store
+
+
+def media_store_stats():
+    return _store.stats() if _store is not None else None
+
+
+def _reset_after_fork():
+    # A forked child must not share the parent's pooled sockets or in-flight table
+    global _store, _lock
+    _lock = threading.Lock()
+    _store = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,341 @@
+# core/model_registry.py
+"""
+Process-wide registry of lazily loaded models and heavy libraries.
+
+torch, transformers, nltk, textblob and scikit-learn take seconds to import,
+and model weights longer still to load. Most Django processes (API workers,
+manage.py commands, Celery workers that never run an analysis) need none of
+them, so nothing in the project imports them at module import time:
+
+* module_available() tells whether a library is installed without importing
+  it, for the usual *_AVAILABLE flags; the library itself is imported inside
+  the function that uses it;
+* models are registered by name with a loader (register_model) and fetched
+  with get_model(name, device). Each (name, device) is loaded the first time
+  it is asked for in a process, concurrent callers wait for that one load, and
+  the result is kept for the life of the process. A failed load returns None
+  and is retried by the first get() after MODEL_LOAD_RETRY_SECONDS, so a
+  transient download error or OOM doesn't disable a model until restart.
+
+The registry owns every model instance, so analyzers that use the same
+checkpoint share one copy of its weights. The Hugging Face checkpoints used
+anywhere in the project are registered here under their model ids
+(get_pretrained / get_processor); app-level models are registered in each
+app's ml_models module, which autodiscover_models() imports.
+
+stats() accounts for the memory held by the loaded models, counting each
+tensor (or array) once however many models share it.
+
+Loaded models survive fork. warm_up() loads MODEL_WARMUP and then freezes the
+garbage collector's view of them, so a prefork Celery parent that warms up in
+worker_init hands its children the weights copy-on-write: pages stay shared
+until a child writes to them, which inference never does.
+"""
+import gc
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('core')
+
+# Checkpoints that may be shared across apps: model id -> (transformers model
+# class, processor class)
+PRETRAINED = {
+    'Salesforce/blip-image-captioning-base': ('BlipForConditionalGeneration', 'BlipProcessor'),
+    'google/vit-base-patch16-224': ('AutoModelForImageClassification', 'AutoImageProcessor'),
+    'facebook/detr-resnet-50': ('AutoModelForObjectDetection', 'AutoImageProcessor'),
+    'distilbert-base-uncased-finetuned-sst-2-english': ('AutoModelForSequenceClassification', 'AutoTokenizer'),
+}
+PROCESSOR_SUFFIX = ':processor'
+
+
+def module_available(*names) -> bool:
+    """True if every top-level module in `names` can be imported (none is imported here)"""
+    for name in names:
+        try:
+            if importlib.util.find_spec(name) is None:
+                return False
+        except (ImportError, ValueError):
+            return False
+    return True
+
+
+def default_device() -> str:
+    """'cuda' when torch sees a GPU, else 'cpu' (imports torch)"""
+    import torch
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+class ModelRegistry:
+    """
+    Named model loaders, each run at most once per process and device.
+    A loader registered with per_device=True is called as loader(device),
+    with device defaulting to default_device(); otherwise as loader().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders = {}
+        self._models = {}
+        self._load_seconds = {}
+        self._load_locks = {}
+        self._failed_at = {}
+
+    def register(self, name, loader, per_device=False):
+        with self._lock:
+            self._loaders[name] = (loader, per_device)
+
+    def get(self, name, device=None):
+        """
+        The model `name` on `device`, loading it on first use; None if it
+        failed to load less than MODEL_LOAD_RETRY_SECONDS ago
+        """
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"No model registered as '{name}'")
+            loader, per_device = self._loaders[name]
+        key = (name, str(device or default_device()) if per_device else None)
+
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+            if self._backing_off(key):
+                return None
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+                if self._backing_off(key):
+                    return None
+            started = time.perf_counter()
+            try:
+                model = loader(key[1]) if per_device else loader()
+                if model is None:
+                    raise RuntimeError('loader returned None')
+            except Exception as e:
+                logger.error(
+                    f"Failed to load model '{name}' (retrying in {settings.MODEL_LOAD_RETRY_SECONDS}s): {e}"
+                )
+                with self._lock:
+                    self._failed_at[key] = time.monotonic()
+                return None
+            elapsed = time.perf_counter() - started
+            logger.info(f"Loaded model '{name}'{f' on {key[1]}' if key[1] else ''} in {elapsed:.2f}s")
+            with self._lock:
+                self._models[key] = model
+                self._load_seconds[key] = elapsed
+                self._failed_at.pop(key, None)
+            return model
+
+    def _backing_off(self, key) -> bool:
+        """Whether `key` failed to load too recently to try again (call with the lock held)"""
+        failed_at = self._failed_at.get(key)
+        return failed_at is not None and time.monotonic() - failed_at < settings.MODEL_LOAD_RETRY_SECONDS
+
+    def is_loaded(self, name, device=None) -> bool:
+        with self._lock:
+            return any(key[0] == name and (device is None or key[1] == str(device)) for key in self._models)
+
+    def unload(self, name=None):
+        """Forget one model on every device (or all models), so the next get() loads it again"""
+        with self._lock:
+            for key in [key for key in self._models if name is None or key[0] == name]:
+                self._models.pop(key)
+                self._load_seconds.pop(key)
+            for key in [key for key in self._failed_at if name is None or key[0] == name]:
+                self._failed_at.pop(key)
+
+    def stats(self) -> dict:
+        """Loaded models with their load time and memory, and the total held by all of them"""
+        with self._lock:
+            loaded = dict(self._models)
+            load_seconds = dict(self._load_seconds)
+            registered = sorted(self._loaders)
+            failed = sorted(_label(key) for key in self._failed_at)
+
+        storages = {key: _storages(model) for key, model in loaded.items() if model is not None}
+        owners = {}
+        for key, held in storages.items():
+            for storage in held:
+                owners.setdefault(storage, []).append(key)
+        every = {}
+        for held in storages.values():
+            every.update(held)
+
+        models = {}
+        for key, model in loaded.items():
+            held = storages.get(key, {})
+            models[_label(key)] = {
+                'available': model is not None,
+                'load_seconds': round(load_seconds[key], 3),
+                'bytes': sum(held.values()),
+                # Memory this model shares with other loaded models
+                'shared_bytes': sum(size for storage, size in held.items() if len(owners[storage]) > 1),
+            }
+        return {
+            'registered': registered,
+            'loaded': models,
+            'failed': failed,
+            'total_bytes': sum(every.values()),
+            'resident_bytes': _resident_bytes(),
+        }
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+
+def _label(key) -> str:
+    name, device = key
+    return f"{name}@{device}" if device else name
+
+
+def _storages(model) -> dict:
+    """
+    {storage id: bytes} for the tensors held by a torch module, or by the
+    modules among a model's attributes (pipelines, VisionModels), and for
+    anything else exposing an integer `nbytes` (numpy arrays)
+    """
+    torch = sys.modules.get('torch')
+    found = {}
+    members = [model] + (list(vars(model).values()) if hasattr(model, '__dict__') else [])
+    for member in members:
+        if torch is not None and isinstance(member, torch.nn.Module):
+            for value in member.state_dict(keep_vars=True).values():
+                for tensor in value if isinstance(value, (tuple, list)) else (value,):
+                    if isinstance(tensor, torch.Tensor):
+                        storage, size = _tensor_storage(tensor)
+                        found[storage] = size
+        elif isinstance(getattr(member, 'nbytes', None), int):
+            found[id(member)] = member.nbytes
+    return found
+
+
+def _tensor_storage(tensor):
+    try:
+        storage = tensor.untyped_storage()
+        return storage.data_ptr(), storage.nbytes()
+    except (RuntimeError, NotImplementedError):
+        # Quantized tensors don't expose their storage
+        return tensor.data_ptr(), tensor.numel() * tensor.element_size()
+
+
+def _resident_bytes():
+    """The process's resident set size (Linux only; None elsewhere)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# ================================
+# PRETRAINED CHECKPOINTS
+# ================================
+
+def load_pretrained(model_id, device):
+    """A private, unregistered copy of `model_id` on `device` in eval mode, for callers that modify it"""
+    import transformers
+    model_class = getattr(transformers, PRETRAINED[model_id][0])
+    return model_class.from_pretrained(model_id).to(device).eval()
+
+
+def _processor_loader(model_id):
+    def load():
+        import transformers
+        return getattr(transformers, PRETRAINED[model_id][1]).from_pretrained(model_id)
+    return load
+
+
+def _pretrained_loader(model_id):
+    def load(device):
+        return load_pretrained(model_id, device)
+    return load
+
+
+_registry = ModelRegistry()
+
+for _model_id in PRETRAINED:
+    _registry.register(_model_id, _pretrained_loader(_model_id), per_device=True)
+    _registry.register(_model_id + PROCESSOR_SUFFIX, _processor_loader(_model_id))
+
+
+def get_model_registry():
+    return _registry
+
+
+def register_model(name, loader, per_device=False):
+    _registry.register(name, loader, per_device)
+
+
+def get_model(name, device=None):
+    return _registry.get(name, device)
+
+
+def get_pretrained(model_id, device=None):
+    """The shared copy of `model_id`'s weights on `device` (default_device() if None); don't modify it"""
+    return _registry.get(model_id, device)
+
+
+def get_processor(model_id):
+    return _registry.get(model_id + PROCESSOR_SUFFIX)
+
+
+def model_registry_stats():
+    return _registry.stats()
+
+
+def autodiscover_models():
+    """Import every installed app's ml_models module, where app-level models are registered"""
+    from django.apps import apps
+    for config in apps.get_app_configs():
+        module = f"{config.name}.ml_models"
+        if importlib.util.find_spec(module) is not None:
+            importlib.import_module(module)
+
+
+def warm_up(names=None):
+    """
+    Load `names` (default MODEL_WARMUP) now, then move everything allocated so
+    far into the garbage collector's permanent generation. Call it in a prefork
+    parent before the pool forks: collections in the children then never touch
+    (and so never copy) the parent's model objects.
+    """
+    names = list(settings.MODEL_WARMUP if names is None else names)
+    if not names:
+        return {}
+    autodiscover_models()
+    started = time.perf_counter()
+    loaded = {}
+    for name in names:
+        try:
+            loaded[name] = get_model(name) is not None
+        except KeyError:
+            logger.warning(f"MODEL_WARMUP names unknown model '{name}'")
+            loaded[name] = False
+    gc.collect()
+    gc.freeze()
+    stats = _registry.stats()
+    logger.info(
+        f"Warmed up {sum(loaded.values())}/{len(names)} models in {time.perf_counter() - started:.1f}s "
+        f"({stats['total_bytes'] / 1024 ** 2:.0f} MB of weights)"
+    )
+    return loaded
+
+
+def _reset_after_fork():
+    # Loaded models are kept (the child shares their memory with the parent);
+    # a lock held by another thread at fork time would never be released.
+    _registry._reset_locks()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,42 @@
+# core/serializers.py
+from rest_framework import serializers
+
+
+def requested_fields(request, param='fields'):
+    """
+    Parse a sparse-fieldset query param (?fields=id,username) into a list.
+    Returns None when the client did not ask for a subset.
+    """
+    raw = request.query_params.get(param, '') if hasattr(request, 'query_params') else request.GET.get(param, '')
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    return fields or None
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that accepts a `fields` kwarg and drops every other field.
+    Unknown field names are ignored so old dashboards keep working.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            allowed = set(fields)
+            for field_name in set(self.fields) - allowed:
+                self.fields.pop(field_name)
+
+    @classmethod
+    def model_fields_for(cls, fields, always=('id',)):
+        """
+        Concrete model columns needed to render `fields`, for use with .only().
+        Falls back to every serializer field that maps onto a model column.
+        """
+        model = cls.Meta.model
+        concrete = {f.attname: f.name for f in model._meta.concrete_fields}
+        concrete.update({f.name: f.name for f in model._meta.concrete_fields})
+        wanted = fields if fields is not None else cls.Meta.fields
+        columns = {concrete[name] for name in wanted if name in concrete}
+        columns.update(always)
+        return sorted(columns)
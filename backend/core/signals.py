@@ -0,0 +1,24 @@
+# core/signals.py
+from django.db.models.signals import post_delete, post_save
+
+from .http_cache import invalidate_tags
+
+# Resource tag per content model, as used in the views' cached_response(tags=...)
+RESOURCE_TAGS = {'post': 'posts', 'reel': 'reels', 'demographics': 'demographics'}
+
+
+def _drop_influencer_responses(sender, instance, **kwargs):
+    invalidate_tags('influencers', f'influencer:{instance.pk}')
+
+
+def _drop_content_responses(sender, instance, **kwargs):
+    """Posts, reels and demographics are tagged by their own resource and by their influencer"""
+    invalidate_tags(RESOURCE_TAGS[sender._meta.model_name], f'influencer:{instance.influencer_id}')
+
+
+# Lazy senders keep core free of imports from the apps built on top of it
+for signal in (post_save, post_delete):
+    signal.connect(_drop_influencer_responses, sender='influencers.Influencer')
+    signal.connect(_drop_content_responses, sender='posts.Post')
+    signal.connect(_drop_content_responses, sender='reels.Reel')
+    signal.connect(_drop_content_responses, sender='demographics.Demographics')
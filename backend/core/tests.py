@@ -1,3 +1,323 @@
-from django.test import TestCase
+from datetime import datetime, timezone as dt_timezone
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from influencers.models import Influencer
+from posts.models import Post
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConditionalGetTest(TestCase):
+    """ETag/Last-Modified validators and the tagged response cache (core.http_cache)"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.alice = Influencer.objects.create(username='alice', followers_count=100)
+        Post.objects.create(shortcode='p0', influencer=self.alice, likes_count=10,
+                            posted_at=datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+        self.url = '/api/v1/posts/posts/'
+
+    def test_validators_emitted(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_matching_etag_is_304_after_one_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_after_write(self):
+        import time
+        from unittest import mock
+        last_modified = self.client.get(self.url)['Last-Modified']
+        # a later second than the response above, as HTTP dates have one-second resolution
+        later = time.time_ns() + 2 * 10 ** 9
+        with mock.patch('core.http_cache.time.time_ns', return_value=later):
+            post = Post.objects.get()
+            post.likes_count = 99
+            post.save()
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['likes_count'], 99)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_repeat_request_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(first.data, second.data)
+
+    def test_rescrape_invalidates_by_tag(self):
+        etag = self.client.get(self.url)['ETag']
+        # the 'posts' tag bump (and updated_at) both move on update
+        post = Post.objects.get()
+        post.likes_count = 99
+        post.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['likes_count'], 99)
+
+    def test_rescrape_changes_etag_without_tag_bump(self):
+        from unittest import mock
+        from reels.models import Reel
+        Reel.objects.create(shortcode='r0', influencer=self.alice, likes_count=5,
+                            posted_at=datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+        for url, model in ((self.url, Post), ('/api/v1/reels/reels/', Reel)):
+            etag = self.client.get(url)['ETag']
+            # As if the cache were down when the row was re-scraped: only the validators can notice
+            with mock.patch('core.signals.invalidate_tags'):
+                item = model.objects.get()
+                item.likes_count = 99
+                item.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_per_influencer_tags(self):
+        url = f'/api/v1/influencers/{self.alice.id}/analytics/'
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(shortcode='p1', influencer=self.alice, likes_count=30)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        bob = Influencer.objects.create(username='bob', followers_count=5)
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(shortcode='p2', influencer=bob)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class MediaStoreTest(TestCase):
+    """Content-addressed downloads (core.media_store)"""
+
+    class FakeResponse:
+        def __init__(self, body, status=200):
+            self.body = body
+            self.status = status
+            self.headers = {'Content-Type': 'image/jpeg'}
+
+        def raise_for_status(self):
+            import requests
+            if self.status >= 400:
+                raise requests.HTTPError(f'{self.status} error')
+
+        def iter_content(self, chunk_size):
+            for start in range(0, len(self.body), chunk_size):
+                yield self.body[start:start + chunk_size]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    class FakeSession:
+        def __init__(self, bodies, gate=None):
+            self.bodies = bodies
+            self.gate = gate
+            self.calls = []
+
+        def get(self, url, timeout=None, stream=False):
+            self.calls.append(url)
+            if self.gate is not None:
+                self.gate.wait(5)
+            body = self.bodies.get(url)
+            return MediaStoreTest.FakeResponse(body or b'', status=200 if body is not None else 404)
+
+    def setUp(self):
+        import tempfile
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+
+    def _store(self, bodies, max_bytes=1024, gate=None):
+        from .media_store import MediaStore
+        session = self.FakeSession(bodies, gate)
+        return MediaStore(root=self.root, max_bytes=max_bytes, session=session, timeout=1), session
+
+    def test_second_fetch_is_served_from_disk(self):
+        import hashlib
+        store, session = self._store({'https://cdn/a.jpg': b'a' * 100})
+        first = store.fetch('https://cdn/a.jpg')
+        second = store.fetch('https://cdn/a.jpg')
+
+        self.assertEqual(session.calls, ['https://cdn/a.jpg'])
+        self.assertEqual(first, second)
+        self.assertEqual(first.sha256, hashlib.sha256(b'a' * 100).hexdigest())
+        self.assertEqual(first.read_bytes(), b'a' * 100)
+        self.assertEqual(store.stats()['hits'], 1)
+
+    def test_same_bytes_under_two_urls_share_one_blob(self):
+        store, _ = self._store({'https://cdn/a.jpg': b'same', 'https://mirror/a.jpg': b'same'})
+        self.assertEqual(store.fetch('https://cdn/a.jpg').path, store.fetch('https://mirror/a.jpg').path)
+        stats = store.stats()
+        self.assertEqual((stats['blobs'], stats['downloads'], stats['deduplicated']), (1, 1, 1))
+
+    def test_concurrent_fetches_of_one_url_download_once(self):
+        import threading
+        import time
+        gate = threading.Event()
+        store, session = self._store({'https://cdn/a.jpg': b'x' * 10}, gate=gate)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.fetch('https://cdn/a.jpg'))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        gate.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(session.calls, ['https://cdn/a.jpg'])
+        self.assertEqual(len({blob.path for blob in results}), 1)
+        self.assertEqual(store.stats()['shared_waits'], 3)
+
+    def test_least_recently_used_blobs_are_evicted_past_max_bytes(self):
+        import time
+        bodies = {f'https://cdn/{index}.jpg': bytes([index]) * 400 for index in range(3)}
+        store, _ = self._store(bodies, max_bytes=1000)
+        first = store.fetch('https://cdn/0.jpg')
+        time.sleep(0.001)
+        store.fetch('https://cdn/1.jpg')
+        time.sleep(0.001)
+        store.fetch('https://cdn/2.jpg')
+
+        self.assertFalse(first.path.exists())
+        self.assertIsNone(store.lookup('https://cdn/0.jpg'))
+        self.assertIsNotNone(store.lookup('https://cdn/2.jpg'))
+        self.assertEqual(store.stats()['bytes_stored'], 800)
+
+    def test_failed_download_raises_and_stores_nothing(self):
+        from .media_store import MediaFetchError
+        store, _ = self._store({})
+        with self.assertRaises(MediaFetchError):
+            store.fetch('https://cdn/missing.jpg')
+        self.assertEqual(store.stats()['blobs'], 0)
+
+
+class ModelRegistryTest(TestCase):
+    """Models load on first use, once per process, and heavy libraries stay unimported until then"""
+
+    def test_concurrent_first_use_loads_once(self):
+        import threading
+        import time
+        from .model_registry import ModelRegistry
+        registry = ModelRegistry()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            time.sleep(0.05)
+            return object()
+
+        registry.register('model', loader)
+        self.assertFalse(registry.is_loaded('model'))
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get('model'))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(len({id(model) for model in results}), 1)
+        self.assertTrue(registry.stats()['loaded']['model']['available'])
+
+    def test_failed_load_is_retried_after_backoff(self):
+        from unittest import mock
+        from .model_registry import ModelRegistry
+        registry = ModelRegistry()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError('weights not found')
+            return 'weights'
+
+        registry.register('flaky', loader)
+        with mock.patch('core.model_registry.time.monotonic', return_value=1000.0):
+            self.assertIsNone(registry.get('flaky'))
+            self.assertIsNone(registry.get('flaky'))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(registry.stats()['failed'], ['flaky'])
+        self.assertFalse(registry.is_loaded('flaky'))
+
+        with override_settings(MODEL_LOAD_RETRY_SECONDS=60), \
+                mock.patch('core.model_registry.time.monotonic', return_value=1061.0):
+            self.assertEqual(registry.get('flaky'), 'weights')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(registry.stats()['failed'], [])
+        with self.assertRaises(KeyError):
+            registry.get('unregistered')
+
+    def test_per_device_models_load_once_per_device(self):
+        from .model_registry import ModelRegistry
+        registry = ModelRegistry()
+        loads = []
+        registry.register('weights', lambda device: loads.append(device) or object(), per_device=True)
+
+        cpu = registry.get('weights', 'cpu')
+        self.assertIs(registry.get('weights', 'cpu'), cpu)
+        self.assertIsNot(registry.get('weights', 'cuda'), cpu)
+        self.assertEqual(loads, ['cpu', 'cuda'])
+        self.assertEqual(sorted(registry.stats()['loaded']), ['weights@cpu', 'weights@cuda'])
+
+    def test_memory_shared_between_models_is_counted_once(self):
+        import numpy as np
+        from .model_registry import ModelRegistry
+        registry = ModelRegistry()
+        weights = np.zeros(1000, dtype=np.float32)
+
+        class Pipeline:
+            def __init__(self, model):
+                self.model = model
+                self.head = np.zeros(10, dtype=np.float32)
+
+        registry.register('backbone', lambda: weights)
+        registry.register('pipeline', lambda: Pipeline(registry.get('backbone')))
+        registry.get('pipeline')
+
+        stats = registry.stats()
+        self.assertEqual(stats['loaded']['pipeline']['bytes'], 4040)
+        self.assertEqual(stats['loaded']['pipeline']['shared_bytes'], 4000)
+        self.assertEqual(stats['loaded']['backbone']['bytes'], 4000)
+        self.assertEqual(stats['total_bytes'], 4040)
+
+    def test_warm_up_loads_configured_models_and_freezes_gc(self):
+        from unittest import mock
+        from . import model_registry
+        registry = model_registry.ModelRegistry()
+        registry.register('analytics.test-model', lambda: object())
+        with mock.patch.object(model_registry, '_registry', registry), \
+                mock.patch.object(model_registry.gc, 'freeze') as freeze, \
+                override_settings(MODEL_WARMUP=['analytics.test-model', 'missing']):
+            loaded = model_registry.warm_up()
+
+        self.assertEqual(loaded, {'analytics.test-model': True, 'missing': False})
+        self.assertTrue(registry.is_loaded('analytics.test-model'))
+        freeze.assert_called_once()
+
+    def test_shared_checkpoints_are_registered_once(self):
+        from analytics.inference import CAPTION_MODEL, CLASSIFIER_MODEL
+        from scraping.ml_models import ML_PIPELINES
+        from .model_registry import PRETRAINED
+        checkpoints = {CAPTION_MODEL, CLASSIFIER_MODEL} | {model_id for _, model_id in ML_PIPELINES.values()}
+        self.assertLessEqual(checkpoints, set(PRETRAINED))
+        self.assertEqual(ML_PIPELINES['scraping.image-classifier'][1], CLASSIFIER_MODEL)
+
+    def test_worker_startup_imports_no_heavy_libraries(self):
+        from .management.commands.benchmark_startup import measure_startup
+        self.assertEqual(measure_startup('worker')['heavy'], [])
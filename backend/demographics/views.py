@@ -4,6 +4,8 @@ from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from datetime import datetime, timedelta
+from django.db.models import Count, Max
+from core.http_cache import cached_response
 from .models import Demographics
 
 class DemographicsViewSet(viewsets.ModelViewSet):
@@ -24,6 +26,7 @@ class DemographicsViewSet(viewsets.ModelViewSet):
 class DemographicsListAPIView(APIView):
     """Demographics List API"""
     
+    @cached_response(tags=['demographics', 'influencers'], validators=lambda request: _demographics_validators())
     def get(self, request):
         try:
             demographics = Demographics.objects.all()
@@ -109,9 +112,14 @@ class DemographicsListAPIView(APIView):
                 'count': len(mock_data)
             })
 
+def _demographics_validators():
+    totals = Demographics.objects.aggregate(latest=Max('last_updated'), count=Count('id'))
+    return totals['latest'], totals['count']
+
 class DemographicsDetailAPIView(APIView):
     """Demographics Detail API"""
     
+    @cached_response(tags=['demographics', 'influencers'], validators=lambda request, **kwargs: _demographics_validators())
     def get(self, request, demographics_id):
         try:
             demo = get_object_or_404(Demographics, id=demographics_id)
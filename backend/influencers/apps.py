@@ -5,3 +5,6 @@ class InfluencersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'influencers'
     verbose_name = 'Instagram Influencers'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from influencers import search
+from influencers.models import Influencer
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the influencer full-text search index'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(f"⚠️ No full-text index for the '{connection.vendor}' backend, search uses icontains")
+            return
+
+        search.create_search_schema(connection)
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"✅ Search index rebuilt for {Influencer.objects.count()} influencers"))
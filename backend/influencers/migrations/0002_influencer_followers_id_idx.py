@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='influencer',
+            options={'ordering': ['-followers_count', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='influencer',
+            index=models.Index(fields=['-followers_count', 'id'], name='influencer_followers_id_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Full-text search index (FTS5 on SQLite, tsvector + GIN on PostgreSQL)
+
+from django.db import migrations
+
+from influencers import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_search_schema(schema_editor.connection)
+    search.rebuild_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_search_schema(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencers', '0002_influencer_followers_id_idx'),
+        ('posts', '0001_initial'),
+        ('reels', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -54,7 +54,10 @@ class Influencer(models.Model):
     audience_insights = models.JSONField(default=dict, blank=True)
     
     class Meta:
-        ordering = ['-followers_count']
+        ordering = ['-followers_count', 'id']
+        indexes = [
+            models.Index(fields=['-followers_count', 'id'], name='influencer_followers_id_idx'),
+        ]
         
     def __str__(self):
         return f"@{self.username}"
@@ -0,0 +1,14 @@
+# influencers/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class InfluencerCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the model's (-followers_count, id) ordering.
+    Pages are served straight off influencer_followers_id_idx, so page N
+    costs the same as page 1 no matter how large the table gets.
+    """
+    ordering = ('-followers_count', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,265 @@
+# influencers/search.py
+"""
+Full-text search over influencer username, full_name, bio and recent captions.
+
+SQLite uses an FTS5 virtual table keyed by influencer id (ranked with bm25);
+PostgreSQL uses a weighted tsvector table with a GIN index (ranked with
+ts_rank). Other backends fall back to icontains lookups.
+
+Documents are refreshed from influencers.signals on every influencer/post/reel
+save. Bulk ingest wraps its writes in deferred_indexing() so each influencer is
+reindexed once at the end instead of once per row.
+"""
+import logging
+import re
+import threading
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import Q
+
+from core.http_cache import invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'influencer_search'
+# Only the latest captions go into a document, so it stays small
+CAPTIONS_PER_DOCUMENT = 50
+# Column weights: username, full_name, bio, captions
+FIELD_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_deferred = threading.local()
+
+
+# ================================
+# SCHEMA
+# ================================
+
+def create_search_schema(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                f"username, full_name, bio, captions, "
+                f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                f"influencer_id bigint PRIMARY KEY "
+                f"REFERENCES influencers_influencer(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                f"document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx "
+                f"ON {SEARCH_TABLE} USING GIN (document)"
+            )
+
+
+def drop_search_schema(conn):
+    if conn.vendor in ('sqlite', 'postgresql'):
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor in ('sqlite', 'postgresql')
+
+
+# ================================
+# INDEXING
+# ================================
+
+_SQLITE_CAPTIONS = (
+    "COALESCE((SELECT group_concat(caption, ' ') FROM ("
+    "  SELECT caption FROM {table} WHERE influencer_id = i.id ORDER BY posted_at DESC LIMIT {limit}"
+    ")), '')"
+)
+_POSTGRES_CAPTIONS = (
+    "COALESCE((SELECT string_agg(caption, ' ') FROM ("
+    "  SELECT caption FROM {table} WHERE influencer_id = i.id ORDER BY posted_at DESC LIMIT {limit}"
+    ") recent), '')"
+)
+
+
+def _captions_sql(template):
+    return ' || \' \' || '.join(
+        template.format(table=table, limit=CAPTIONS_PER_DOCUMENT)
+        for table in ('posts_post', 'reels_reel')
+    )
+
+
+def _index_sql(conn, where):
+    if conn.vendor == 'sqlite':
+        return (
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, username, full_name, bio, captions) "
+            f"SELECT i.id, i.username, i.full_name, i.bio, {_captions_sql(_SQLITE_CAPTIONS)} "
+            f"FROM influencers_influencer i {where}"
+        )
+    return (
+        f"INSERT INTO {SEARCH_TABLE} (influencer_id, document) "
+        f"SELECT i.id, "
+        f"setweight(to_tsvector('simple', i.username), 'A') || "
+        f"setweight(to_tsvector('simple', i.full_name), 'A') || "
+        f"setweight(to_tsvector('simple', i.bio), 'B') || "
+        f"setweight(to_tsvector('simple', {_captions_sql(_POSTGRES_CAPTIONS)}), 'C') "
+        f"FROM influencers_influencer i {where} "
+        f"ON CONFLICT (influencer_id) DO UPDATE SET document = EXCLUDED.document"
+    )
+
+
+def _delete_sql(conn, placeholders):
+    key = 'rowid' if conn.vendor == 'sqlite' else 'influencer_id'
+    return f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({placeholders})"
+
+
+def index_influencers(influencer_ids, conn=None):
+    """(Re)build the documents for the given influencers; missing ids are dropped"""
+    conn = conn or connection
+    ids = sorted({int(pk) for pk in influencer_ids})
+    if not ids or not is_supported(conn):
+        return
+
+    if _deferred_ids() is not None:
+        _deferred_ids().update(ids)
+        return
+
+    with conn.cursor() as cursor:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(_delete_sql(conn, placeholders), chunk)
+            cursor.execute(_index_sql(conn, f"WHERE i.id IN ({placeholders})"), chunk)
+    invalidate_tags('search')
+
+
+def remove_influencers(influencer_ids, conn=None):
+    conn = conn or connection
+    ids = [int(pk) for pk in influencer_ids]
+    if not ids or not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(_delete_sql(conn, ', '.join(['%s'] * len(ids))), ids)
+    invalidate_tags('search')
+
+
+def rebuild_index(conn=None):
+    """Drop every document and reindex the whole roster in one statement"""
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(_index_sql(conn, ''))
+    invalidate_tags('search')
+
+
+def _deferred_ids():
+    return getattr(_deferred, 'ids', None)
+
+
+@contextmanager
+def deferred_indexing():
+    """
+    Collect reindex requests raised inside the block (e.g. by per-row save
+    signals during scrape ingest) and flush them once on exit.
+    """
+    if _deferred_ids() is not None:
+        # Nested: the outermost block flushes
+        yield
+        return
+
+    _deferred.ids = set()
+    try:
+        yield
+    finally:
+        ids, _deferred.ids = _deferred.ids, None
+        index_influencers(ids)
+
+
+# ================================
+# QUERYING
+# ================================
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query.lower())
+
+
+def _match_expression(tokens, vendor):
+    """Every token must match; each one also matches as a prefix"""
+    if vendor == 'sqlite':
+        return ' AND '.join(f'"{token}"*' for token in tokens)
+    return ' & '.join(f"{token}:*" for token in tokens)
+
+
+def search_influencers(query, category=None, min_followers=None, max_followers=None,
+                       is_verified=None, limit=20):
+    """
+    Ranked influencer ids matching `query`, best first, as [(id, score), ...].
+    Higher score is better on every backend.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    filters, params = [], []
+    if category:
+        filters.append('i.category = %s')
+        params.append(category)
+    if min_followers is not None:
+        filters.append('i.followers_count >= %s')
+        params.append(min_followers)
+    if max_followers is not None:
+        filters.append('i.followers_count <= %s')
+        params.append(max_followers)
+    if is_verified is not None:
+        filters.append('i.is_verified = %s')
+        params.append(is_verified)
+    extra_where = ''.join(f' AND {clause}' for clause in filters)
+
+    vendor = connection.vendor
+    match = _match_expression(tokens, vendor)
+
+    if vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        sql = (
+            f"SELECT i.id, -bm25({SEARCH_TABLE}, {weights}) AS score "
+            f"FROM {SEARCH_TABLE} JOIN influencers_influencer i ON i.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH %s{extra_where} "
+            f"ORDER BY score DESC, i.followers_count DESC LIMIT %s"
+        )
+    elif vendor == 'postgresql':
+        sql = (
+            f"SELECT i.id, ts_rank(s.document, to_tsquery('simple', %s)) AS score "
+            f"FROM {SEARCH_TABLE} s JOIN influencers_influencer i ON i.id = s.influencer_id "
+            f"WHERE s.document @@ to_tsquery('simple', %s){extra_where} "
+            f"ORDER BY score DESC, i.followers_count DESC LIMIT %s"
+        )
+        params = [match] + params
+    else:
+        return _fallback_search(tokens, category, min_followers, max_followers, is_verified, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match] + params + [limit])
+        return [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+
+def _fallback_search(tokens, category, min_followers, max_followers, is_verified, limit):
+    """Unranked icontains search for backends without a full-text index"""
+    from .models import Influencer
+
+    queryset = Influencer.objects.all()
+    for token in tokens:
+        queryset = queryset.filter(
+            Q(username__icontains=token) | Q(full_name__icontains=token) | Q(bio__icontains=token)
+        )
+    if category:
+        queryset = queryset.filter(category=category)
+    if min_followers is not None:
+        queryset = queryset.filter(followers_count__gte=min_followers)
+    if max_followers is not None:
+        queryset = queryset.filter(followers_count__lte=max_followers)
+    if is_verified is not None:
+        queryset = queryset.filter(is_verified=is_verified)
+    return [(pk, 0.0) for pk in queryset.values_list('id', flat=True)[:limit]]
@@ -1,26 +1,24 @@
 # influencers/serializers.py
 from rest_framework import serializers
+from core.serializers import DynamicFieldsModelSerializer
 from .models import Influencer
 
-class InfluencerSerializer(serializers.ModelSerializer):
+class InfluencerSerializer(DynamicFieldsModelSerializer):
     """
     Basic Influencer Serializer - Point 5 API Implementation
+    Pass fields=[...] to render a sparse fieldset.
     """
-    engagement_rate = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
-    avg_likes = serializers.DecimalField(max_digits=15, decimal_places=0, read_only=True)
-    avg_comments = serializers.DecimalField(max_digits=15, decimal_places=0, read_only=True)
-    follower_tier = serializers.CharField(read_only=True)
     
     class Meta:
         model = Influencer
         fields = [
             'id', 'username', 'full_name', 'profile_pic_url', 'bio',
             'followers_count', 'following_count', 'posts_count',
-            'is_verified', 'is_private', 'is_business',
-            'engagement_rate', 'avg_likes', 'avg_comments', 'follower_tier',
-            'last_scraped', 'scrape_count', 'created_at', 'updated_at'
+            'is_verified', 'is_private', 'is_business', 'category',
+            'engagement_rate', 'avg_likes', 'avg_comments', 'avg_views',
+            'last_scraped', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'engagement_rate', 'avg_likes', 'avg_comments', 'follower_tier']
+        read_only_fields = ['id', 'engagement_rate', 'avg_likes', 'avg_comments', 'avg_views']
 
 class InfluencerDetailSerializer(InfluencerSerializer):
     """
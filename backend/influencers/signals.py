@@ -0,0 +1,32 @@
+# influencers/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.models import Post
+from reels.models import Reel
+
+from . import search
+from .models import Influencer
+
+# Influencer columns that feed the search document
+SEARCH_FIELDS = {'username', 'full_name', 'bio'}
+
+
+@receiver(post_save, sender=Influencer)
+def index_influencer(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and not SEARCH_FIELDS & set(update_fields):
+        return
+    search.index_influencers([instance.id])
+
+
+@receiver(post_delete, sender=Influencer)
+def unindex_influencer(sender, instance, **kwargs):
+    search.remove_influencers([instance.id])
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Reel)
+def reindex_captions(sender, instance, update_fields=None, **kwargs):
+    if update_fields and 'caption' not in update_fields:
+        return
+    search.index_influencers([instance.influencer_id])
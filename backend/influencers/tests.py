@@ -1,3 +1,166 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Influencer
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class InfluencerListPaginationTest(TestCase):
+    """Keyset pagination and sparse fieldsets on GET /api/v1/influencers/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Influencer.objects.bulk_create([
+            Influencer(username=f'user_{i}', followers_count=1000 - (i // 2) * 10, bio='x' * 50)
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_pages_follow_followers_then_id_ordering(self):
+        seen = []
+        url = '/api/v1/influencers/?page_size=7'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        expected = list(
+            Influencer.objects.order_by('-followers_count', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_sparse_fieldset(self):
+        response = self.client.get('/api/v1/influencers/?fields=id,username,nope')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'username'})
+
+    def test_sparse_fieldset_defers_unrendered_columns(self):
+        # validator aggregate, then the page itself
+        with self.assertNumQueries(2) as ctx:
+            self.client.get('/api/v1/influencers/?fields=username')
+        sql = ctx.captured_queries[1]['sql']
+        self.assertIn('"username"', sql)
+        self.assertNotIn('"bio"', sql)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class InfluencerSearchTest(TestCase):
+    """FTS-backed GET /api/v1/influencers/search/"""
+
+    def setUp(self):
+        from posts.models import Post
+
+        self.client = APIClient()
+        self.runner = Influencer.objects.create(
+            username='marathon_mia', full_name='Mia Jones', bio='Trail running coach',
+            category='fitness', followers_count=50000, is_verified=True,
+        )
+        self.chef = Influencer.objects.create(
+            username='chef_leo', full_name='Leo Marathonson', bio='Pasta every day',
+            category='food', followers_count=90000,
+        )
+        self.baker = Influencer.objects.create(
+            username='bread_bee', bio='Sourdough', category='food', followers_count=1000,
+        )
+        Post.objects.create(shortcode='s1', influencer=self.baker, caption='Carb loading before my first marathon')
+
+    def _search(self, **params):
+        response = self.client.get('/api/v1/influencers/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['username'] for row in response.data['results']]
+
+    def test_matches_bio_and_captions(self):
+        self.assertEqual(self._search(q='sourdough'), ['bread_bee'])
+        self.assertEqual(self._search(q='carb loading'), ['bread_bee'])
+
+    def test_prefix_query_ranks_username_hits_first(self):
+        results = self._search(q='marath')
+        self.assertEqual(results[0], 'marathon_mia')
+        self.assertEqual(set(results), {'marathon_mia', 'chef_leo', 'bread_bee'})
+
+    def test_filters(self):
+        self.assertEqual(set(self._search(q='marath', category='food')), {'chef_leo', 'bread_bee'})
+        self.assertEqual(self._search(q='marath', min_followers=60000), ['chef_leo'])
+        self.assertEqual(self._search(q='marath', max_followers=5000), ['bread_bee'])
+        self.assertEqual(self._search(q='marath', verified='true'), ['marathon_mia'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.chef.bio = 'Now baking sourdough'
+        self.chef.save()
+        self.assertEqual(set(self._search(q='sourdough')), {'bread_bee', 'chef_leo'})
+        self.baker.delete()
+        self.assertEqual(self._search(q='sourdough'), ['chef_leo'])
+
+    def test_deferred_indexing_flushes_once(self):
+        from posts.models import Post
+        from .search import deferred_indexing
+
+        with deferred_indexing():
+            for i in range(5):
+                Post.objects.create(shortcode=f'd{i}', influencer=self.chef, caption=f'gnocchi night {i}')
+            self.assertEqual(self._search(q='gnocchi'), [])
+        self.assertEqual(self._search(q='gnocchi'), ['chef_leo'])
+
+    def test_empty_query(self):
+        self.assertEqual(self._search(q='  '), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class InfluencerBatchTest(TestCase):
+    """GET /api/v1/influencers/batch/?ids= returns every dashboard section at a fixed query cost"""
+
+    def setUp(self):
+        from datetime import datetime, timedelta, timezone as dt_timezone
+        from django.core.cache import cache
+        from demographics.models import Demographics
+        from posts.models import Post
+        from reels.models import Reel
+
+        cache.clear()
+        self.client = APIClient()
+        self.influencers = []
+        start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        for i in range(4):
+            influencer = Influencer.objects.create(username=f'batch_{i}', followers_count=1000 * (i + 1))
+            for j in range(5):
+                Post.objects.create(shortcode=f'p{i}_{j}', influencer=influencer, likes_count=10 * j,
+                                    posted_at=start + timedelta(days=j))
+                Reel.objects.create(shortcode=f'r{i}_{j}', influencer=influencer, views_count=100,
+                                    posted_at=start + timedelta(days=j))
+            if i % 2 == 0:
+                Demographics.objects.create(influencer=influencer, male_percentage=40.0)
+            self.influencers.append(influencer)
+
+    def _url(self, influencers, **params):
+        ids = ','.join(str(influencer.id) for influencer in influencers)
+        extra = ''.join(f'&{key}={value}' for key, value in params.items())
+        return f'/api/v1/influencers/batch/?ids={ids}{extra}'
+
+    def test_sections_and_latest_content(self):
+        data = self.client.get(self._url(self.influencers[:2], posts=3, reels=2)).data
+        self.assertEqual([row['influencer']['username'] for row in data['results']], ['batch_0', 'batch_1'])
+        first = data['results'][0]
+        self.assertEqual([post['shortcode'] for post in first['posts']], ['p0_4', 'p0_3', 'p0_2'])
+        self.assertEqual(len(first['reels']), 2)
+        self.assertEqual(first['analytics']['total_posts'], 5)
+        self.assertEqual(first['demographics']['gender_distribution']['male'], 40.0)
+        self.assertIsNone(data['results'][1]['demographics'])
+
+    def test_query_count_is_constant(self):
+        # validators, influencers + demographics, posts, reels, two totals, best hours
+        with self.assertNumQueries(7):
+            self.client.get(self._url(self.influencers[:1]))
+        from django.core.cache import cache
+        cache.clear()
+        with self.assertNumQueries(7):
+            self.client.get(self._url(self.influencers))
+
+    def test_missing_and_invalid_ids(self):
+        data = self.client.get(f'/api/v1/influencers/batch/?ids={self.influencers[0].id},999999').data
+        self.assertEqual(data['missing'], [999999])
+        self.assertEqual(self.client.get('/api/v1/influencers/batch/?ids=a,b').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/influencers/batch/').status_code, 400)
@@ -1,73 +1,147 @@
 ﻿from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.routers import DefaultRouter
 import json
 from datetime import datetime, timedelta
+from django.db.models import Count, Max, Prefetch
+from rest_framework.exceptions import ValidationError
 
+from analytics.cache import get_influencer_analytics, get_many_influencer_analytics
+from core.http_cache import cached_response
+from core.serializers import requested_fields
 from .models import Influencer
+from .pagination import InfluencerCursorPagination
+from .search import search_influencers
+from .serializers import InfluencerSerializer
+
+# Composite /batch/ endpoint limits
+BATCH_MAX_INFLUENCERS = 50
+BATCH_CONTENT_DEFAULT = 20
+BATCH_CONTENT_MAX = 50
 
 class InfluencerViewSet(viewsets.ModelViewSet):
     queryset = Influencer.objects.all()
+    serializer_class = InfluencerSerializer
+    pagination_class = InfluencerCursorPagination
+    ordering = InfluencerCursorPagination.ordering
+    ordering_fields = ['followers_count']
     
+    @cached_response(tags=['influencers'], validators=lambda request, **kwargs: _roster_validators())
     def list(self, request):
-        """Get all influencers"""
-        influencers = Influencer.objects.all()
+        """Get influencers, keyset-paginated on (-followers_count, id)"""
+        fields = requested_fields(request)
+        queryset = _influencer_list_queryset(fields)
         
-        data = []
-        for influencer in influencers:
-            data.append({
-                'id': influencer.id,
-                'username': getattr(influencer, 'username', ''),
-                'full_name': getattr(influencer, 'full_name', ''),
-                'followers_count': getattr(influencer, 'followers_count', 0),
-                'following_count': getattr(influencer, 'following_count', 0),
-                'posts_count': getattr(influencer, 'posts_count', 0),
-                'profile_pic_url': getattr(influencer, 'profile_pic_url', ''),
-                'bio': getattr(influencer, 'bio', ''),
-            })
-        
-        return Response(data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True, fields=fields)
+        return self.get_paginated_response(serializer.data)
     
+    @cached_response(tags=lambda request, pk=None: [f'influencer:{pk}'],
+                     validators=lambda request, pk=None: _influencer_validators(pk))
     def retrieve(self, request, pk=None):
         """Get single influencer"""
         influencer = get_object_or_404(Influencer, pk=pk)
+        return Response(_influencer_summary(influencer))
+    
+    @action(detail=False, methods=['get'])
+    @cached_response(tags=lambda request: [f'influencer:{pk}' for pk in _batch_ids(request)],
+                     validators=lambda request: _batch_validators(_batch_ids(request)))
+    def batch(self, request):
+        """
+        Influencer, analytics, latest posts/reels and demographics for many
+        influencers in one request: ?ids=1,2,3 (max 50), ?posts=N, ?reels=N
+        (latest per influencer, default 20). The query count does not grow
+        with the number of ids.
+        """
+        ids = _batch_ids(request)
+        posts_limit = _content_limit(request, 'posts')
+        reels_limit = _content_limit(request, 'reels')
         
-        data = {
-            'id': influencer.id,
-            'username': getattr(influencer, 'username', ''),
-            'full_name': getattr(influencer, 'full_name', ''),
-            'followers_count': getattr(influencer, 'followers_count', 0),
-            'following_count': getattr(influencer, 'following_count', 0),
-            'posts_count': getattr(influencer, 'posts_count', 0),
-            'profile_pic_url': getattr(influencer, 'profile_pic_url', ''),
-            'bio': getattr(influencer, 'bio', ''),
-        }
+        from posts.models import Post
+        from reels.models import Reel
+        influencers = list(
+            Influencer.objects.filter(id__in=ids)
+            .select_related('demographics')
+            .prefetch_related(
+                Prefetch('posts', queryset=Post.objects.order_by('-posted_at', '-id')[:posts_limit],
+                         to_attr='latest_posts'),
+                Prefetch('reels', queryset=Reel.objects.order_by('-posted_at', '-id')[:reels_limit],
+                         to_attr='latest_reels'),
+            )
+        )
+        analytics = get_many_influencer_analytics(influencers)
+        by_id = {influencer.id: influencer for influencer in influencers}
         
-        return Response(data)
+        results = []
+        for pk in ids:
+            influencer = by_id.get(pk)
+            if influencer is None:
+                continue
+            demographics = getattr(influencer, 'demographics', None)
+            results.append({
+                'influencer': _influencer_summary(influencer),
+                'analytics': analytics[pk],
+                'posts': [_post_summary(post) for post in influencer.latest_posts],
+                'reels': [_reel_summary(reel) for reel in influencer.latest_reels],
+                'demographics': _demographics_summary(demographics) if demographics else None,
+            })
+        
+        return Response({
+            'results': results,
+            'count': len(results),
+            'missing': [pk for pk in ids if pk not in by_id],
+            'generated_at': datetime.now().isoformat()
+        })
     
     @action(detail=False, methods=['get'])
+    @cached_response(tags=['influencers', 'search'], validators=lambda request: _roster_validators())
     def search(self, request):
-        """Search influencers"""
-        query = request.query_params.get('q', '')
-        influencers = Influencer.objects.filter(username__icontains=query)[:20]
+        """
+        Ranked full-text search over username, full_name, bio and captions.
+        ?q= (prefix matches), ?category=, ?min_followers=, ?max_followers=,
+        ?verified=true|false, ?limit= (default 20, max 100)
+        """
+        params = request.query_params
+        query = params.get('q', '')
+        try:
+            min_followers = int(params['min_followers']) if params.get('min_followers') else None
+            max_followers = int(params['max_followers']) if params.get('max_followers') else None
+            limit = max(1, min(int(params.get('limit', 20)), 100))
+        except ValueError:
+            return Response({'error': 'min_followers, max_followers and limit must be integers'}, status=400)
+        verified = params.get('verified')
+        is_verified = None if verified is None else verified.lower() in ('1', 'true', 'yes')
+        
+        ranked = search_influencers(
+            query,
+            category=params.get('category') or None,
+            min_followers=min_followers,
+            max_followers=max_followers,
+            is_verified=is_verified,
+            limit=limit,
+        )
+        
+        fields = requested_fields(request) or ['id', 'username', 'full_name', 'followers_count',
+                                               'category', 'is_verified', 'profile_pic_url']
+        influencers = Influencer.objects.only(
+            *InfluencerSerializer.model_fields_for(fields)
+        ).in_bulk([pk for pk, _ in ranked])
         
         data = []
-        for influencer in influencers:
-            data.append({
-                'id': influencer.id,
-                'username': getattr(influencer, 'username', ''),
-                'full_name': getattr(influencer, 'full_name', ''),
-                'followers_count': getattr(influencer, 'followers_count', 0),
-            })
+        for pk, score in ranked:
+            if pk in influencers:
+                row = InfluencerSerializer(influencers[pk], fields=fields).data
+                row['score'] = round(score, 4)
+                data.append(row)
         
-        return Response({'results': data})
+        return Response({'results': data, 'count': len(data), 'query': query})
 
 class APIHealthView(APIView):
     """API Health Check"""
@@ -82,33 +156,34 @@ class APIHealthView(APIView):
         return Response(data)
 
 class InfluencerAnalyticsAPIView(APIView):
-    """Influencer Analytics API"""
+    """Influencer Analytics API (cached per influencer, see analytics.cache)"""
     
+    @cached_response(tags=lambda request, influencer_id: [f'influencer:{influencer_id}'],
+                     validators=lambda request, influencer_id: _influencer_validators(influencer_id))
     def get(self, request, influencer_id):
         try:
-            influencer = get_object_or_404(Influencer, id=influencer_id)
+            influencer = get_object_or_404(
+                Influencer.objects.only('id', 'username', 'followers_count'), id=influencer_id
+            )
             
-            # Mock analytics data
             data = {
                 'influencer_id': influencer_id,
-                'username': getattr(influencer, 'username', ''),
-                'analytics': {
-                    'engagement_rate': 5.2,
-                    'avg_likes': 1250,
-                    'avg_comments': 89,
-                    'best_posting_time': '18:00',
-                    'growth_rate': 3.1,
-                    'reach': 45000
-                },
+                'username': influencer.username,
+                'followers_count': influencer.followers_count,
+                'analytics': get_influencer_analytics(influencer),
                 'generated_at': datetime.now().isoformat()
             }
             return Response(data)
+        except Http404:
+            raise
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
 class InfluencerPostsAPIView(APIView):
     """Influencer Posts API"""
     
+    @cached_response(tags=lambda request, influencer_id: [f'influencer:{influencer_id}'],
+                     validators=lambda request, influencer_id: _influencer_validators(influencer_id))
     def get(self, request, influencer_id):
         try:
             influencer = get_object_or_404(Influencer, id=influencer_id)
@@ -119,15 +194,7 @@ class InfluencerPostsAPIView(APIView):
                 from posts.models import Post
                 posts = Post.objects.filter(influencer=influencer)[:20]
                 
-                for post in posts:
-                    posts_data.append({
-                        'id': post.id,
-                        'shortcode': getattr(post, 'shortcode', ''),
-                        'caption': getattr(post, 'caption', ''),
-                        'likes_count': getattr(post, 'likes_count', 0),
-                        'comments_count': getattr(post, 'comments_count', 0),
-                        'media_url': getattr(post, 'media_url', ''),
-                    })
+                posts_data = [_post_summary(post) for post in posts]
             except:
                 # Fallback mock data
                 posts_data = [
@@ -154,6 +221,8 @@ class InfluencerPostsAPIView(APIView):
 class InfluencerReelsAPIView(APIView):
     """Influencer Reels API"""
     
+    @cached_response(tags=lambda request, influencer_id: [f'influencer:{influencer_id}'],
+                     validators=lambda request, influencer_id: _influencer_validators(influencer_id))
     def get(self, request, influencer_id):
         try:
             influencer = get_object_or_404(Influencer, id=influencer_id)
@@ -164,16 +233,7 @@ class InfluencerReelsAPIView(APIView):
                 from reels.models import Reel
                 reels = Reel.objects.filter(influencer=influencer)[:20]
                 
-                for reel in reels:
-                    reels_data.append({
-                        'id': reel.id,
-                        'shortcode': getattr(reel, 'shortcode', ''),
-                        'caption': getattr(reel, 'caption', ''),
-                        'views_count': getattr(reel, 'views_count', 0),
-                        'likes_count': getattr(reel, 'likes_count', 0),
-                        'duration': getattr(reel, 'duration', 0),
-                        'media_url': getattr(reel, 'media_url', ''),
-                    })
+                reels_data = [_reel_summary(reel) for reel in reels]
             except:
                 # Fallback mock data
                 reels_data = [
@@ -201,6 +261,8 @@ class InfluencerReelsAPIView(APIView):
 class InfluencerDemographicsAPIView(APIView):
     """Influencer Demographics API"""
     
+    @cached_response(tags=lambda request, influencer_id: [f'influencer:{influencer_id}'],
+                     validators=lambda request, influencer_id: _influencer_validators(influencer_id))
     def get(self, request, influencer_id):
         try:
             influencer = get_object_or_404(Influencer, id=influencer_id)
@@ -210,20 +272,7 @@ class InfluencerDemographicsAPIView(APIView):
             try:
                 from demographics.models import Demographics
                 demographics = Demographics.objects.get(influencer=influencer)
-                
-                demographics_data = {
-                    'total_followers_analyzed': getattr(demographics, 'total_followers_analyzed', 0),
-                    'confidence_score': getattr(demographics, 'confidence_score', 0),
-                    'age_distribution': {
-                        '18-24': getattr(demographics, 'age_18_24', 0),
-                        '25-34': getattr(demographics, 'age_25_34', 0),
-                        '35-44': getattr(demographics, 'age_35_44', 0),
-                    },
-                    'gender_distribution': {
-                        'male': getattr(demographics, 'male_percentage', 0),
-                        'female': getattr(demographics, 'female_percentage', 0),
-                    }
-                }
+                demographics_data = _demographics_summary(demographics)
             except:
                 # Fallback mock data
                 demographics_data = {
@@ -251,21 +300,108 @@ class InfluencerDemographicsAPIView(APIView):
             return Response({'error': str(e)}, status=500)
 
 # Simple function-based views as backup
+@api_view(['GET'])
 def influencer_list(request):
-    """Simple list view"""
-    influencers = Influencer.objects.all()
-    data = {
-        'results': [
-            {
-                'id': inf.id,
-                'username': getattr(inf, 'username', ''),
-                'full_name': getattr(inf, 'full_name', ''),
-                'followers_count': getattr(inf, 'followers_count', 0),
-            }
-            for inf in influencers
-        ]
+    """Simple list view (same keyset pagination and ?fields= as the ViewSet)"""
+    fields = requested_fields(request) or ['id', 'username', 'full_name', 'followers_count']
+    queryset = _influencer_list_queryset(fields)
+    
+    paginator = InfluencerCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = InfluencerSerializer(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
+
+def _influencer_summary(influencer):
+    return {
+        'id': influencer.id,
+        'username': getattr(influencer, 'username', ''),
+        'full_name': getattr(influencer, 'full_name', ''),
+        'followers_count': getattr(influencer, 'followers_count', 0),
+        'following_count': getattr(influencer, 'following_count', 0),
+        'posts_count': getattr(influencer, 'posts_count', 0),
+        'profile_pic_url': getattr(influencer, 'profile_pic_url', ''),
+        'bio': getattr(influencer, 'bio', ''),
     }
-    return JsonResponse(data)
+
+def _post_summary(post):
+    return {
+        'id': post.id,
+        'shortcode': getattr(post, 'shortcode', ''),
+        'caption': getattr(post, 'caption', ''),
+        'likes_count': getattr(post, 'likes_count', 0),
+        'comments_count': getattr(post, 'comments_count', 0),
+        'media_url': getattr(post, 'media_url', ''),
+    }
+
+def _reel_summary(reel):
+    return {
+        'id': reel.id,
+        'shortcode': getattr(reel, 'shortcode', ''),
+        'caption': getattr(reel, 'caption', ''),
+        'views_count': getattr(reel, 'views_count', 0),
+        'likes_count': getattr(reel, 'likes_count', 0),
+        'duration': getattr(reel, 'duration', 0),
+        'media_url': getattr(reel, 'media_url', ''),
+    }
+
+def _demographics_summary(demographics):
+    return {
+        'total_followers_analyzed': getattr(demographics, 'total_followers_analyzed', 0),
+        'confidence_score': getattr(demographics, 'confidence_score', 0),
+        'age_distribution': {
+            '18-24': getattr(demographics, 'age_18_24', 0),
+            '25-34': getattr(demographics, 'age_25_34', 0),
+            '35-44': getattr(demographics, 'age_35_44', 0),
+        },
+        'gender_distribution': {
+            'male': getattr(demographics, 'male_percentage', 0),
+            'female': getattr(demographics, 'female_percentage', 0),
+        }
+    }
+
+def _batch_ids(request):
+    """Unique ids from ?ids=1,2,3 in request order"""
+    raw = request.query_params.get('ids', '')
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw.split(',') if value.strip()))
+    except ValueError:
+        raise ValidationError({'error': 'ids must be a comma-separated list of integers'})
+    if not ids:
+        raise ValidationError({'error': 'ids is required'})
+    if len(ids) > BATCH_MAX_INFLUENCERS:
+        raise ValidationError({'error': f'At most {BATCH_MAX_INFLUENCERS} ids per request'})
+    return ids
+
+def _content_limit(request, param):
+    try:
+        limit = int(request.query_params.get(param, BATCH_CONTENT_DEFAULT))
+    except ValueError:
+        raise ValidationError({'error': f'{param} must be an integer'})
+    return max(0, min(limit, BATCH_CONTENT_MAX))
+
+def _batch_validators(ids):
+    rows = Influencer.objects.filter(id__in=ids).order_by('id').values_list('id', 'updated_at', 'followers_count')
+    return tuple(value for row in rows for value in row)
+
+def _roster_validators():
+    """Newest Influencer.updated_at plus the row count, which also moves on deletes"""
+    totals = Influencer.objects.aggregate(latest=Max('updated_at'), count=Count('id'))
+    return totals['latest'], totals['count']
+
+def _influencer_validators(influencer_id):
+    """
+    One influencer's updated_at and follower count. Content/demographics writes
+    bump the influencer's cache tag instead (core.signals), and the follower
+    count catches queryset.update() calls that skip auto_now.
+    """
+    return tuple(
+        Influencer.objects.filter(pk=influencer_id).values_list('updated_at', 'followers_count').first() or ()
+    )
+
+def _influencer_list_queryset(fields):
+    """Project only the columns the response renders, plus the cursor keys"""
+    columns = InfluencerSerializer.model_fields_for(fields, always=('id', 'followers_count'))
+    return Influencer.objects.only(*columns)
 
 def influencer_detail(request, username):
     """Simple detail view"""
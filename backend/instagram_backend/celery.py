@@ -2,6 +2,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import worker_init
 from django.conf import settings
 
 # Set the default Django settings module for the 'celery' program
@@ -30,10 +31,29 @@ app.conf.beat_schedule = {
         'task': 'analytics.tasks.track_engagement_metrics',
         'schedule': 3600.0,  # Run hourly
     },
+    'refresh-analytics-rollups': {
+        'task': 'analytics.tasks.refresh_analytics_rollups',
+        'schedule': 900.0,  # Run every 15 minutes
+    },
+    'rebuild-analytics-rollups': {
+        'task': 'analytics.tasks.refresh_analytics_rollups',
+        'schedule': 604800.0,  # Run weekly (7 days)
+        'kwargs': {'full': True},
+    },
+    'compact-metric-snapshots': {
+        'task': 'analytics.tasks.compact_metric_snapshots',
+        'schedule': 3600.0,  # Run hourly
+    },
 }
 
 app.conf.timezone = 'UTC'
 
+@worker_init.connect
+def warm_up_models(**kwargs):
+    # Runs in the worker's main process before the prefork pool starts
+    from core.model_registry import warm_up
+    warm_up()
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
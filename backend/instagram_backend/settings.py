@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -207,11 +207,27 @@ CACHES = {
         'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            # A Redis outage degrades to cache misses instead of failing requests/writes
+            'IGNORE_EXCEPTIONS': True,
         },
         'KEY_PREFIX': 'instagram_backend',
         'TIMEOUT': 300,
     }
 }
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
+# Per-influencer analytics cache (invalidated on post/reel writes)
+INFLUENCER_ANALYTICS_CACHE_TIMEOUT = config('INFLUENCER_ANALYTICS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Cached read-endpoint responses (core/http_cache.py); entries also die on tag invalidation
+HTTP_RESPONSE_CACHE_TIMEOUT = config('HTTP_RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Engagement history retention per MetricSnapshot granularity, in days
+METRIC_SNAPSHOT_RETENTION_DAYS = {
+    'h': 2,      # hourly samples
+    'd': 180,    # daily rollups
+    'w': 1095,   # weekly rollups
+}
 
 # Instagram Scraping Settings
 INSTAGRAM_APP_ID = "936619743392459"
@@ -220,12 +236,65 @@ SCRAPING_DELAY_MAX = 3
 MAX_POSTS_PER_SCRAPE = 12
 MAX_REELS_PER_SCRAPE = 5
 
+# Daily update fan-out (scraping.tasks.daily_influencer_update): influencers per
+# shard, and how many lanes of a run may occupy each queue at once
+DAILY_UPDATE_SHARD_SIZE = config('DAILY_UPDATE_SHARD_SIZE', default=200, cast=int)
+DAILY_UPDATE_QUEUE_CONCURRENCY = {
+    'scraping': config('DAILY_UPDATE_SCRAPING_CONCURRENCY', default=4, cast=int),
+    'analytics': config('DAILY_UPDATE_ANALYTICS_CONCURRENCY', default=2, cast=int),
+    'demographics': config('DAILY_UPDATE_DEMOGRAPHICS_CONCURRENCY', default=4, cast=int),
+}
+
 
 # AI Processing Settings
 ENABLE_AI_ANALYSIS = config('ENABLE_AI_ANALYSIS', default=True, cast=bool)
 IMAGE_QUALITY_THRESHOLD = config('IMAGE_QUALITY_THRESHOLD', default=0.5, cast=float)
 MAX_KEYWORDS_PER_POST = config('MAX_KEYWORDS_PER_POST', default=10, cast=int)
 
+# Shared BLIP/ViT inference worker (analytics/inference.py): images per batch and
+# how long a partial batch may wait for more before running
+INFERENCE_MAX_BATCH_SIZE = config('INFERENCE_MAX_BATCH_SIZE', default=16, cast=int)
+INFERENCE_MAX_WAIT_MS = config('INFERENCE_MAX_WAIT_MS', default=50, cast=int)
+
+# Inference backend: 'torch', 'torch-int8', 'onnx' or 'onnx-int8' (CPU-only,
+# exported graphs kept in INFERENCE_ONNX_DIR); caption beams (1 = greedy); and
+# CPU threads per backend (0 = library default)
+INFERENCE_BACKEND = config('INFERENCE_BACKEND', default='torch')
+INFERENCE_CAPTION_BEAMS = config('INFERENCE_CAPTION_BEAMS', default=5, cast=int)
+INFERENCE_THREADS = config('INFERENCE_THREADS', default=0, cast=int)
+INFERENCE_ONNX_DIR = config('INFERENCE_ONNX_DIR', default=str(BASE_DIR / 'models' / 'onnx'))
+
+# Models (core/model_registry.py names, e.g. analytics.vision) a Celery worker
+# loads before forking its pool, so the children share the weights copy-on-write
+MODEL_WARMUP = config('MODEL_WARMUP', default='', cast=Csv())
+# Seconds a model that failed to load (download error, OOM) is reported
+# unavailable before the next get() tries loading it again
+MODEL_LOAD_RETRY_SECONDS = config('MODEL_LOAD_RETRY_SECONDS', default=300, cast=int)
+
+# Analysis results buffered per bulk write (analytics/results.py)
+ANALYSIS_WRITE_CHUNK_SIZE = config('ANALYSIS_WRITE_CHUNK_SIZE', default=200, cast=int)
+
+# Content-addressed image/video analysis cache (analytics/analysis_cache.py)
+ANALYSIS_CACHE_ENABLED = config('ANALYSIS_CACHE_ENABLED', default=True, cast=bool)
+ANALYSIS_CACHE_PATH = config('ANALYSIS_CACHE_PATH', default=str(BASE_DIR / 'cache' / 'analysis_cache.sqlite3'))
+ANALYSIS_CACHE_MAX_ENTRIES = config('ANALYSIS_CACHE_MAX_ENTRIES', default=50000, cast=int)
+
+# Shared media download store (core/media_store.py), under MEDIA_ROOT
+MEDIA_STORE_DIR = config('MEDIA_STORE_DIR', default='media_store')
+MEDIA_STORE_MAX_BYTES = config('MEDIA_STORE_MAX_BYTES', default=5 * 1024 ** 3, cast=int)
+MEDIA_STORE_POOL_SIZE = config('MEDIA_STORE_POOL_SIZE', default=16, cast=int)
+MEDIA_STORE_TIMEOUT = config('MEDIA_STORE_TIMEOUT', default=30, cast=int)
+
+# Media prefetch stage ahead of the analyzers (analytics/prefetch.py): download
+# threads, decoded bytes allowed in flight, and concurrent downloads per host
+PREFETCH_WORKERS = config('PREFETCH_WORKERS', default=8, cast=int)
+PREFETCH_MAX_INFLIGHT_MB = config('PREFETCH_MAX_INFLIGHT_MB', default=256, cast=int)
+PREFETCH_PER_HOST = config('PREFETCH_PER_HOST', default=4, cast=int)
+
+# Weekly analytics report files (analytics/reports.py), written under MEDIA_ROOT
+ANALYTICS_REPORT_DIR = config('ANALYTICS_REPORT_DIR', default='reports')
+ANALYTICS_REPORT_FORMAT = config('ANALYTICS_REPORT_FORMAT', default='jsonl')
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
@@ -39,6 +39,8 @@ class Post(models.Model):
     # Timestamps
     posted_at = models.DateTimeField(default=timezone.now, db_index=True)
     scraped_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every save; the hourly engagement tracker's change watermark
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     # ML Analysis
     is_analyzed = models.BooleanField(default=False)
@@ -79,6 +81,9 @@ class Post(models.Model):
     
     class Meta:
         ordering = ['-posted_at']
+        indexes = [
+            models.Index(fields=['influencer', '-posted_at'], name='post_influencer_posted_idx'),
+        ]
         
     def __str__(self):
         return f"{self.influencer.username} - {self.shortcode}"
\ No newline at end of file
@@ -1,18 +1,15 @@
+# posts/serializers.py
 from rest_framework import serializers
-from .models import Post, PostAnalysis
+from core.serializers import DynamicFieldsModelSerializer
+from .models import Post
 
-class PostAnalysisSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = PostAnalysis
-        exclude = ['id', 'post']
-
-class PostSerializer(serializers.ModelSerializer):
-    analysis = PostAnalysisSerializer(read_only=True)
-    influencer_username = serializers.CharField(source='influencer.username', read_only=True)
+class PostSerializer(DynamicFieldsModelSerializer):
+    influencer = serializers.CharField(source='influencer.username', read_only=True)
+    influencer_id = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Post
-        fields = ['id', 'post_id', 'shortcode', 'image_url', 'caption',
-                 'likes_count', 'comments_count', 'post_date', 'keywords',
-                 'vibe_classification', 'quality_score', 'is_analyzed',
-                 'influencer_username', 'analysis']
+        fields = ['id', 'shortcode', 'influencer', 'influencer_id', 'caption',
+                 'media_type', 'media_url', 'thumbnail_url',
+                 'likes_count', 'comments_count', 'views_count', 'posted_at',
+                 'vibe_classification', 'quality_score', 'is_analyzed']
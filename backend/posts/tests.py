@@ -1,3 +1,117 @@
+from datetime import datetime, timezone as dt_timezone
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from influencers.models import Influencer
+from .models import Post
+
+
+class PostListQueryBudgetTest(TestCase):
+    """GET /api/v1/posts/posts/ stays at a fixed query count and honours its filters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = Influencer.objects.create(username='alice', followers_count=100)
+        cls.bob = Influencer.objects.create(username='bob', followers_count=50)
+        posts = []
+        for i in range(30):
+            posts.append(Post(
+                shortcode=f'p{i}',
+                influencer=cls.alice if i % 2 else cls.bob,
+                media_type='video' if i % 3 == 0 else 'photo',
+                posted_at=datetime(2024, 1, 1 + i, tzinfo=dt_timezone.utc),
+            ))
+        Post.objects.bulk_create(posts)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_query_budget_independent_of_rows(self):
+        # the ETag validator aggregate, one COUNT for the paginator, one joined SELECT for the page
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/posts/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIn(response.data['results'][0]['influencer'], {'alice', 'bob'})
+
+    def test_filters(self):
+        response = self.client.get('/api/v1/posts/posts/', {
+            'influencer': 'alice',
+            'media_type': 'video',
+            'posted_after': '2024-01-05',
+            'posted_before': '2024-01-20',
+        })
+        expected = Post.objects.filter(
+            influencer=self.alice, media_type='video',
+            posted_at__date__gte='2024-01-05', posted_at__date__lte='2024-01-20',
+        ).count()
+        self.assertEqual(response.data['count'], expected)
+        self.assertTrue(all(row['influencer'] == 'alice' for row in response.data['results']))
+
+        response = self.client.get('/api/v1/posts/posts/', {'influencer': self.bob.id})
+        self.assertEqual(response.data['count'], 15)
+
+    def test_invalid_filters_are_rejected(self):
+        self.assertEqual(self.client.get('/api/v1/posts/posts/', {'media_type': 'story'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/posts/posts/', {'posted_after': 'soon'}).status_code, 400)
+
+
+class PostExportTest(TestCase):
+    """GET /api/v1/posts/export/ streams the filtered catalog chunk by chunk"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = Influencer.objects.create(username='alice', followers_count=100)
+        Post.objects.bulk_create([
+            Post(shortcode=f'e{i}', influencer=cls.alice, likes_count=i, hashtags=['a', 'b'],
+                 is_analyzed=i % 2 == 0, analysis_status='completed' if i % 2 == 0 else 'pending',
+                 posted_at=datetime(2024, 1, 1 + i, tzinfo=dt_timezone.utc))
+            for i in range(7)
+        ])
+
+    def _get(self, **params):
+        response = self.client.get('/api/v1/posts/export/', params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson_in_chunks(self):
+        import json
+        from unittest import mock
+
+        with mock.patch('core.export.EXPORT_CHUNK_SIZE', 3):
+            response, body = self._get(format='ndjson', analysis_status='completed')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['shortcode'] for row in rows], ['e0', 'e2', 'e4', 'e6'])
+        self.assertEqual(rows[0]['influencer'], 'alice')
+        self.assertEqual(rows[0]['hashtags'], ['a', 'b'])
+
+    def test_csv(self):
+        import csv
+        import io
+
+        _, body = self._get(format='csv', posted_after='2024-01-03', posted_before='2024-01-04')
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([row['shortcode'] for row in rows], ['e2', 'e3'])
+        self.assertEqual(rows[0]['hashtags'], '["a", "b"]')
+
+    def test_parquet(self):
+        import io
+        from unittest import mock
+        from core.export import PARQUET_AVAILABLE
+        if not PARQUET_AVAILABLE:
+            self.skipTest('pyarrow not installed')
+        import pyarrow.parquet as pq
+
+        with mock.patch('core.export.EXPORT_CHUNK_SIZE', 2):
+            _, body = self._get(format='parquet', analyzed='false')
+        parquet = pq.ParquetFile(io.BytesIO(body))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        table = parquet.read()
+        self.assertEqual(table.column('shortcode').to_pylist(), ['e1', 'e3', 'e5'])
+        self.assertEqual(table.column('likes_count').to_pylist(), [1, 3, 5])
 
-# Create your tests here.
+    def test_bad_format(self):
+        self.assertEqual(self.client.get('/api/v1/posts/export/', {'format': 'xml'}).status_code, 400)
@@ -10,6 +10,8 @@ router.register(r'posts', views.PostViewSet, basename='post')
 app_name = 'posts'
 
 urlpatterns = [
+    # Streaming bulk export (?format=ndjson|csv|parquet)
+    path('export/', views.post_export, name='post-export'),
     # ViewSet URLs - WORKING
     path('', include(router.urls)),
 ]
@@ -4,26 +4,37 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from datetime import datetime
+from django.db.models import Count, Max
+from core.export import export_view
+from core.filters import filter_content_queryset
+from core.http_cache import cached_response
+from core.serializers import requested_fields
 from .models import Post
+from .serializers import PostSerializer
 
 class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+    queryset = Post.objects.select_related('influencer')
+    serializer_class = PostSerializer
     
+    @cached_response(tags=['posts', 'influencers'], validators=lambda request: _posts_validators())
     def list(self, request):
-        posts = Post.objects.all()
-        data = []
-        for post in posts:
-            data.append({
-                'id': post.id,
-                'shortcode': getattr(post, 'shortcode', ''),
-                'caption': getattr(post, 'caption', ''),
-                'likes_count': getattr(post, 'likes_count', 0),
-                'comments_count': getattr(post, 'comments_count', 0),
-                'influencer': post.influencer.username if hasattr(post, 'influencer') else '',
-                'media_url': getattr(post, 'media_url', ''),
-            })
-        return Response(data)
+        """
+        Paginated posts, filterable by ?influencer=, ?posted_after=, ?posted_before=
+        and ?media_type=. Influencers are joined in, so the page costs two queries.
+        """
+        queryset = filter_content_queryset(self.get_queryset(), request.query_params)
+        
+        media_type = request.query_params.get('media_type')
+        if media_type:
+            if media_type not in dict(Post.MEDIA_TYPE_CHOICES):
+                raise ValidationError({'error': f"Unknown media_type '{media_type}'"})
+            queryset = queryset.filter(media_type=media_type)
+        
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True, fields=requested_fields(request))
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def trending(self, request):
@@ -40,6 +51,11 @@ class PostViewSet(viewsets.ModelViewSet):
         ]
         return Response({'results': data})
 
+def _posts_validators():
+    """Newest save plus the row count, so updates and deletes change the ETag even without the 'posts' tag bump"""
+    totals = Post.objects.aggregate(latest=Max('updated_at'), count=Count('id'))
+    return totals['latest'], totals['count']
+
 class PostAnalyticsAPIView(APIView):
     """Post Analytics API"""
     
@@ -72,3 +88,7 @@ def post_list(request):
         ]
     }
     return JsonResponse(data)
+
+def post_export(request):
+    """Stream the whole (filtered) post catalog; see core.export for formats and filters"""
+    return export_view(request, Post.objects.all(), 'posts')
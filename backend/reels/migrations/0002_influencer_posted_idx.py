@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reels', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reel',
+            index=models.Index(fields=['influencer', '-posted_at'], name='reel_influencer_posted_idx'),
+        ),
+    ]
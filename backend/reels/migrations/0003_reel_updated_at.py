@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reels', '0002_influencer_posted_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reel',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -32,6 +32,8 @@ class Reel(models.Model):
     # Timestamps
     posted_at = models.DateTimeField(db_index=True)
     scraped_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every save; the hourly engagement tracker's change watermark
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     # ML Analysis
     is_analyzed = models.BooleanField(default=False)
@@ -64,6 +66,9 @@ class Reel(models.Model):
     
     class Meta:
         ordering = ['-posted_at']
+        indexes = [
+            models.Index(fields=['influencer', '-posted_at'], name='reel_influencer_posted_idx'),
+        ]
         
     def __str__(self):
         return f"{self.influencer.username} - Reel {self.shortcode}"
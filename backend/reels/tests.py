@@ -1,3 +1,39 @@
+from datetime import datetime, timezone as dt_timezone
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from influencers.models import Influencer
+from .models import Reel
+
+
+class ReelListQueryBudgetTest(TestCase):
+    """GET /api/v1/reels/reels/ stays at a fixed query count"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.influencers = [Influencer.objects.create(username=f'creator_{i}') for i in range(5)]
+        Reel.objects.bulk_create([
+            Reel(
+                shortcode=f'r{i}',
+                influencer=cls.influencers[i % 5],
+                posted_at=datetime(2024, 2, 1 + i, tzinfo=dt_timezone.utc),
+            )
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_query_budget_independent_of_rows(self):
+        # the ETag validator aggregate, the paginator COUNT and the joined page SELECT
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/reels/reels/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 25)
 
-# Create your tests here.
+    def test_filters(self):
+        response = self.client.get('/api/v1/reels/reels/', {
+            'influencer': 'creator_0', 'posted_before': '2024-02-10',
+        })
+        self.assertEqual(response.data['count'], 2)
@@ -10,6 +10,8 @@ router.register(r'reels', views.ReelViewSet, basename='reel')
 app_name = 'reels'
 
 urlpatterns = [
+    # Streaming bulk export (?format=ndjson|csv|parquet)
+    path('export/', views.reel_export, name='reel-export'),
     # ViewSet URLs - WORKING
     path('', include(router.urls)),
 ]
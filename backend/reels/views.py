@@ -4,25 +4,34 @@ from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from datetime import datetime
+from django.db.models import Count, Max
+from core.export import export_view
+from core.filters import filter_content_queryset
+from core.http_cache import cached_response
+from core.serializers import requested_fields
 from .models import Reel
+from .serializers import ReelSerializer
 
 class ReelViewSet(viewsets.ModelViewSet):
-    queryset = Reel.objects.all()
+    queryset = Reel.objects.select_related('influencer')
+    serializer_class = ReelSerializer
     
+    @cached_response(tags=['reels', 'influencers'], validators=lambda request: _reels_validators())
     def list(self, request):
-        reels = Reel.objects.all()
-        data = []
-        for reel in reels:
-            data.append({
-                'id': reel.id,
-                'shortcode': getattr(reel, 'shortcode', ''),
-                'caption': getattr(reel, 'caption', ''),
-                'views_count': getattr(reel, 'views_count', 0),
-                'likes_count': getattr(reel, 'likes_count', 0),
-                'duration': getattr(reel, 'duration', 0),
-                'influencer': reel.influencer.username if hasattr(reel, 'influencer') else '',
-            })
-        return Response(data)
+        """
+        Paginated reels, filterable by ?influencer=, ?posted_after= and ?posted_before=.
+        Influencers are joined in, so the page costs two queries.
+        """
+        queryset = filter_content_queryset(self.get_queryset(), request.query_params)
+        
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True, fields=requested_fields(request))
+        return self.get_paginated_response(serializer.data)
+
+def _reels_validators():
+    """Newest save plus the row count, so updates and deletes change the ETag even without the 'reels' tag bump"""
+    totals = Reel.objects.aggregate(latest=Max('updated_at'), count=Count('id'))
+    return totals['latest'], totals['count']
 
 class ReelAnalyticsAPIView(APIView):
     """Reel Analytics API"""
@@ -56,3 +65,7 @@ def reel_list(request):
         ]
     }
     return JsonResponse(data)
+
+def reel_export(request):
+    """Stream the whole (filtered) reel catalog; see core.export for formats and filters"""
+    return export_view(request, Reel.objects.all(), 'reels')
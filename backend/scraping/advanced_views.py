@@ -6,7 +6,6 @@ from datetime import datetime
 from django.utils import timezone
 from influencers.models import Influencer
 from posts.models import Post
-from scraping.rate_limit_bypass import InstagramRateLimitBypass
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +19,8 @@ class AdvancedScrapingView(APIView):
         try:
             print(f"🚀 Starting ADVANCED SCRAPING for @{username}")
             
-            # Initialize bypass system
+            # Initialize bypass system (imported here: selenium is slow to import)
+            from scraping.rate_limit_bypass import InstagramRateLimitBypass
             bypass_system = InstagramRateLimitBypass()
             
             # Extract data using best available method
@@ -129,6 +129,7 @@ class BypassStatusView(APIView):
     
     def get(self, request):
         try:
+            from scraping.rate_limit_bypass import InstagramRateLimitBypass
             bypass_system = InstagramRateLimitBypass()
             
             # Get method statuses
@@ -5,6 +5,10 @@ from influencers.models import Influencer
 from posts.models import Post
 from reels.models import Reel
 from demographics.models import Demographics
+from analytics.models import MetricSnapshot
+from analytics.tags import index_content_tags
+from analytics.data_processing import DataProcessor
+from analytics.timeseries import record_content_snapshots, record_influencer_snapshot
 from datetime import datetime
 import logging
 
@@ -57,6 +61,9 @@ class Command(BaseCommand):
                 self.save_posts_data(posts_data, username, analyzer)
                 self.save_reels_data(reels_data, username, analyzer)
             
+            # Append this scrape to the engagement history
+            self.save_influencer_snapshot(username)
+            
             self.stdout.write(
                 self.style.SUCCESS(f"✅ Successfully scraped data for @{username}")
             )
@@ -126,11 +133,20 @@ class Command(BaseCommand):
             self.stdout.write(f"❌ Error saving profile: {str(e)}")
             return None
     
+    def save_influencer_snapshot(self, username):
+        """Record the influencer's follower and content totals after a scrape"""
+        try:
+            influencer = Influencer.objects.get(username=username)
+            record_influencer_snapshot(influencer, DataProcessor().aggregate_content_totals(influencer))
+        except Exception as e:
+            self.stdout.write(f"❌ Error saving snapshot: {str(e)}")
+    
     def save_posts_data(self, posts_data, username, analyzer):
         """Save posts data"""
         try:
             influencer = Influencer.objects.get(username=username)
             created_count = 0
+            saved = []
             
             for post_data in posts_data:
                 try:
@@ -149,6 +165,7 @@ class Command(BaseCommand):
                             'location': post_data.get('location', ''),
                         }
                     )
+                    saved.append(post)
                     
                     if created:
                         created_count += 1
@@ -182,6 +199,8 @@ class Command(BaseCommand):
                     self.stdout.write(f"❌ Error saving post {post_data.get('shortcode', 'unknown')}: {str(e)}")
                     continue
             
+            record_content_snapshots(MetricSnapshot.ENTITY_POST, saved)
+            index_content_tags(MetricSnapshot.ENTITY_POST, saved)
             self.stdout.write(f"📸 Saved {created_count} new posts for @{username}")
             
         except Exception as e:
@@ -192,6 +211,7 @@ class Command(BaseCommand):
         try:
             influencer = Influencer.objects.get(username=username)
             created_count = 0
+            saved = []
             
             for reel_data in reels_data:
                 try:
@@ -211,6 +231,7 @@ class Command(BaseCommand):
                             'mentions': reel_data.get('mentions', []),
                         }
                     )
+                    saved.append(reel)
                     
                     if created:
                         created_count += 1
@@ -232,6 +253,8 @@ class Command(BaseCommand):
                     self.stdout.write(f"❌ Error saving reel {reel_data.get('shortcode', 'unknown')}: {str(e)}")
                     continue
             
+            record_content_snapshots(MetricSnapshot.ENTITY_REEL, saved)
+            index_content_tags(MetricSnapshot.ENTITY_REEL, saved)
             self.stdout.write(f"🎥 Saved {created_count} new reels for @{username}")
             
         except Exception as e:
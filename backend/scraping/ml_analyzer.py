@@ -1,11 +1,7 @@
 ﻿import cv2
 import numpy as np
 from PIL import Image, ImageEnhance, ImageStat
-import requests
-import io
 import logging
-from textblob import TextBlob
-import nltk
 from collections import Counter
 import json
 import re
@@ -13,46 +9,48 @@ import hashlib
 from datetime import datetime
 import os
 
-try:
-    import torch
-    import torchvision.transforms as transforms
-    from transformers import pipeline
-    ADVANCED_ML_AVAILABLE = True
-except ImportError:
-    ADVANCED_ML_AVAILABLE = False
+from core.media_store import get_media_store
+from core.model_registry import get_model, module_available
+
+from .ml_models import ML_PIPELINES
+
+# Checked without importing: torch and transformers load with the first model
+ADVANCED_ML_AVAILABLE = module_available('torch', 'transformers')
 
 logger = logging.getLogger(__name__)
 
 class InstagramMLAnalyzer:
     def __init__(self):
-        self.setup_ml_models()
+        # ML models are shared process-wide and load on first use (see setup_ml_models)
         self.vibe_keywords = self.load_vibe_classifiers()
         self.quality_thresholds = self.setup_quality_thresholds()
-        
+    
+    @property
+    def image_classifier(self):
+        return self._model('scraping.image-classifier')
+    
+    @property
+    def sentiment_analyzer(self):
+        return self._model('scraping.sentiment')
+    
+    @property
+    def object_detector(self):
+        return self._model('scraping.object-detector')
+    
+    @staticmethod
+    def _model(name):
+        return get_model(name) if ADVANCED_ML_AVAILABLE else None
+    
     def setup_ml_models(self):
-        """Initialize ML models for analysis"""
-        try:
-            if ADVANCED_ML_AVAILABLE:
-                # Image classification pipeline
-                self.image_classifier = pipeline("image-classification", 
-                                               model="google/vit-base-patch16-224")
-                
-                # Text sentiment analysis
-                self.sentiment_analyzer = pipeline("sentiment-analysis")
-                
-                # Object detection (lightweight)
-                self.object_detector = pipeline("object-detection", 
-                                              model="facebook/detr-resnet-50")
-                
-                logger.info("✅ Advanced ML models loaded")
-            else:
-                logger.info("⚠️ Using basic analysis (advanced ML not available)")
-                
-        except Exception as e:
-            logger.warning(f"ML model loading failed: {e}")
-            self.image_classifier = None
-            self.sentiment_analyzer = None
-            self.object_detector = None
+        """Load every ML model now rather than on first use"""
+        if not ADVANCED_ML_AVAILABLE:
+            logger.info("⚠️ Using basic analysis (advanced ML not available)")
+            return
+        loaded = [name for name in ML_PIPELINES if get_model(name) is not None]
+        if len(loaded) == len(ML_PIPELINES):
+            logger.info("✅ Advanced ML models loaded")
+        else:
+            logger.warning(f"ML model loading failed for {len(ML_PIPELINES) - len(loaded)} of {len(ML_PIPELINES)} models")
     
     def load_vibe_classifiers(self):
         """Load vibe/ambience classification keywords"""
@@ -276,6 +274,7 @@ class InstagramMLAnalyzer:
         
         # Sentiment analysis
         try:
+            from textblob import TextBlob
             blob = TextBlob(clean_text)
             sentiment_score = blob.sentiment.polarity
         except:
@@ -296,12 +295,11 @@ class InstagramMLAnalyzer:
         try:
             print(f"    🖼️ Analyzing image: {image_url[:50]}...")
             
-            # Download image
-            response = requests.get(image_url, timeout=10)
-            image = Image.open(io.BytesIO(response.content))
-            
-            # Convert to numpy array for OpenCV
-            img_array = np.array(image)
+            # Download image (or reuse the stored copy); convert() loads the
+            # pixels before the block closes the file
+            with Image.open(get_media_store().fetch(image_url).path) as image:
+                # Convert to numpy array for OpenCV
+                img_array = np.array(image.convert('RGB'))
             
             # Image quality analysis - MANDATORY
             quality_metrics = self.analyze_image_quality(img_array)
@@ -458,15 +456,10 @@ class InstagramMLAnalyzer:
         """Get dominant color in image"""
         try:
             # Reshape image to be a list of pixels
-            pixels = img_array.reshape((-1, 3))
-            
-            # Use k-means to find dominant color
-            from sklearn.cluster import KMeans
-            kmeans = KMeans(n_clusters=1, random_state=42)
-            kmeans.fit(pixels)
-            
-            dominant_color = kmeans.cluster_centers_[0]
-            r, g, b = dominant_color
+            pixels = img_array.reshape((-1, img_array.shape[-1]))
+
+            # A single k-means cluster is just the mean color
+            r, g, b = pixels[:, :3].mean(axis=0)
             
             # Classify color
             if r > 150 and g < 100 and b < 100:
@@ -532,6 +525,7 @@ class InstagramMLAnalyzer:
             return {'bio_sentiment': 0.0, 'bio_keywords': [], 'bio_length': 0}
         
         try:
+            from textblob import TextBlob
             blob = TextBlob(bio)
             sentiment = blob.sentiment.polarity
             
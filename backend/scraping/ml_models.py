@@ -0,0 +1,31 @@
+# scraping/ml_models.py
+"""
+transformers pipelines used by InstagramMLAnalyzer, registered with
+core.model_registry. Each pipeline wraps the registry's shared copy of its
+checkpoint, so the ViT classifier here is the same instance the analytics
+inference worker runs.
+"""
+from core.model_registry import get_pretrained, get_processor, register_model
+
+# Registry name -> (pipeline task, checkpoint in core.model_registry.PRETRAINED)
+ML_PIPELINES = {
+    'scraping.image-classifier': ('image-classification', 'google/vit-base-patch16-224'),
+    'scraping.sentiment': ('sentiment-analysis', 'distilbert-base-uncased-finetuned-sst-2-english'),
+    'scraping.object-detector': ('object-detection', 'facebook/detr-resnet-50'),
+}
+
+
+def _pipeline_loader(task, model_id):
+    def load(device):
+        from transformers import pipeline
+        model, processor = get_pretrained(model_id, device), get_processor(model_id)
+        if model is None or processor is None:
+            raise RuntimeError(f"{model_id} is unavailable")
+        preprocessing = {'tokenizer': processor} if task == 'sentiment-analysis' else {'image_processor': processor}
+        # The model is already on `device`, so the pipeline doesn't move (or copy) it
+        return pipeline(task, model=model, device=device, **preprocessing)
+    return load
+
+
+for _name, (_task, _model_id) in ML_PIPELINES.items():
+    register_model(_name, _pipeline_loader(_task, _model_id), per_device=True)
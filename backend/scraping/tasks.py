@@ -1,11 +1,21 @@
 # scraping/tasks.py
-from celery import shared_task
+import json
+import uuid
+
+from celery import chain, group, shared_task
 from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.db.models import Avg, Count, Sum
 from django.utils import timezone
 from .instagram_scraper import InstagramScraper
 from influencers.models import Influencer
 from posts.models import Post
 from reels.models import Reel
+from analytics.data_processing import DataProcessor
+from analytics.models import MetricSnapshot
+from analytics.tags import index_content_tags
+from analytics.timeseries import record_content_snapshots, record_influencer_snapshot
+from influencers.search import deferred_indexing
 
 logger = get_task_logger(__name__)
 
@@ -26,26 +36,31 @@ def scrape_influencer_data(self, influencer_id: int):
         scraper = InstagramScraper()
         
         # Perform complete scraping
-        scraped_data = scraper.scrape_complete_profile(username)
-        
-        if not scraped_data.get('scrape_success'):
-            logger.error(f"Scraping failed for @{username}: {scraped_data.get('error')}")
-            return f"Scraping failed: {scraped_data.get('error')}"
+        scraped_data = scraper.full_profile_scrape(username)
         
-        # Update influencer with scraped data
-        _update_influencer_data(influencer, scraped_data)
+        if not scraped_data:
+            logger.error(f"Scraping failed for @{username}")
+            return f"Scraping failed for @{username}"
         
-        # Create/update posts
-        posts_created = _create_posts(influencer, scraped_data.get('posts', []))
-        
-        # Create/update reels
-        reels_created = _create_reels(influencer, scraped_data.get('reels', []))
+        # Per-row save signals would reindex search once per post; flush once instead
+        with deferred_indexing():
+            # Update influencer with scraped data
+            _update_influencer_data(influencer, scraped_data['profile'])
+            
+            # Create/update posts
+            posts_created = _create_posts(influencer, scraped_data.get('posts', []))
+            
+            # Create/update reels
+            reels_created = _create_reels(influencer, scraped_data.get('reels', []))
         
         # Update scraping metadata
         influencer.last_scraped = timezone.now()
-        influencer.scrape_count += 1
         influencer.save()
         
+        # Append this scrape to the engagement history
+        totals = DataProcessor().aggregate_content_totals(influencer)
+        record_influencer_snapshot(influencer, totals)
+        
         result_message = f"Scraping completed for @{username}: {posts_created} posts, {reels_created} reels"
         logger.info(result_message)
         
@@ -75,94 +90,263 @@ def _update_influencer_data(influencer, scraped_data):
 def _create_posts(influencer, posts_data):
     """Create post records from scraped data"""
     created_count = 0
+    posts = []
     
     for post_data in posts_data:
         post, created = Post.objects.update_or_create(
-            post_id=post_data['post_id'],
+            shortcode=post_data['shortcode'],
             defaults={
                 'influencer': influencer,
-                'shortcode': post_data['shortcode'],
-                'image_url': post_data['image_url'],
-                'caption': post_data['caption'],
-                'likes_count': post_data['likes_count'],
-                'comments_count': post_data['comments_count'],
-                'post_date': post_data['post_date'],
-                'is_video': post_data['is_video'],
-                'video_url': post_data.get('video_url'),
+                'caption': post_data.get('caption', ''),
+                'media_type': post_data.get('media_type', 'photo'),
+                'media_url': post_data.get('media_url', ''),
+                'thumbnail_url': post_data.get('thumbnail_url', ''),
+                'likes_count': post_data.get('likes_count', 0),
+                'comments_count': post_data.get('comments_count', 0),
+                'views_count': post_data.get('views_count', 0),
+                'posted_at': post_data['posted_at'],
+                'hashtags': post_data.get('hashtags', []),
+                'mentions': post_data.get('mentions', []),
+                'location': post_data.get('location', ''),
             }
         )
+        posts.append(post)
         
         if created:
             created_count += 1
     
+    record_content_snapshots(MetricSnapshot.ENTITY_POST, posts)
+    index_content_tags(MetricSnapshot.ENTITY_POST, posts)
     return created_count
 
 def _create_reels(influencer, reels_data):
     """Create reel records from scraped data"""
     created_count = 0
+    reels = []
     
     for reel_data in reels_data:
         reel, created = Reel.objects.update_or_create(
-            reel_id=reel_data['reel_id'],
+            shortcode=reel_data['shortcode'],
             defaults={
                 'influencer': influencer,
-                'shortcode': reel_data['shortcode'],
-                'video_url': reel_data['video_url'],
-                'thumbnail_url': reel_data['thumbnail_url'],
-                'caption': reel_data['caption'],
-                'views_count': reel_data['views_count'],
-                'likes_count': reel_data['likes_count'],
-                'comments_count': reel_data['comments_count'],
-                'post_date': reel_data['post_date'],
-                'duration': reel_data['duration'],
+                'caption': reel_data.get('caption', ''),
+                'media_url': reel_data.get('media_url', ''),
+                'thumbnail_url': reel_data.get('thumbnail_url', ''),
+                'duration': reel_data.get('duration', 0),
+                'views_count': reel_data.get('views_count', 0),
+                'likes_count': reel_data.get('likes_count', 0),
+                'comments_count': reel_data.get('comments_count', 0),
+                'posted_at': reel_data['posted_at'],
+                'hashtags': reel_data.get('hashtags', []),
+                'mentions': reel_data.get('mentions', []),
             }
         )
+        reels.append(reel)
         
         if created:
             created_count += 1
     
+    record_content_snapshots(MetricSnapshot.ENTITY_REEL, reels)
+    index_content_tags(MetricSnapshot.ENTITY_REEL, reels)
     return created_count
 
+# ================================
+# DAILY UPDATE ORCHESTRATION
+# ================================
+#
+# daily_influencer_update shards the roster and chains one task per shard,
+# then finalize_daily_update. Each shard task replaces itself with its stage
+# canvas: per stage, a group of "lanes" (each lane works through its slice of
+# the shard one influencer at a time) followed by a progress checkpoint. The
+# number of lanes per stage is that stage's queue limit, so at most that many
+# tasks of the daily run occupy the queue at once. Progress rows are written to
+# django_celery_results' TaskResult table under the run id.
+
+# (stage, queue) in execution order
+DAILY_UPDATE_STAGES = [
+    ('scrape', 'scraping'),
+    ('posts', 'analytics'),
+    ('reels', 'analytics'),
+    ('demographics', 'demographics'),
+]
+PROGRESS_CONTENT_TYPE = 'application/json'
+
+
+def _shards(ids, size):
+    return [ids[start:start + size] for start in range(0, len(ids), size)]
+
+
+def _lanes(ids, count):
+    """Split ids into at most `count` interleaved, non-empty lanes"""
+    return [lane for lane in (ids[index::max(1, count)] for index in range(max(1, count))) if lane]
+
+
+def _progress_id(run_id, shard_index=None, stage=None):
+    if shard_index is None:
+        return str(run_id)
+    return f"{run_id}:shard:{shard_index}:{stage}"
+
+
+def _store_progress(task_id, status, data, task_name='scraping.tasks.daily_influencer_update'):
+    from django_celery_results.models import TaskResult
+    TaskResult.objects.store_result(
+        PROGRESS_CONTENT_TYPE, 'utf-8', task_id, json.dumps(data), status, task_name=task_name,
+    )
+
+
+def daily_update_progress(run_id):
+    """Roll up a daily run's progress rows: shards done and per-stage counts"""
+    from django_celery_results.models import TaskResult
+
+    run = TaskResult.objects.filter(task_id=_progress_id(run_id)).first()
+    if run is None:
+        return None
+    summary = json.loads(run.result)
+
+    stages = {stage: {'processed': 0, 'failed': 0, 'shards_done': 0} for stage, _ in DAILY_UPDATE_STAGES}
+    for row in TaskResult.objects.filter(task_id__startswith=f"{run_id}:shard:").values_list('result', flat=True):
+        checkpoint = json.loads(row)
+        totals = stages[checkpoint['stage']]
+        totals['processed'] += checkpoint['processed']
+        totals['failed'] += checkpoint['failed']
+        totals['shards_done'] += 1
+
+    return {
+        'run_id': str(run_id),
+        'status': run.status,
+        'influencers_total': summary.get('influencers_total', 0),
+        'shards_total': summary.get('shards_total', 0),
+        'shards_done': stages[DAILY_UPDATE_STAGES[-1][0]]['shards_done'],
+        'stages': stages,
+        'platform': summary.get('platform'),
+    }
+
+
+def _run_stage(stage, influencer_ids):
+    """Run one stage for every influencer in a lane; a failure only costs that influencer"""
+    from analytics.tasks import analyze_influencer_reels, analyze_pending_posts, infer_audience_demographics
+
+    if stage == 'posts':
+        # The lane's posts share inference batches, so they go in one call
+        try:
+            analyze_pending_posts(influencer_ids=influencer_ids)
+            return len(influencer_ids), 0
+        except Exception as e:
+            logger.error(f"Daily update posts failed for influencers {influencer_ids}: {e}")
+            return 0, len(influencer_ids)
+
+    run_one = {
+        'scrape': scrape_influencer_data,
+        'reels': analyze_influencer_reels,
+        'demographics': infer_audience_demographics,
+    }[stage]
+    processed = failed = 0
+    for influencer_id in influencer_ids:
+        try:
+            run_one(influencer_id)
+            processed += 1
+        except Exception as e:
+            failed += 1
+            logger.error(f"Daily update {stage} failed for influencer {influencer_id}: {e}")
+    return processed, failed
+
+
+@shared_task(bind=True)
+def run_daily_update_lane(self, stage: str, influencer_ids: list):
+    processed, failed = _run_stage(stage, influencer_ids)
+    return {'stage': stage, 'processed': processed, 'failed': failed}
+
+
+@shared_task(bind=True)
+def record_daily_update_stage(self, lane_results, run_id: str, shard_index: int, stage: str):
+    """Chord body after each stage of a shard: store its counts as a progress row"""
+    lane_results = [result for result in lane_results or [] if result]
+    checkpoint = {
+        'stage': stage,
+        'shard': shard_index,
+        'processed': sum(result['processed'] for result in lane_results),
+        'failed': sum(result['failed'] for result in lane_results),
+    }
+    _store_progress(
+        _progress_id(run_id, shard_index, stage), 'SUCCESS', checkpoint,
+        task_name='scraping.tasks.record_daily_update_stage',
+    )
+    return checkpoint
+
+
+def shard_stage_steps(run_id, shard_index, influencer_ids):
+    """[(group of lanes, checkpoint), ...] for every stage in order"""
+    limits = settings.DAILY_UPDATE_QUEUE_CONCURRENCY
+    steps = []
+    for stage, queue in DAILY_UPDATE_STAGES:
+        lanes = _lanes(list(influencer_ids), limits.get(queue, 1))
+        steps.append((
+            group([run_daily_update_lane.si(stage, lane).set(queue=queue) for lane in lanes]),
+            record_daily_update_stage.s(run_id, shard_index, stage),
+        ))
+    return steps
+
+
+def build_shard_canvas(run_id, shard_index, influencer_ids):
+    return chain(*(step for pair in shard_stage_steps(run_id, shard_index, influencer_ids) for step in pair))
+
+
+@shared_task(bind=True)
+def run_daily_update_shard(self, run_id: str, shard_index: int, influencer_ids: list):
+    logger.info(f"Daily update {run_id}: shard {shard_index} ({len(influencer_ids)} influencers)")
+    return self.replace(build_shard_canvas(run_id, shard_index, influencer_ids))
+
+
+@shared_task(bind=True)
+def finalize_daily_update(self, run_id: str):
+    """Single fan-in step: platform-level refresh once per run, then close the run's progress row"""
+    from analytics.rollups import refresh_rollups
+
+    progress = daily_update_progress(run_id) or {}
+    refresh_rollups()
+
+    platform = Influencer.objects.aggregate(
+        influencers=Count('id'),
+        total_followers=Sum('followers_count'),
+        avg_engagement_rate=Avg('engagement_rate'),
+    )
+    summary = {
+        'influencers_total': progress.get('influencers_total', 0),
+        'shards_total': progress.get('shards_total', 0),
+        'stages': progress.get('stages', {}),
+        'platform': {
+            'influencers': platform['influencers'],
+            'total_followers': platform['total_followers'] or 0,
+            'avg_engagement_rate': round(platform['avg_engagement_rate'] or 0, 2),
+        },
+        'finished_at': timezone.now().isoformat(),
+    }
+    _store_progress(_progress_id(run_id), 'SUCCESS', summary)
+    logger.info(f"Daily update {run_id} finished: {summary['stages']}")
+    return summary
+
+
 @shared_task(bind=True)
 def daily_influencer_update(self):
     """
     SCHEDULED TASK: Daily update of all influencers
-    Part of Point 4 implementation
+    Shards the roster and enqueues one chain: shard 0 -> shard 1 -> ... ->
+    finalize. Returns immediately; follow the run with daily_update_progress().
     """
-    try:
-        logger.info("Starting daily influencer update")
-        
-        influencers = Influencer.objects.filter(is_active=True)
-        processed_count = 0
-        
-        for influencer in influencers:
-            try:
-                # Chain scraping and analysis tasks
-                from analytics.tasks import analyze_influencer_posts, analyze_influencer_reels, infer_audience_demographics
-                
-                # Start task chain: scrape -> analyze posts -> analyze reels -> demographics
-                chain = (
-                    scrape_influencer_data.s(influencer.id) |
-                    analyze_influencer_posts.s() |
-                    analyze_influencer_reels.s() |
-                    infer_audience_demographics.s()
-                )
-                
-                chain.apply_async()
-                processed_count += 1
-                logger.info(f"Daily update chain started for @{influencer.username}")
-                
-                # Add delay to prevent overwhelming
-                import time
-                time.sleep(5)
-                
-            except Exception as e:
-                logger.error(f"Failed to start daily update for {influencer.username}: {e}")
-                continue
-        
-        logger.info(f"Daily update initiated for {processed_count} influencers")
-        return f"Daily update started for {processed_count} influencers"
-        
-    except Exception as e:
-        logger.error(f"Daily update task failed: {e}")
-        raise
+    run_id = self.request.id or str(uuid.uuid4())
+    influencer_ids = list(Influencer.objects.order_by('id').values_list('id', flat=True))
+    shards = _shards(influencer_ids, settings.DAILY_UPDATE_SHARD_SIZE)
+
+    _store_progress(_progress_id(run_id), 'PROGRESS', {
+        'influencers_total': len(influencer_ids),
+        'shards_total': len(shards),
+        'started_at': timezone.now().isoformat(),
+    })
+
+    chain(
+        *(run_daily_update_shard.si(run_id, index, shard) for index, shard in enumerate(shards)),
+        finalize_daily_update.si(run_id),
+    ).apply_async()
+
+    logger.info(f"Daily update {run_id} enqueued: {len(influencer_ids)} influencers in {len(shards)} shards")
+    return {'run_id': run_id, 'influencers': len(influencer_ids), 'shards': len(shards)}
@@ -1,3 +1,122 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from influencers.models import Influencer
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    DAILY_UPDATE_SHARD_SIZE=3,
+    DAILY_UPDATE_QUEUE_CONCURRENCY={'scraping': 2, 'analytics': 1, 'demographics': 4},
+)
+class DailyUpdateOrchestrationTest(TestCase):
+    def setUp(self):
+        self.ids = [
+            Influencer.objects.create(username=f'user{i}', followers_count=100 * i).id for i in range(1, 8)
+        ]
+
+    def test_enqueues_one_chain_of_shards(self):
+        from . import tasks
+
+        with mock.patch('celery.canvas._chain.apply_async') as apply_async:
+            result = tasks.daily_influencer_update()
+
+        apply_async.assert_called_once()
+        self.assertEqual((result['influencers'], result['shards']), (7, 3))
+        progress = tasks.daily_update_progress(result['run_id'])
+        self.assertEqual((progress['status'], progress['shards_total'], progress['shards_done']), ('PROGRESS', 3, 0))
+
+    def test_stage_lanes_respect_queue_limits(self):
+        from .tasks import DAILY_UPDATE_STAGES, shard_stage_steps
+
+        steps = shard_stage_steps('run', 0, self.ids)
+        self.assertEqual([checkpoint.args[2] for _, checkpoint in steps], [stage for stage, _ in DAILY_UPDATE_STAGES])
+
+        lanes = {checkpoint.args[2]: list(lane_group.tasks) for lane_group, checkpoint in steps}
+        self.assertEqual(
+            {stage: len(stage_lanes) for stage, stage_lanes in lanes.items()},
+            {'scrape': 2, 'posts': 1, 'reels': 1, 'demographics': 4},
+        )
+        self.assertEqual({lane.options['queue'] for lane in lanes['scrape']}, {'scraping'})
+        self.assertEqual(sorted(i for lane in lanes['scrape'] for i in lane.args[1]), self.ids)
+
+    def test_checkpoints_roll_up_and_finalize_once(self):
+        from .tasks import (
+            DAILY_UPDATE_STAGES, _progress_id, _store_progress, daily_update_progress,
+            finalize_daily_update, record_daily_update_stage,
+        )
+
+        _store_progress(_progress_id('run'), 'PROGRESS', {'influencers_total': 7, 'shards_total': 3})
+        for shard in range(3):
+            for stage, _ in DAILY_UPDATE_STAGES:
+                record_daily_update_stage(
+                    [{'stage': stage, 'processed': 2, 'failed': 0}, {'stage': stage, 'processed': 0, 'failed': 1}],
+                    'run', shard, stage,
+                )
+
+        progress = daily_update_progress('run')
+        self.assertEqual(progress['shards_done'], 3)
+        self.assertEqual(progress['stages']['scrape'], {'processed': 6, 'failed': 3, 'shards_done': 3})
+
+        with mock.patch('analytics.rollups.refresh_rollups') as refresh:
+            summary = finalize_daily_update('run')
+        refresh.assert_called_once()
+        self.assertEqual(summary['platform']['total_followers'], 2800)
+        self.assertEqual(daily_update_progress('run')['status'], 'SUCCESS')
+
+    def test_scrape_lane_runs_eagerly_against_db(self):
+        from celery import chain
+        from django.utils import timezone
+        from posts.models import Post
+        from .tasks import (
+            _progress_id, _store_progress, daily_update_progress, record_daily_update_stage,
+            run_daily_update_lane, shard_stage_steps,
+        )
+
+        def full_profile_scrape(username):
+            if username == 'user2':
+                return None
+            return {
+                'profile': {'username': username, 'followers_count': 5000},
+                'posts': [{'shortcode': f'{username}-p', 'likes_count': 10, 'posted_at': timezone.now()}],
+                'reels': [],
+            }
+
+        _store_progress(_progress_id('run'), 'PROGRESS', {'influencers_total': 3, 'shards_total': 1})
+        lanes, checkpoint = shard_stage_steps('run', 0, self.ids[:3])[0]
+        # Eager results would otherwise be stored in the Redis result backend
+        with mock.patch('scraping.tasks.InstagramScraper') as scraper, \
+                mock.patch.object(run_daily_update_lane, 'store_eager_result', False), \
+                mock.patch.object(record_daily_update_stage, 'store_eager_result', False):
+            scraper.return_value.full_profile_scrape.side_effect = full_profile_scrape
+            chain(lanes, checkpoint).apply().get()
+
+        self.assertEqual(Post.objects.filter(influencer_id__in=self.ids[:3]).count(), 2)
+        self.assertEqual(Influencer.objects.get(username='user1').followers_count, 5000)
+        self.assertIsNotNone(Influencer.objects.get(username='user3').last_scraped)
+        scrape = daily_update_progress('run')['stages']['scrape']
+        self.assertEqual(scrape, {'processed': 3, 'failed': 0, 'shards_done': 1})
+
+
+class MLAnalyzerImageTest(TestCase):
+    def test_analyze_post_image_closes_the_stored_file(self):
+        import tempfile
+        from pathlib import Path
+        from PIL import Image, ImageFile
+        from . import ml_analyzer
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'post.png'
+            Image.new('RGBA', (64, 48), (200, 120, 40, 255)).save(path)
+            store = mock.Mock()
+            store.fetch.return_value = mock.Mock(path=str(path))
+            with mock.patch.object(ml_analyzer, 'get_media_store', return_value=store), \
+                    mock.patch.object(ImageFile.ImageFile, '__exit__', autospec=True,
+                                      side_effect=ImageFile.ImageFile.__exit__) as exit_image:
+                result = ml_analyzer.InstagramMLAnalyzer().analyze_post_image('https://cdn/post.png')
+
+        self.assertTrue(result['image_analysis_success'])
+        exit_image.assert_called_once()
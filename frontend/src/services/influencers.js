@@ -202,6 +202,13 @@ export const influencersApi = {
     }
   },
 
+  // GET /api/v1/influencers/batch/?ids=1,2,3 - Influencer, analytics, posts, reels and demographics in one request
+  getInfluencersBatch: async (ids, params = {}) => {
+    const queryString = ApiUtils.buildQueryString({ ...params, ids: ids.join(',') })
+    const response = await apiClient.get(`/influencers/batch/?${queryString}`)
+    return response.data
+  },
+
   // GET /api/v1/influencers/search/ - Search influencers
   searchInfluencers: async (query, filters = {}) => {
     try {